@@ -1,15 +1,64 @@
+from collections import deque
+
+import numpy as np
 from stable_baselines3.common.callbacks import BaseCallback
 
 class CurriculumCallback(BaseCallback):
-    def __init__(self, update_every=50000, max_fish_count=10, verbose=1):
+    """
+    Success-driven curriculum over the number of hungry fish.
+
+    Training starts with `initial_fish_count` fish per tank. Once the success
+    rate (`info["is_success"]`: every fish fed) over the last `window` episodes
+    finished at the current level reaches `success_threshold`, the count goes up
+    by `step`. After `max_fish_count` is mastered the tanks go back to their
+    normal random layouts (`release=True`), the configuration being trained for.
+
+    Every level change is pushed to all sub-envs through
+    `training_env.env_method("set_fish_count", count)`, so it works for
+    DummyVecEnv, SubprocVecEnv, FishFeedingVecEnv and SharedMemoryVecEnv alike,
+    and applies to each tank from its next episode.
+    """
+
+    def __init__(self, initial_fish_count=2, max_fish_count=10, step=1, success_threshold=0.8, window=100,
+                 release=True, verbose=1):
         super().__init__(verbose)
-        self.update_every = update_every
+        self.initial_fish_count = initial_fish_count
         self.max_fish_count = max_fish_count
+        self.step = step
+        self.success_threshold = success_threshold
+        self.window = window
+        self.release = release
+        self.fish_count = initial_fish_count
+        self.results = deque(maxlen=window)
+
+    def _on_training_start(self):
+        self._apply()
+
+    def _apply(self):
+        self.results.clear()
+        self.training_env.env_method("set_fish_count", self.fish_count)
+        self.logger.record("curriculum/fish_count", -1 if self.fish_count is None else self.fish_count)
+        if self.verbose:
+            level = "random layouts" if self.fish_count is None else f"{self.fish_count} fish"
+            print(f"🧪 Curriculum: {level} (step {self.num_timesteps})")
 
     def _on_step(self) -> bool:
-        if self.num_timesteps % self.update_every == 0:
-            env = self.training_env.envs[0]
-            if hasattr(env, "increase_difficulty"):
-                new_count = env.current_fish_count + 1
-                env.increase_difficulty(new_count)
+        if self.fish_count is None:
+            return True  # Curriculum finished
+
+        for done, info in zip(self.locals["dones"], self.locals["infos"]):
+            if done and "is_success" in info:
+                self.results.append(info["is_success"])
+
+        if len(self.results) == self.window:
+            success_rate = float(np.mean(self.results))
+            self.logger.record("curriculum/success_rate", success_rate)
+            if success_rate >= self.success_threshold:
+                if self.fish_count >= self.max_fish_count:
+                    if not self.release:
+                        return True
+                    self.fish_count = None
+                else:
+                    self.fish_count = min(self.fish_count + self.step, self.max_fish_count)
+                self._apply()
         return True
@@ -2,6 +2,12 @@ import gymnasium as gym
 import numpy as np
 
 class CurriculumWrapper(gym.Wrapper):
+    """
+    Single-env curriculum: the wrapped FishFeedingEnv places `current_fish_count`
+    hungry fish per episode, raised through `increase_difficulty`. With
+    vectorized training use CurriculumCallback, which sets every sub-env.
+    """
+
     def __init__(self, env, initial_fish_count=2, max_fish_count=10):
         super().__init__(env)
         self.initial_fish_count = initial_fish_count
@@ -10,15 +16,15 @@ class CurriculumWrapper(gym.Wrapper):
         self.update_fish_count(self.current_fish_count)
 
     def update_fish_count(self, count):
-        if hasattr(self.env, 'set_fish_count'):
-            self.env.set_fish_count(count)
+        if hasattr(self.env.unwrapped, 'set_fish_count'):
+            self.env.unwrapped.set_fish_count(count)
         else:
             print("[WARNING] Your base environment does not support setting fish count!")
 
     def reset(self, **kwargs):
-        obs, info = self.env.reset(**kwargs)
+        # The count is applied before the reset, so the new episode already uses it
         self.update_fish_count(self.current_fish_count)
-        return obs, info
+        return self.env.reset(**kwargs)
 
     def increase_difficulty(self, new_count):
         new_count = min(self.max_fish_count, new_count)
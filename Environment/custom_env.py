@@ -1,81 +1,299 @@
 # ✅ Precision Aquaculture Custom Environment
 # This file defines a custom Gymnasium environment for a smart fish feeding agent.
-# The agent interacts in a 5x5 grid fish tank where it decides when and where to feed fish.
+# The agent interacts in a grid fish tank (5x5 by default) where it decides when and where to feed fish.
 
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 
+SPARSE_MIN_CELLS = 10_000  # From 100x100 up, hungry fish are kept as a set of cells
+
+
+def draw_hunger(rng, grid_size, fish_density=0.5, n=None):
+    """
+    Random hunger grid (1 = hungry). The default density keeps the original
+    draw, so seeded tanks are the same as before densities existed.
+
+    With `n`, returns n grids (n, grid_size, grid_size) from one call: the same
+    grids, in order, as n separate calls on the same generator.
+    """
+    size = (grid_size, grid_size) if n is None else (n, grid_size, grid_size)
+    if fish_density == 0.5:
+        return rng.choice([0, 1], size=size)
+    return (rng.random(size) < fish_density).astype(np.int64)
+
+
+def placement_generator(rng):
+    """
+    Generator for `place_fish`, spawned from a tank generator without drawing
+    from it. Fish-count placements then don't depend on how many density
+    layouts were drawn before (the batched envs draw them ahead in banks), so
+    every backend places the same fish for the same seed.
+    """
+    return rng.spawn(1)[0]
+
+
+def place_fish(rng, grid_size, fish_count):
+    """Exactly `fish_count` hungry fish in distinct random cells (flat y * grid_size + x indices)."""
+    return rng.choice(grid_size * grid_size, size=fish_count, replace=False)
+
+
+def spawn_seeds(seed, n):
+    """
+    Seeds for n tanks, spawned from the root `seed` with SeedSequence (fresh
+    entropy for None). Each tank gets an independent stream, and runs with
+    nearby root seeds share no tanks, unlike `seed + i`.
+    """
+    children = np.random.SeedSequence(seed).spawn(n)
+    return [int(child.generate_state(1, np.uint64)[0]) for child in children]
+
+
+def action_masks_from_obs(obs, obs_window=None):
+    """
+    Valid-action masks (..., 6) of FishFeedingEnv observations, the same as the
+    env's `action_masks()` for the state behind each observation. Accepts a
+    NumPy array or a torch tensor (and returns the same kind).
+    """
+    x, y = obs[..., -2], obs[..., -1]  # Normalized: 0 on the left/top wall, 1 on the right/bottom one
+    n_cells = obs.shape[-1] - 3
+    if obs_window is not None:
+        hunger = obs[..., n_cells // 2]  # The agent sits in the centre of its window
+    else:
+        g = int(round(n_cells ** 0.5))
+        cell = (y * (g - 1)).round() * g + (x * (g - 1)).round()
+        if isinstance(obs, np.ndarray):
+            hunger = np.take_along_axis(obs, cell.astype(np.int64)[..., None], axis=-1)[..., 0]
+        else:
+            hunger = obs.gather(-1, cell.long()[..., None])[..., 0]
+    hungry = hunger > 0.5
+    masks = [y > 0, y < 1, x > 0, x < 1, hungry, ~hungry]
+    if isinstance(obs, np.ndarray):
+        return np.stack(masks, axis=-1)
+    import torch
+    return torch.stack(masks, dim=-1)
+
+
+def draw_hungry_cells(rng, grid_size, fish_density):
+    """Random hungry cells (flat y * grid_size + x indices), without touching every cell."""
+    n_cells = grid_size * grid_size
+    count = rng.binomial(n_cells, fish_density)
+    return set(rng.choice(n_cells, size=count, replace=False).tolist())
+
+
 class FishFeedingEnv(gym.Env):
     """
     A custom Gym environment simulating a smart fish tank where the agent:
     - Moves around the tank
     - Decides when to feed fish
     - Avoids overfeeding (which leads to penalties)
+
+    The tank size, step budget and share of hungry fish are constructor
+    parameters. Large tanks (`sparse`, on by default from SPARSE_MIN_CELLS
+    cells) keep the hungry fish as a set of cells, so resets and steps don't
+    touch the whole grid. With `obs_window=k` the observation is the k x k
+    hunger patch centred on the agent (cells outside the tank read 0) instead
+    of the whole grid, followed as usual by water quality and agent x/y.
+
+    `set_fish_count(n)` (or `fish_count=n`) makes every following reset place
+    exactly n hungry fish, which is how the curriculum controls difficulty;
+    None goes back to drawing them by density. The final info of an episode
+    has `is_success`: whether every fish was fed.
+
+    All randomness comes from the env's own generator (`np_random`, and a
+    child of it for fish-count placements, see placement_generator), so
+    `reset(seed=...)` reproduces the tank. `reset(options={"hunger": grid})`
+    starts from a given layout instead, without drawing from the generator.
+
+    `action_masks()` (also `info["action_mask"]` after every reset and step)
+    flags the actions worth taking: moves into a wall are no-ops, feeding a
+    fed cell is overfeeding and skipping a hungry cell is always worse than
+    feeding it, so those are masked out. The mask is a function of the
+    observation alone (see action_masks_from_obs).
     """
 
-    def __init__(self, render_mode=None):
+    metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 3}
+
+    def __init__(self, render_mode=None, grid_size=5, max_steps=50, fish_density=0.5, obs_window=None,
+                 sparse=None, fish_count=None):
         super(FishFeedingEnv, self).__init__()
-        self.grid_size = 5  # Tank is 5x5
-        self.max_steps = 50
+        if obs_window is not None and obs_window % 2 == 0:
+            raise ValueError(f"obs_window must be odd so the agent sits in its centre, got {obs_window}")
+        self.render_mode = render_mode
+        self._renderer = None  # Sprite renderer, created on first render
+        self.grid_size = grid_size  # Tank is grid_size x grid_size
+        self.max_steps = max_steps
+        self.fish_density = fish_density
+        self.obs_window = obs_window
+        self.n_cells = grid_size * grid_size
+        self.sparse = self.n_cells >= SPARSE_MIN_CELLS if sparse is None else sparse
         self.action_space = spaces.Discrete(6)  # 0=up, 1=down, 2=left, 3=right, 4=feed, 5=skip
 
-        # Observation space: hunger + water quality + agent x/y (all normalized)
-        self.observation_space = spaces.Box(
-            low=0, high=1, shape=(self.grid_size * self.grid_size + 3,), dtype=np.float32
-        )
+        # Observation space: hunger (whole tank or window) + water quality + agent x/y (all normalized)
+        n_obs_cells = self.n_cells if obs_window is None else obs_window * obs_window
+        self.observation_space = spaces.Box(low=0, high=1, shape=(n_obs_cells + 3,), dtype=np.float32)
+
+        # Preallocated observation, updated in place for the cells that change
+        self._obs = np.zeros(n_obs_cells + 3, dtype=np.float32)
+        self._wq_idx = n_obs_cells
+        self._coords = np.arange(grid_size) / max(grid_size - 1, 1)  # normalized x/y
+        self.set_fish_count(fish_count)
+        self._placement_rng = None  # Spawned from np_random whenever it is (re)seeded
+        if obs_window is not None:
+            self._window_centre = (obs_window * obs_window) // 2
+            if not self.sparse:
+                # Hunger grid with a border of empty cells, so every window is a plain slice
+                r = obs_window // 2
+                self._padded = np.zeros((grid_size + 2 * r, grid_size + 2 * r), dtype=np.int64)
 
         self.reset()
 
+    # ------------------------------------------------------------------
+    # Hunger state: a dense grid, or a set of hungry cells for sparse tanks
+    # ------------------------------------------------------------------
+    @property
+    def fish_hunger(self):
+        """Hunger grid indexed [y, x]. Sparse tanks build a fresh copy on every access."""
+        if not self.sparse:
+            return self._fish_hunger
+        grid = np.zeros(self.n_cells, dtype=np.int64)
+        grid[list(self.hungry_cells)] = 1
+        return grid.reshape(self.grid_size, self.grid_size)
+
+    @fish_hunger.setter
+    def fish_hunger(self, grid):
+        grid = np.asarray(grid).reshape(self.grid_size, self.grid_size)
+        if self.sparse:
+            self.hungry_cells = set(np.flatnonzero(grid).tolist())
+            self.hungry_count = len(self.hungry_cells)
+        else:
+            if self.obs_window is None:
+                self._fish_hunger = grid
+            else:
+                r = self.obs_window // 2
+                self._padded[r:r + self.grid_size, r:r + self.grid_size] = grid
+                self._fish_hunger = self._padded[r:r + self.grid_size, r:r + self.grid_size]
+            # Hungry fish are counted once here and then tracked per feeding
+            self.hungry_count = int(grid.sum())
+        if self.obs_window is None:
+            self._obs[:self._wq_idx] = grid.ravel()
+        else:
+            self._fill_window()
+
+    def set_fish_count(self, count):
+        """Hungry fish placed by the next resets; None draws them by fish_density."""
+        if count is not None and not 0 <= count <= self.n_cells:
+            raise ValueError(f"fish_count must be between 0 and {self.n_cells}, got {count}")
+        self.fish_count = count
+
+    def _fill_window(self):
+        """Writes the hunger patch around the agent into the observation buffer."""
+        k = self.obs_window
+        x, y = self.agent_pos
+        window = self._obs[:self._wq_idx].reshape(k, k)
+        if not self.sparse:
+            window[:] = self._padded[y:y + k, x:x + k]
+            return
+        r = k // 2
+        g = self.grid_size
+        window.fill(0)
+        cells = self.hungry_cells
+        for yy in range(max(y - r, 0), min(y + r + 1, g)):
+            for xx in range(max(x - r, 0), min(x + r + 1, g)):
+                if yy * g + xx in cells:
+                    window[yy - y + r, xx - x + r] = 1
+
+    # ------------------------------------------------------------------
+    # Gym API
+    # ------------------------------------------------------------------
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
+        if seed is not None or self._placement_rng is None:
+            self._placement_rng = placement_generator(self.np_random)
         self.agent_pos = [0, 0]  # Start in top-left corner
         self.water_quality = 1.0  # Perfect water quality
         self.steps = 0
         self.fish_fed_count = 0  # ✅ Track how many fish were fed
+        self.last_reward = 0.0  # Shown in the rendered HUD
 
         # Fish hunger: 1 = hungry, 0 = not hungry
-        self.fish_hunger = np.random.choice([0, 1], size=(self.grid_size, self.grid_size))
+        # Drawn from the env's own generator so that `seed=` reproduces the tank
+        hunger = (options or {}).get("hunger")
+        if hunger is not None:
+            self.fish_hunger = np.array(hunger, dtype=np.int64)  # A copy: feeding changes it
+        elif self.sparse:
+            if self.fish_count is None:
+                self.hungry_cells = draw_hungry_cells(self.np_random, self.grid_size, self.fish_density)
+            else:
+                self.hungry_cells = set(place_fish(self._placement_rng, self.grid_size, self.fish_count).tolist())
+            self.hungry_count = len(self.hungry_cells)
+            if self.obs_window is None:
+                self._obs[:self._wq_idx] = 0
+                self._obs[list(self.hungry_cells)] = 1
+        elif self.fish_count is not None:
+            grid = np.zeros(self.n_cells, dtype=np.int64)
+            grid[place_fish(self._placement_rng, self.grid_size, self.fish_count)] = 1
+            self.fish_hunger = grid
+        else:
+            self.fish_hunger = draw_hunger(self.np_random, self.grid_size, self.fish_density)
 
-        obs = self._get_obs()
-        return obs, {}
+        obs = self._obs
+        obs[self._wq_idx] = self.water_quality
+        obs[-2] = self._coords[0]
+        obs[-1] = self._coords[0]
+
+        if self.render_mode == "human":
+            self.render()
+        return self._get_obs(), {"action_mask": self.action_masks()}
 
     def _get_obs(self):
-        flat_hunger = self.fish_hunger.flatten()
-        obs = np.concatenate((
-            flat_hunger,
-            [self.water_quality],
-            [self.agent_pos[0] / (self.grid_size - 1)],
-            [self.agent_pos[1] / (self.grid_size - 1)]
-        ))
-        return obs.astype(np.float32)
+        if self.obs_window is not None:
+            self._fill_window()
+        # Callers get their own copy so the internal buffer can keep changing
+        return self._obs.copy()
 
     def step(self, action):
+        action = int(action)
         self.steps += 1
         reward = -1  # Small default penalty
         terminated = False
+        pos = self.agent_pos
+        obs = self._obs
 
         # Move
-        if action == 0 and self.agent_pos[1] > 0:  # Up
-            self.agent_pos[1] -= 1
-        elif action == 1 and self.agent_pos[1] < self.grid_size - 1:  # Down
-            self.agent_pos[1] += 1
-        elif action == 2 and self.agent_pos[0] > 0:  # Left
-            self.agent_pos[0] -= 1
-        elif action == 3 and self.agent_pos[0] < self.grid_size - 1:  # Right
-            self.agent_pos[0] += 1
+        if action == 0:  # Up
+            if pos[1] > 0:
+                pos[1] -= 1
+                obs[-1] = self._coords[pos[1]]
+        elif action == 1:  # Down
+            if pos[1] < self.grid_size - 1:
+                pos[1] += 1
+                obs[-1] = self._coords[pos[1]]
+        elif action == 2:  # Left
+            if pos[0] > 0:
+                pos[0] -= 1
+                obs[-2] = self._coords[pos[0]]
+        elif action == 3:  # Right
+            if pos[0] < self.grid_size - 1:
+                pos[0] += 1
+                obs[-2] = self._coords[pos[0]]
         elif action == 4:  # Feed
-            x, y = self.agent_pos
-            if self.fish_hunger[y][x] == 1:
+            x, y = pos
+            if (y * self.grid_size + x in self.hungry_cells) if self.sparse else self._fish_hunger[y, x] == 1:
                 reward = 10  # Correct feeding
-                self.fish_hunger[y][x] = 0
+                if self.sparse:
+                    self.hungry_cells.discard(y * self.grid_size + x)
+                else:
+                    self._fish_hunger[y, x] = 0
+                obs[y * self.grid_size + x if self.obs_window is None else self._window_centre] = 0
+                self.hungry_count -= 1
                 self.fish_fed_count += 1  # ✅ Count this feeding
             else:
                 reward = -5  # Overfeeding
                 self.water_quality -= 0.1
+                obs[self._wq_idx] = self.water_quality
         elif action == 5:  # Skip feed
-            x, y = self.agent_pos
-            if self.fish_hunger[y][x] == 1:
+            x, y = pos
+            if (y * self.grid_size + x in self.hungry_cells) if self.sparse else self._fish_hunger[y, x] == 1:
                 reward = -3  # Skipped feeding
 
         # Termination Conditions
@@ -83,16 +301,43 @@ class FishFeedingEnv(gym.Env):
             terminated = True
         if self.water_quality <= 0.4:
             terminated = True
-        if np.sum(self.fish_hunger) == 0:
+        if self.hungry_count == 0:
             terminated = True  # All fish are fed
 
-        return self._get_obs(), reward, terminated, False, {}
+        # Episode outcome, reported once the episode is over
+        info = {"action_mask": self.action_masks()}
+        if terminated:
+            info.update(fish_fed=self.fish_fed_count, water_quality=self.water_quality,
+                        is_success=self.hungry_count == 0)
+
+        self.last_reward = reward
+        if self.render_mode == "human":
+            self.render()
+        if self.obs_window is not None and action < 4:
+            self._fill_window()  # The window only moves with the agent
+        return obs.copy(), reward, terminated, False, info
+
+    def action_masks(self):
+        """Valid actions in the current state, as a bool array over 0=up .. 5=skip."""
+        x, y = self.agent_pos
+        last = self.grid_size - 1
+        hungry = (y * self.grid_size + x in self.hungry_cells) if self.sparse else self._fish_hunger[y, x] == 1
+        return np.array([y > 0, y < last, x > 0, x < last, hungry, not hungry])
 
     def render(self):
+        # Sprite rendering: a window for "human", a NumPy frame for "rgb_array"
+        if self.render_mode in ("human", "rgb_array"):
+            if self._renderer is None:
+                from Environment.rendering import FishFeedingRenderer
+                self._renderer = FishFeedingRenderer(self, render_mode=self.render_mode)
+            return self._renderer.render(step=self.steps, reward=self.last_reward)
+
+        # Text rendering when no render mode was requested
+        hunger = self.fish_hunger
         grid = [['.' for _ in range(self.grid_size)] for _ in range(self.grid_size)]
         for y in range(self.grid_size):
             for x in range(self.grid_size):
-                if self.fish_hunger[y][x] == 1:
+                if hunger[y][x] == 1:
                     grid[y][x] = 'F'  # Hungry fish
         ax, ay = self.agent_pos
         grid[ay][ax] = 'A'  # Agent
@@ -102,3 +347,8 @@ class FishFeedingEnv(gym.Env):
             print(' '.join(row))
         print(f"Water Quality: {self.water_quality:.2f}")
         print(f"Fish Fed So Far: {self.fish_fed_count}\n")
+
+    def close(self):
+        if self._renderer is not None:
+            self._renderer.close()
+            self._renderer = None
@@ -0,0 +1,382 @@
+# ✅ Multi-Drone Fleet Environment
+# Large ponds run several feeding drones per tank. This steps N tanks with K
+# drones each, with moves, collisions, feeding and water quality resolved for
+# all N x K drones at once with NumPy, like FishFeedingVecEnv does for tanks.
+
+import numpy as np
+from gymnasium import spaces
+from gymnasium.utils import seeding
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from Environment.custom_env import draw_hunger, place_fish, placement_generator, spawn_seeds
+from Environment.vec_env import ACTION_DX, ACTION_DY, FEED_ACTION, LAYOUT_BANK_CELLS, SKIP_ACTION
+
+MODES = ("shared", "joint")
+
+# Per-tank state exposed through get_attr/set_attr for the sub-envs of a tank (agent_pos is per drone)
+TANK_STATE = ("fish_hunger", "water_quality", "steps", "fish_fed_count", "hungry_count")
+
+
+class _TankView:
+    """One tank of a fleet env, with the attributes FishFeedingRenderer reads."""
+
+    def __init__(self, env, tank):
+        self.env = env
+        self.tank = tank
+        self.grid_size = env.grid_size
+
+    @property
+    def agent_pos(self):
+        return self.env.agent_pos[self.tank]
+
+    @property
+    def fish_hunger(self):
+        return self.env.fish_hunger[self.tank]
+
+    @property
+    def fish_fed_count(self):
+        return int(self.env.fish_fed_count[self.tank])
+
+
+class FishFleetVecEnv(VecEnv):
+    """
+    SB3-compatible env for tanks fed by a fleet of `n_drones` drones.
+
+    Drones start side by side from the top-left corner and act at the same
+    time. A move is blocked (a no-op, like a wall) when the target cell holds
+    another drone at the start of the step, or when a lower-numbered drone
+    tries to enter the same cell, so two drones never share a cell and never
+    feed the same fish. Hunger and water quality are shared: every overfeed
+    of any drone costs the tank 0.1 water quality, and the episode of a tank
+    ends for all its drones under FishFeedingEnv's rules (step budget, water
+    quality <= 0.4, every fish fed). Rewards per drone are those of
+    FishFeedingEnv.
+
+    Two interfaces to the same dynamics:
+    - mode="shared" (parameter sharing): every drone is one sub-env, so
+      num_envs = num_envs x n_drones and any SB3 algorithm trains one policy
+      for all drones. A drone sees FishFeedingEnv's observation from its own
+      position (hunger grid or `obs_window` patch, water quality, its x/y), so
+      the policy also runs on FishFeedingEnv and CompactReplayBuffer applies.
+    - mode="joint": every tank is one sub-env with a MultiDiscrete action (one
+      action per drone, for PPO/A2C), the hunger view (the grid, or the K
+      patches), water quality and the x/y of every drone, and the summed reward.
+
+    Seeding, layout banks (`layout_batch`) and `set_options({"hunger": grid})`
+    work as in FishFeedingVecEnv; a tank takes the seed and options of its
+    first sub-env. With n_drones=1 both modes reproduce FishFeedingVecEnv exactly.
+    `render_mode="rgb_array"` draws each tank with FishFeedingRenderer;
+    get_images returns one frame per tank.
+
+    Valid-action masks (`env_method("action_masks")` and info["action_mask"],
+    as in FishFeedingVecEnv) also mask out moves into a cell held by another
+    drone; in joint mode a tank's mask is its drones' masks concatenated.
+    Moves that only fail because a lower-numbered drone claims the same cell
+    depend on the other actions and stay valid.
+    """
+
+    def __init__(self, num_envs=8, n_drones=2, mode="shared", render_mode=None, grid_size=5, max_steps=50,
+                 fish_density=0.5, obs_window=None, fish_count=None, layout_batch=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown fleet mode '{mode}'. Choose from {MODES}")
+        if not 1 <= n_drones <= grid_size * grid_size:
+            raise ValueError(f"n_drones must be between 1 and {grid_size * grid_size}, got {n_drones}")
+        if obs_window is not None and obs_window % 2 == 0:
+            raise ValueError(f"obs_window must be odd so the agent sits in its centre, got {obs_window}")
+        if render_mode not in (None, "rgb_array"):
+            raise ValueError(f"Unsupported render mode for a fleet: {render_mode}")
+        self.n_tanks = num_envs
+        self.n_drones = n_drones
+        self.mode = mode
+        self.grid_size = grid_size
+        self.max_steps = max_steps
+        self.fish_density = fish_density
+        self.obs_window = obs_window
+        self.render_mode = render_mode
+
+        n, k, g = num_envs, n_drones, grid_size
+        self.n_view_cells = g * g if obs_window is None else obs_window * obs_window
+        if mode == "shared":
+            observation_space = spaces.Box(low=0, high=1, shape=(self.n_view_cells + 3,), dtype=np.float32)
+            super().__init__(n * k, observation_space, spaces.Discrete(6))
+        else:
+            n_hunger = g * g if obs_window is None else k * self.n_view_cells
+            observation_space = spaces.Box(low=0, high=1, shape=(n_hunger + 1 + 2 * k,), dtype=np.float32)
+            super().__init__(n, observation_space, spaces.MultiDiscrete([6] * k))
+
+        if obs_window is None:
+            self.fish_hunger = np.zeros((n, g, g), dtype=np.int64)
+        else:
+            # Hunger grids with a border of empty cells, so windows never need bounds checks
+            r = obs_window // 2
+            self._padded = np.zeros((n, g + 2 * r, g + 2 * r), dtype=np.int64)
+            self.fish_hunger = self._padded[:, r:r + g, r:r + g]
+            offsets = np.arange(obs_window)
+            self._window_dy = offsets[None, None, :, None]
+            self._window_dx = offsets[None, None, None, :]
+        self.agent_pos = np.zeros((n, k, 2), dtype=np.int64)  # Per drone; columns: x, y
+        self.water_quality = np.ones(n, dtype=np.float64)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.fish_fed_count = np.zeros(n, dtype=np.int64)
+        self.hungry_count = np.zeros(n, dtype=np.int64)
+        self.last_reward = np.zeros(n, dtype=np.float32)  # Tank total, shown in the rendered HUD
+
+        self._rngs = [None] * n
+        self._placement_rngs = [None] * n  # Fish-count placements, see placement_generator
+        self._tanks = np.arange(n)
+        self._tank_index = self._tanks[:, None]
+        self._start_pos = np.stack([np.arange(k) % g, np.arange(k) // g], axis=1)
+        self._lower = np.tril(np.ones((k, k), dtype=bool), -1)  # [i, j]: drone j comes before drone i
+        self._others = ~np.eye(k, dtype=bool)
+        self._coords = np.arange(g) / max(g - 1, 1)  # normalized x/y
+        self._obs = np.zeros((self.num_envs,) + observation_space.shape, dtype=np.float32)
+        self._actions = np.zeros((n, k), dtype=np.int64)
+        self._fish_counts = [fish_count] * n  # Per tank; None draws hunger by density
+        self.layout_batch = layout_batch or max(1, LAYOUT_BANK_CELLS // (g * g))
+        self._layouts = np.zeros((n, self.layout_batch, g, g), dtype=np.int8)
+        self._layout_next = np.full(n, self.layout_batch)
+        self._renderers = None
+
+    # ------------------------------------------------------------------
+    # Tank state
+    # ------------------------------------------------------------------
+    def _tanks_of(self, indices):
+        """Tanks of the given sub-envs (drones in shared mode)."""
+        indices = np.asarray(list(self._get_indices(indices)), dtype=np.int64)
+        return np.unique(indices // self.n_drones) if self.mode == "shared" else indices
+
+    def seed(self, seed=None):
+        """Sub-env seeds spawned from the root `seed`, used by the next reset."""
+        self._seeds = spawn_seeds(seed, self.num_envs)
+        return self._seeds
+
+    def _reset_tanks(self, tanks):
+        g = self.grid_size
+        by_density = []
+        for i in tanks:
+            first = i * self.n_drones if self.mode == "shared" else i  # The tank's first sub-env
+            seed = self._seeds[first]
+            if seed is not None or self._rngs[i] is None:
+                self._rngs[i], _ = seeding.np_random(seed)
+                self._placement_rngs[i] = placement_generator(self._rngs[i])
+                self._layout_next[i] = self.layout_batch  # Drawn from the previous generator
+            hunger = self._options[first].get("hunger")
+            if hunger is not None:
+                self.fish_hunger[i] = hunger
+            elif self._fish_counts[i] is None:
+                by_density.append(i)
+            else:
+                self.fish_hunger[i] = 0
+                cells = place_fish(self._placement_rngs[i], g, self._fish_counts[i])
+                self.fish_hunger[i, cells // g, cells % g] = 1
+        if by_density:
+            # From the layout banks, refilling the used-up ones (see FishFeedingVecEnv)
+            by_density = np.array(by_density)
+            for i in by_density[self._layout_next[by_density] == self.layout_batch]:
+                self._layouts[i] = draw_hunger(self._rngs[i], g, self.fish_density, n=self.layout_batch)
+                self._layout_next[i] = 0
+            self.fish_hunger[by_density] = self._layouts[by_density, self._layout_next[by_density]]
+            self._layout_next[by_density] += 1
+        self.agent_pos[tanks] = self._start_pos
+        self.water_quality[tanks] = 1.0
+        self.steps[tanks] = 0
+        self.fish_fed_count[tanks] = 0
+        self.last_reward[tanks] = 0
+        self.hungry_count[tanks] = self.fish_hunger[tanks].reshape(len(tanks), -1).sum(axis=1)
+
+    def set_fish_count(self, count, indices=None):
+        """Hungry fish placed by the next resets of the tanks of `indices`; None draws them by density."""
+        if count is not None and not 0 <= count <= self.grid_size * self.grid_size:
+            raise ValueError(f"fish_count must be between 0 and {self.grid_size * self.grid_size}, got {count}")
+        for i in self._tanks_of(indices):
+            self._fish_counts[i] = count
+        return [None for _ in self._get_indices(indices)]
+
+    def _action_masks(self):
+        """(num_envs, 6) valid actions per drone in shared mode, (num_envs, 6 * n_drones) per tank in joint mode."""
+        g = self.grid_size
+        x, y = self.agent_pos[..., 0], self.agent_pos[..., 1]
+        # Cells the four moves lead to, (n, k, 4); off-grid moves point outside every cell
+        tx = x[..., None] + ACTION_DX[:FEED_ACTION]
+        ty = y[..., None] + ACTION_DY[:FEED_ACTION]
+        inside = (tx >= 0) & (tx < g) & (ty >= 0) & (ty < g)
+        current = y * g + x
+        occupied = ((ty * g + tx)[..., None] == current[:, None, None, :]) & self._others[None, :, None, :]
+        hungry = self.fish_hunger[self._tank_index, y, x] == 1
+        masks = np.concatenate([inside & ~occupied.any(axis=3), hungry[..., None], ~hungry[..., None]], axis=2)
+        return masks.reshape(self.num_envs, -1)
+
+    def action_masks(self, indices=None):
+        """Valid-action masks of the sub-envs (see the class docstring)."""
+        return list(self._action_masks()[list(self._get_indices(indices))])
+
+    def _write_obs(self):
+        n, k = self.n_tanks, self.n_drones
+        x, y = self.agent_pos[..., 0], self.agent_pos[..., 1]
+        if self.obs_window is None:
+            hunger = self.fish_hunger.reshape(n, 1, -1)
+        else:
+            windows = self._padded[self._tanks[:, None, None, None], y[..., None, None] + self._window_dy,
+                                   x[..., None, None] + self._window_dx]
+            hunger = windows.reshape(n, k, -1)
+
+        if self.mode == "shared":
+            obs = self._obs.reshape(n, k, -1)
+            obs[:, :, :-3] = hunger
+            obs[:, :, -3] = self.water_quality[:, None]
+            obs[:, :, -2] = self._coords[x]
+            obs[:, :, -1] = self._coords[y]
+        else:
+            obs = self._obs
+            n_hunger = obs.shape[1] - 1 - 2 * k
+            obs[:, :n_hunger] = hunger.reshape(n, -1)
+            obs[:, n_hunger] = self.water_quality
+            obs[:, n_hunger + 1::2] = self._coords[x]
+            obs[:, n_hunger + 2::2] = self._coords[y]
+
+    # ------------------------------------------------------------------
+    # VecEnv API
+    # ------------------------------------------------------------------
+    def reset(self):
+        self._reset_tanks(self._tanks)
+        self._write_obs()
+        self.reset_infos = [{"action_mask": mask} for mask in self._action_masks()]
+        # Seeds and options are only used once
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs.copy()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.n_tanks, self.n_drones)
+
+    def step_wait(self):
+        actions = self._actions
+        tanks = self._tank_index
+        g = self.grid_size
+        self.steps += 1
+
+        # Move: walls, occupied cells and cells claimed by a lower-numbered drone block the move
+        pos = self.agent_pos
+        x = np.clip(pos[..., 0] + ACTION_DX[actions], 0, g - 1)
+        y = np.clip(pos[..., 1] + ACTION_DY[actions], 0, g - 1)
+        target = y * g + x
+        current = pos[..., 1] * g + pos[..., 0]
+        moving = actions < FEED_ACTION
+        occupied = ((target[:, :, None] == current[:, None, :]) & self._others).any(axis=2)
+        claimed = ((target[:, :, None] == target[:, None, :]) & self._lower & moving[:, None, :]).any(axis=2)
+        blocked = occupied | claimed
+        x = np.where(blocked, pos[..., 0], x)
+        y = np.where(blocked, pos[..., 1], y)
+        pos[..., 0] = x
+        pos[..., 1] = y
+
+        # Feed / skip against the hunger of each drone's cell (drones are in distinct cells)
+        hungry = self.fish_hunger[tanks, y, x] == 1
+        feed = actions == FEED_ACTION
+        fed = feed & hungry
+        overfed = feed & ~hungry
+        skipped = (actions == SKIP_ACTION) & hungry
+
+        rewards = np.full(actions.shape, -1, dtype=np.float32)  # Small default penalty
+        rewards[fed] = 10  # Correct feeding
+        rewards[overfed] = -5  # Overfeeding
+        rewards[skipped] = -3  # Skipped feeding
+
+        tank_fed = fed.sum(axis=1)
+        self.fish_hunger[np.broadcast_to(tanks, fed.shape)[fed], y[fed], x[fed]] = 0
+        self.fish_fed_count += tank_fed
+        self.hungry_count -= tank_fed
+        # One -0.1 per overfeed, in place, so the levels are exactly FishFeedingEnv's
+        tank_overfed = overfed.sum(axis=1)
+        for k in range(1, tank_overfed.max(initial=0) + 1):
+            self.water_quality[tank_overfed >= k] -= 0.1
+        self.last_reward = rewards.sum(axis=1)
+
+        # Termination Conditions, shared by the drones of a tank
+        dones = (self.steps >= self.max_steps) | (self.water_quality <= 0.4) | (self.hungry_count == 0)
+
+        self._write_obs()
+        if self.mode == "shared":
+            rewards, env_dones = rewards.ravel(), np.repeat(dones, self.n_drones)
+        else:
+            rewards, env_dones = self.last_reward.copy(), dones
+        env_tanks = self._tanks.repeat(self.num_envs // self.n_tanks)  # Tank of each sub-env
+        infos = [{"TimeLimit.truncated": False} for _ in range(self.num_envs)]
+        done_tanks = np.flatnonzero(dones)
+        if len(done_tanks):
+            for i in np.flatnonzero(env_dones):
+                tank = env_tanks[i]
+                infos[i]["terminal_observation"] = self._obs[i].copy()
+                # Episode outcome of the tank, as reported by FishFeedingEnv
+                infos[i]["fish_fed"] = int(self.fish_fed_count[tank])
+                infos[i]["water_quality"] = float(self.water_quality[tank])
+                infos[i]["is_success"] = bool(self.hungry_count[tank] == 0)
+            self._reset_tanks(done_tanks)
+            self._write_obs()
+        for info, mask in zip(infos, self._action_masks()):
+            info["action_mask"] = mask
+
+        return self._obs.copy(), rewards, env_dones, infos
+
+    def close(self):
+        if self._renderers is not None:
+            for renderer in self._renderers:
+                renderer.close()
+            self._renderers = None
+
+    def get_images(self):
+        """One frame per tank, drawn by FishFeedingRenderer (needs render_mode="rgb_array")."""
+        if self.render_mode != "rgb_array":
+            return [None for _ in range(self.n_tanks)]
+        if self._renderers is None:
+            from Environment.rendering import FishFeedingRenderer
+            self._renderers = [FishFeedingRenderer(_TankView(self, i), render_mode="rgb_array")
+                               for i in range(self.n_tanks)]
+        return [renderer.render(step=int(self.steps[i]), reward=float(self.last_reward[i]))
+                for i, renderer in enumerate(self._renderers)]
+
+    def get_attr(self, attr_name, indices=None):
+        """Return attribute per sub-env; tank state is read from the sub-env's tank (its own position for a drone)."""
+        indices = list(self._get_indices(indices))
+        value = getattr(self, attr_name)
+        if attr_name == "agent_pos":
+            if self.mode == "shared":
+                return [value[i // self.n_drones, i % self.n_drones].tolist() for i in indices]
+            return [value[i].tolist() for i in indices]
+        if attr_name in TANK_STATE:
+            per_env = self.num_envs // self.n_tanks
+            return [value[i // per_env] for i in indices]
+        return [value for _ in indices]
+
+    def set_attr(self, attr_name, value, indices=None):
+        """
+        Set attribute for the sub-envs; tank state is written to the tanks of
+        `indices` (a drone's own position for agent_pos in shared mode). Other
+        attributes are fleet-wide and can only be set for every sub-env.
+        """
+        indices = list(self._get_indices(indices))
+        if attr_name == "agent_pos":
+            for i in indices:
+                if self.mode == "shared":
+                    self.agent_pos[i // self.n_drones, i % self.n_drones] = value
+                else:
+                    self.agent_pos[i] = value
+        elif attr_name in TANK_STATE:
+            tanks = self._tanks_of(indices)
+            getattr(self, attr_name)[tanks] = value
+            if attr_name == "fish_hunger":
+                self.hungry_count[tanks] = self.fish_hunger[tanks].reshape(len(tanks), -1).sum(axis=1)
+        elif len(set(indices)) < self.num_envs:
+            raise ValueError(f"'{attr_name}' is shared by the whole fleet; set it without indices")
+        else:
+            setattr(self, attr_name, value)
+            return
+        self._write_obs()
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        """Call a method of this class, which receives the target `indices`."""
+        method = getattr(self, method_name)
+        return method(*method_args, indices=list(self._get_indices(indices)), **method_kwargs)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
@@ -0,0 +1,159 @@
+# mosaic.py
+# Renders many tanks at once as one tiled RGB frame, with NumPy only.
+# Sprites from assets/ are scaled and composited into one tile per cell state
+# up front; a frame is then a gather of those tiles by the tanks' cell states.
+
+import math
+import os
+
+import numpy as np
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets")
+
+# Same look as FishFeedingRenderer
+SPRITE_SCALE = 0.6
+SPRITE_OFFSET = 0.2
+WATER_COLOR = (220, 240, 255)
+GRID_COLOR = (180, 180, 180)
+BACKGROUND_COLOR = (40, 40, 40)  # Between tanks
+GOOD_WATER_COLOR = np.array([60, 180, 75], dtype=np.float32)
+BAD_WATER_COLOR = np.array([220, 50, 50], dtype=np.float32)
+BAR_EMPTY_COLOR = (90, 90, 90)
+
+
+def load_sprite(name):
+    """RGBA sprite from assets/ as float32 in [0, 1]."""
+    import imageio.v2 as imageio
+
+    return imageio.imread(os.path.join(ASSET_DIR, name)).astype(np.float32) / 255
+
+
+def resize(image, size):
+    """Area-averaged (box filter) resize of an RGBA image to size x size, alpha-premultiplied."""
+    premultiplied = image.copy()
+    premultiplied[..., :3] *= image[..., 3:]
+    for axis in (0, 1):
+        n = premultiplied.shape[axis]
+        edges = (np.arange(size) * n) // size
+        counts = np.diff(np.append(edges, n)).reshape((-1, 1, 1) if axis == 0 else (1, -1, 1))
+        premultiplied = np.add.reduceat(premultiplied, edges, axis=axis) / counts
+    alpha = premultiplied[..., 3:]
+    premultiplied[..., :3] /= np.maximum(alpha, 1e-6)
+    return premultiplied
+
+
+def _blit(tile, sprite, offset):
+    """Alpha-composites an RGBA float sprite onto an RGB float tile, in place."""
+    s = len(sprite)
+    region = tile[offset:offset + s, offset:offset + s]
+    alpha = sprite[..., 3:]
+    region[:] = sprite[..., :3] * alpha + region * (1 - alpha)
+
+
+class MosaicRenderer:
+    """
+    Draws N tanks as one mosaic frame (rows of `columns` tanks), without pygame.
+
+    Each tank is its grid of cells, drawn like FishFeedingRenderer (water tile,
+    grid lines, drone under the fish sprite), with a water quality bar below
+    it. The four cell tiles (fed/hungry, with/without a drone) are composited
+    once; `render` then turns the stacked tank state into cell states and
+    gathers the tiles with one fancy-indexing pass, so the cost of a frame is a
+    few array copies of its size, whatever the number of tanks.
+
+    :param cell_size: pixels per cell (16 keeps 64 5x5 tanks under 1000 x 1000)
+    :param columns: tanks per mosaic row (default: a square-ish layout)
+    :param padding: pixels between tanks
+    """
+
+    def __init__(self, n_tanks, grid_size=5, cell_size=16, columns=None, padding=4, bar_height=4):
+        self.n_tanks = n_tanks
+        self.grid_size = grid_size
+        self.cell_size = cell_size
+        self.columns = columns or math.ceil(math.sqrt(n_tanks))
+        self.rows = math.ceil(n_tanks / self.columns)
+        self.padding = padding
+        self.bar_height = bar_height
+        self.tank_size = grid_size * cell_size  # Pixels of one tank's grid
+        self.panel_height = self.tank_size + bar_height + padding
+        self.panel_width = self.tank_size + padding
+        self.height = self.rows * self.panel_height + padding
+        self.width = self.columns * self.panel_width + padding
+
+        self.tiles = self._make_tiles()  # (4, cell, cell, 3), indexed by hungry + 2 * has_drone
+        # Panels of the whole mosaic, including the empty slots of an incomplete last row
+        self._panels = np.empty((self.rows * self.columns, self.panel_height, self.panel_width, 3), dtype=np.uint8)
+        self._panels[:] = BACKGROUND_COLOR
+        self._frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._frame[:] = BACKGROUND_COLOR
+        self._bar_x = np.arange(self.tank_size)
+
+    def _make_tiles(self):
+        c = self.cell_size
+        sprite_size = max(1, round(c * SPRITE_SCALE))
+        offset = round(c * SPRITE_OFFSET)
+        drone = resize(load_sprite("agent.png"), sprite_size)
+        fish = [resize(load_sprite(name), sprite_size) for name in ("fish_fed.png", "fish_hungry.png")]
+
+        tiles = np.empty((4, c, c, 3), dtype=np.float32)
+        for has_drone in (0, 1):
+            for is_hungry in (0, 1):
+                tile = tiles[is_hungry + 2 * has_drone]
+                tile[:] = np.array(WATER_COLOR, dtype=np.float32) / 255
+                tile[[0, -1], :] = tile[:, [0, -1]] = np.array(GRID_COLOR, dtype=np.float32) / 255
+                if has_drone:
+                    _blit(tile, drone, offset)
+                _blit(tile, fish[is_hungry], offset)
+        return np.rint(tiles * 255).astype(np.uint8)
+
+    # ------------------------------------------------------------------
+    # Frames
+    # ------------------------------------------------------------------
+    def cell_states(self, fish_hunger, agent_pos):
+        """
+        Tile index per cell, (N, g, g): hungry + 2 * has_drone. `agent_pos` is
+        (N, 2) [x, y], or (N, K, 2) for fleets.
+        """
+        n, g = len(fish_hunger), self.grid_size
+        states = (np.asarray(fish_hunger).reshape(n, g * g) == 1).astype(np.intp)
+        pos = np.asarray(agent_pos).reshape(n, -1, 2)
+        states[np.arange(n)[:, None], pos[..., 1] * g + pos[..., 0]] += 2
+        return states.reshape(n, g, g)
+
+    def tank_frames(self, fish_hunger, agent_pos, water_quality=None):
+        """Per-tank images, (N, panel height, panel width, 3), each with its padding and water bar."""
+        n, g, c = len(fish_hunger), self.grid_size, self.cell_size
+        if n > self.n_tanks:
+            raise ValueError(f"Renderer was built for {self.n_tanks} tanks, got {n}")
+        # (N, g, g, c, c, 3) tiles -> (N, g * c, g * c, 3) tank images
+        tiles = self.tiles[self.cell_states(fish_hunger, agent_pos)]
+        panels = self._panels[:n]
+        panels[:, :self.tank_size, :self.tank_size] = tiles.transpose(0, 1, 3, 2, 4, 5).reshape(
+            n, g * c, g * c, 3)
+        if water_quality is not None:
+            # Bar length and color from water quality: 1.0 is full and green, 0.4 (episode over) is empty and red
+            level = np.clip((np.asarray(water_quality, dtype=np.float32) - 0.4) / 0.6, 0, 1)
+            color = (BAD_WATER_COLOR + (GOOD_WATER_COLOR - BAD_WATER_COLOR) * level[:, None]).astype(np.uint8)
+            filled = self._bar_x[None, :] < np.rint(level * self.tank_size)[:, None]
+            bar = np.where(filled[..., None], color[:, None, :], np.array(BAR_EMPTY_COLOR, dtype=np.uint8))
+            panels[:, self.tank_size:self.tank_size + self.bar_height, :self.tank_size] = bar[:, None]
+        return panels
+
+    def render(self, fish_hunger, agent_pos, water_quality=None):
+        """The mosaic of all tanks as an (height, width, 3) uint8 frame, tanks in row-major order."""
+        n = len(fish_hunger)
+        self.tank_frames(fish_hunger, agent_pos, water_quality)
+        if n < len(self._panels):
+            self._panels[n:] = BACKGROUND_COLOR
+        p = self.padding
+        grid = self._panels.reshape(self.rows, self.columns, self.panel_height, self.panel_width, 3)
+        self._frame[p:, p:] = grid.transpose(0, 2, 1, 3, 4).reshape(self.height - p, self.width - p, 3)
+        return self._frame.copy()
+
+    def render_env(self, env):
+        """Mosaic of a FishFeedingVecEnv or FishFleetVecEnv (optionally wrapped), or of any VecEnv of tanks."""
+        base = env.unwrapped
+        if isinstance(getattr(base, "fish_hunger", None), np.ndarray):
+            return self.render(base.fish_hunger, base.agent_pos, base.water_quality)
+        return self.render(np.stack(env.get_attr("fish_hunger")), np.array(env.get_attr("agent_pos")),
+                           np.array(env.get_attr("water_quality")))
@@ -0,0 +1,398 @@
+# ✅ Oracle planner for FishFeedingEnv
+# Computes the best achievable return of an episode, so learned agents can be
+# scored by their regret instead of their raw reward.
+#
+# Every step costs -1 except a correct feeding, which pays +10, and the episode
+# ends as soon as the last hungry fish is fed. So a plan that feeds all H hungry
+# fish along a walk of L moves returns 10*H - L, and the problem is a shortest
+# open tour over the hungry cells from the agent's cell (Manhattan distances).
+# From a fresh tank that is always the optimum: the row-by-row sweep reaches
+# every cell in 24 moves, so all fish can be fed within the 50 steps, and
+# feeding one more fish always pays more than the at most 8 moves it costs.
+
+import numpy as np
+
+FEED_ACTION = 4
+INF = np.int16(10_000)  # Unreachable in the tour DP (safe to add a distance to)
+
+
+def water_quality_steps(water_quality, limit=0.4):
+    """Overfeeds that end the episode from this water quality (as the env subtracts)."""
+    n = 0
+    while not water_quality <= limit:
+        water_quality -= 0.1
+        n += 1
+    return n
+
+
+class FishFeedingOracle:
+    """
+    Optimal (or near-optimal) feed plans for FishFeedingEnv tanks.
+
+    Tours over up to `exact_max` hungry fish are solved exactly with the
+    Held-Karp subset DP, vectorized over every tank that has the same number of
+    hungry fish. Larger tours use the best of a row sweep, a column sweep and
+    nearest-neighbour, improved with 2-opt and or-opt moves; they're reported as optimal when they
+    match the minimum-spanning-tree lower bound. Tours are memoized by hunger
+    layout and start cell, so re-scoring the same seeded episodes (e.g. for every
+    model of an evaluation sweep) is almost free.
+    """
+
+    def __init__(self, grid_size=5, max_steps=50, exact_max=11, chunk_size=512):
+        self.grid_size = grid_size
+        self.max_steps = max_steps
+        self.exact_max = exact_max
+        self.chunk_size = chunk_size
+        self.cache = {}  # (hunger bitmask, start cell) -> (length, order, optimal)
+        self._layers = {}  # H -> masks grouped by popcount
+
+        g = grid_size
+        cells = np.arange(g * g)
+        self._cell_x = cells % g
+        self._cell_y = cells // g
+        # Sweep orders: boustrophedon by rows and by columns, starting at (0, 0)
+        rows = [list(range(y * g, (y + 1) * g))[:: 1 if y % 2 == 0 else -1] for y in range(g)]
+        cols = [list(range(x, g * g, g))[:: 1 if x % 2 == 0 else -1] for x in range(g)]
+        self._sweep_rank = [np.argsort(np.concatenate(rows)), np.argsort(np.concatenate(cols))]
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def layout(self, seed):
+        """Hunger grid of FishFeedingEnv.reset(seed=seed)."""
+        from gymnasium.utils import seeding
+
+        rng, _ = seeding.np_random(seed)
+        return rng.choice([0, 1], size=(self.grid_size, self.grid_size))
+
+    def solve(self, fish_hunger, start=None, steps_left=None, water_quality=None):
+        """
+        Best returns for a batch of tanks.
+
+        `fish_hunger` is (N, g, g) (or one (g, g) grid); `start` is (N, 2) agent
+        [x, y] positions, `steps_left` and `water_quality` per tank. They default
+        to a fresh episode. Returns a dict of arrays: return, length (moves of the
+        tour), hungry and optimal (False where the heuristic may be beaten).
+        """
+        hunger = np.asarray(fish_hunger).reshape(-1, self.grid_size * self.grid_size)
+        n = len(hunger)
+        start_cells = np.zeros(n, dtype=np.int64)
+        if start is not None:
+            start = np.asarray(start).reshape(n, 2)
+            start_cells = start[:, 1] * self.grid_size + start[:, 0]
+        steps_left = np.full(n, self.max_steps) if steps_left is None else np.broadcast_to(steps_left, n)
+        water_quality = np.ones(n) if water_quality is None else np.broadcast_to(water_quality, n)
+
+        masks = (hunger.astype(np.int64) << np.arange(hunger.shape[1])).sum(axis=1)
+        tours = self._tours(masks, start_cells)
+
+        lengths = np.array([length for length, _, _ in tours], dtype=np.int64)
+        hungry = hunger.sum(axis=1)
+        # Whole tour within the budget (always, from a fresh tank): 10 per fish, -1 per move
+        complete = lengths + hungry <= steps_left
+        returns = np.where(hungry == 0, -1.0, 10.0 * hungry - lengths)
+        for i in np.flatnonzero(~complete):
+            returns[i], _ = self._plan_return(tours[i][1], start_cells[i], int(steps_left[i]), float(water_quality[i]))
+
+        optimal = np.array([opt for _, _, opt in tours], dtype=bool) & complete
+        return {"return": returns, "length": lengths, "hungry": hungry, "optimal": optimal}
+
+    def plan(self, fish_hunger, start=(0, 0), steps_left=None, water_quality=1.0):
+        """
+        Action sequence (moves and feeds) and return of the best plan for one tank.
+        """
+        g = self.grid_size
+        hunger = np.asarray(fish_hunger).reshape(g * g)
+        mask = int((hunger.astype(np.int64) << np.arange(g * g)).sum())
+        start_cell = start[1] * g + start[0]
+        steps_left = self.max_steps if steps_left is None else steps_left
+        _, order, _ = self._tours(np.array([mask]), np.array([start_cell]))[0]
+        value, _ = self._plan_return(order, start_cell, steps_left, water_quality)
+
+        actions = []
+        x, y = start
+        for cell in order:
+            tx, ty = cell % g, cell // g
+            actions += [3 if tx > x else 2] * abs(tx - x) + [1 if ty > y else 0] * abs(ty - y)
+            actions.append(FEED_ACTION)
+            x, y = tx, ty
+        return actions[:steps_left], value
+
+    def plan_env(self, env):
+        """Best plan from the current state of a FishFeedingEnv."""
+        return self.plan(env.fish_hunger, tuple(env.agent_pos), env.max_steps - env.steps, env.water_quality)
+
+    # ------------------------------------------------------------------
+    # Returns
+    # ------------------------------------------------------------------
+    def _plan_return(self, order, start_cell, steps_left, water_quality):
+        """
+        Return of following the tour within the step budget, and whether the tour
+        was completed. When it doesn't fit, the best prefix is fed and the rest of
+        the episode is waited out (or ended by overfeeding, if that's cheaper).
+        """
+        if not order:
+            return -1.0, True  # No hungry fish: the first step ends the episode
+        xs, ys = self._cell_x[[start_cell, *order]], self._cell_y[[start_cell, *order]]
+        prefix = np.concatenate([[0], np.cumsum(np.abs(np.diff(xs)) + np.abs(np.diff(ys)))])
+        h = len(order)
+        if prefix[h] + h <= steps_left:
+            return float(10 * h - prefix[h]), True
+
+        end_cost = 5 * water_quality_steps(water_quality)
+        best = -float(min(steps_left, end_cost))  # Feed nobody
+        for k in range(1, h):
+            wait = steps_left - prefix[k] - k
+            if wait < 0:
+                break
+            best = max(best, 10 * k - prefix[k] - min(wait, end_cost))
+        return float(best), False
+
+    # ------------------------------------------------------------------
+    # Tours
+    # ------------------------------------------------------------------
+    def _tours(self, masks, start_cells):
+        keys = list(zip(masks.tolist(), start_cells.tolist()))
+        missing = sorted({key for key in keys if key not in self.cache})
+        if missing:
+            miss_masks = np.array([m for m, _ in missing], dtype=np.int64)
+            miss_starts = np.array([s for _, s in missing], dtype=np.int64)
+            bits = (miss_masks[:, None] >> np.arange(self.grid_size ** 2)) & 1
+            counts = bits.sum(axis=1)
+            for h in np.unique(counts):
+                group = np.flatnonzero(counts == h)
+                cells = np.nonzero(bits[group])[1].reshape(len(group), h)
+                for lo in range(0, len(group), self.chunk_size):
+                    chunk = group[lo:lo + self.chunk_size]
+                    solved = self._solve_group(cells[lo:lo + self.chunk_size], miss_starts[chunk])
+                    for i, tour in zip(chunk, solved):
+                        self.cache[missing[i]] = tour
+        return [self.cache[key] for key in keys]
+
+    def _distances(self, cells, start_cells):
+        x = np.concatenate([self._cell_x[start_cells][:, None], self._cell_x[cells]], axis=1)
+        y = np.concatenate([self._cell_y[start_cells][:, None], self._cell_y[cells]], axis=1)
+        # (B, H + 1, H + 1) with node 0 the start cell
+        return (np.abs(x[:, :, None] - x[:, None, :]) + np.abs(y[:, :, None] - y[:, None, :])).astype(np.int16)
+
+    def _solve_group(self, cells, start_cells):
+        b, h = cells.shape
+        if h == 0:
+            return [(0, (), True)] * b
+        dist = self._distances(cells, start_cells)
+        if h <= self.exact_max:
+            lengths, orders = self._held_karp(dist)
+            optimal = np.ones(b, dtype=bool)
+        else:
+            lengths, orders = self._heuristic(dist, cells)
+            optimal = lengths <= self._mst_length(dist)
+        tour_cells = np.take_along_axis(cells, orders, axis=1)
+        return [(int(lengths[i]), tuple(tour_cells[i].tolist()), bool(optimal[i])) for i in range(b)]
+
+    def _popcount_layers(self, h):
+        """Per popcount: the masks, the fish in each mask and the fish outside it."""
+        if h not in self._layers:
+            masks = np.arange(1 << h)
+            bits = ((masks[:, None] >> np.arange(h)) & 1).astype(bool)
+            popcount = bits.sum(axis=1)
+            layers = []
+            for c in range(h + 1):
+                layer = masks[popcount == c]
+                members = np.nonzero(bits[layer])[1].reshape(len(layer), c)
+                free = np.nonzero(~bits[layer])[1].reshape(len(layer), h - c)
+                layers.append((layer, members, free))
+            self._layers[h] = layers
+        return self._layers[h]
+
+    def _held_karp(self, dist):
+        """
+        Exact shortest open tours: dp[mask, j] is the shortest walk from the start
+        through the fish in `mask` that ends at fish j. One popcount layer at a
+        time, every tank in the batch at once.
+        """
+        b, h = dist.shape[0], dist.shape[1] - 1
+        # Tanks on the last axis, so every gather below copies contiguous rows
+        pair = np.ascontiguousarray(dist[:, 1:, 1:].transpose(1, 2, 0))  # (i, j, B)
+        dp = np.full((1 << h, h, b), INF, dtype=np.int16)
+        parent = np.zeros((1 << h, h, b), dtype=np.int8)
+        singles = 1 << np.arange(h)
+        dp[singles, np.arange(h)] = dist[:, 0, 1:].T
+
+        for layer, members, free in self._popcount_layers(h)[1:h]:
+            # Extend each mask by each fish j outside it, from the best last fish i inside it
+            # (a running min over i: contiguous elementwise ops beat argmin on a middle axis)
+            best = parent_i = None
+            for k in range(members.shape[1]):
+                i = members[:, k]
+                cand = dp[layer, i][:, None, :] + pair[i[:, None], free]  # (masks, free j, B)
+                if best is None:
+                    best, parent_i = cand, np.broadcast_to(i[:, None, None], cand.shape).astype(np.int8)
+                else:
+                    better = cand < best
+                    np.copyto(best, cand, where=better)
+                    np.copyto(parent_i, i[:, None, None].astype(np.int8), where=better)
+            targets = layer[:, None] | (1 << free)
+            dp[targets, free] = best
+            parent[targets, free] = parent_i
+
+        full = (1 << h) - 1
+        tanks = np.arange(b)
+        lengths = dp[full].min(axis=0).astype(np.int64)
+        last = dp[full].argmin(axis=0)
+        orders = np.zeros((b, h), dtype=np.int64)
+        mask = np.full(b, full)
+        for pos in range(h - 1, -1, -1):
+            orders[:, pos] = last
+            prev = parent[mask, last, tanks].astype(np.int64)
+            mask = mask & ~(1 << last)
+            last = prev
+        return lengths, orders
+
+    def _tour_lengths(self, dist, orders):
+        nodes = np.concatenate([np.zeros((len(orders), 1), dtype=np.int64), orders + 1], axis=1)
+        rows = np.arange(len(orders))[:, None]
+        return dist[rows, nodes[:, :-1], nodes[:, 1:]].sum(axis=1).astype(np.int64)
+
+    def _heuristic(self, dist, cells):
+        b, h = cells.shape
+        rows = np.arange(b)
+
+        candidates = [np.argsort(rank[cells], axis=1) for rank in self._sweep_rank]
+        # Nearest neighbour from the start cell
+        visited = np.zeros((b, h), dtype=bool)
+        current = np.zeros(b, dtype=np.int64)
+        greedy = np.zeros((b, h), dtype=np.int64)
+        for pos in range(h):
+            d = np.where(visited, INF, dist[rows, current][:, 1:])
+            nxt = d.argmin(axis=1)
+            greedy[:, pos] = nxt
+            visited[rows, nxt] = True
+            current = nxt + 1
+        candidates.append(greedy)
+
+        # The walk's open end as a virtual last node, at distance 0 from every cell
+        ext = np.zeros((b, h + 2, h + 2), dtype=np.int16)
+        ext[:, : h + 1, : h + 1] = dist
+        best_len, best_order = None, None
+        for order in candidates:
+            order = self._local_search(ext, order)
+            length = self._tour_lengths(dist, order)
+            if best_len is None:
+                best_len, best_order = length, order
+            else:
+                better = length < best_len
+                best_len = np.where(better, length, best_len)
+                best_order[better] = order[better]
+        return best_len, best_order
+
+    def _moves(self, h):
+        """Index arrays of the 2-opt and or-opt moves on a walk of h fish (cached per h)."""
+        key = ("moves", h)
+        if key not in self._layers:
+            i, j = np.triu_indices(h + 1, k=1)
+            two_opt = (i[i >= 1], j[i >= 1])  # reverse walk positions i..j
+            seg_start, seg_end, insert_after = [], [], []
+            for length in range(1, min(3, h) + 1):
+                for first in range(1, h - length + 2):
+                    last = first + length - 1
+                    for t in range(h + 1):
+                        if t < first - 1 or t > last:
+                            seg_start.append(first)
+                            seg_end.append(last)
+                            insert_after.append(t)
+            or_opt = (np.array(seg_start), np.array(seg_end), np.array(insert_after))
+            self._layers[key] = (two_opt, or_opt)
+        return self._layers[key]
+
+    def _local_search(self, ext, order, max_rounds=100):
+        """
+        Improves walks with 2-opt (reverse a segment) and or-opt (move a segment of
+        up to 3 fish elsewhere, either way round), taking the best move of each
+        tank per round until no move shortens any walk. `ext` has the start as
+        node 0 and the open end as node h + 1.
+        """
+        b, h = order.shape
+        (i, j), (first, last, t) = self._moves(h)
+        order = order.copy()
+        active = np.arange(b)
+        for _ in range(max_rounds):
+            # Walk positions 0..h+1 as nodes of `ext`
+            walk = np.concatenate([np.zeros((len(active), 1), dtype=np.int64), order[active] + 1,
+                                   np.full((len(active), 1), h + 1)], axis=1)
+            # Distances between walk positions, so each edge below is a column lookup
+            pos = np.take_along_axis(ext[active], walk[:, :, None], axis=1)
+            pos = np.take_along_axis(pos, walk[:, None, :], axis=2).astype(np.int32)
+            pos = pos.reshape(len(active), -1)
+
+            def edge(p, q):
+                return np.take(pos, p * (h + 2) + q, axis=1)
+
+            gain_2 = edge(i - 1, i) + edge(j, j + 1) - edge(i - 1, j) - edge(i, j + 1)
+            removed = edge(first - 1, first) + edge(last, last + 1) - edge(first - 1, last + 1)
+            forward = edge(t, first) + edge(last, t + 1)
+            backward = edge(t, last) + edge(first, t + 1)
+            gain_or = removed + edge(t, t + 1) - np.minimum(forward, backward)
+
+            best_2, best_or = gain_2.argmax(axis=1), gain_or.argmax(axis=1)
+            n = np.arange(len(active))
+            g2, gor = gain_2[n, best_2], gain_or[n, best_or]
+            improve = np.maximum(g2, gor) > 0
+            if not improve.any():
+                break
+            for k in np.flatnonzero(improve):
+                walk_k = order[active[k]].tolist()
+                if g2[k] >= gor[k]:
+                    lo, hi = i[best_2[k]] - 1, j[best_2[k]]
+                    walk_k[lo:hi] = walk_k[lo:hi][::-1]
+                else:
+                    m = best_or[k]
+                    f, l, after = first[m], last[m], t[m]
+                    seg = walk_k[f - 1:l]
+                    if backward[k, m] < forward[k, m]:
+                        seg = seg[::-1]
+                    if after < f - 1:
+                        walk_k = walk_k[:after] + seg + walk_k[after:f - 1] + walk_k[l:]
+                    else:
+                        walk_k = walk_k[:f - 1] + walk_k[l:after] + seg + walk_k[after:]
+                order[active[k]] = walk_k
+            active = active[improve]
+        return order
+
+    def _mst_length(self, dist):
+        """Minimum spanning tree over the start and fish: a lower bound on any tour."""
+        b, n = dist.shape[0], dist.shape[1]
+        rows = np.arange(b)
+        in_tree = np.zeros((b, n), dtype=bool)
+        in_tree[:, 0] = True
+        best = dist[:, 0].astype(np.int64)
+        total = np.zeros(b, dtype=np.int64)
+        for _ in range(n - 1):
+            d = np.where(in_tree, INF, best)
+            nxt = d.argmin(axis=1)
+            total += d[rows, nxt]
+            in_tree[rows, nxt] = True
+            best = np.minimum(best, dist[rows, nxt])
+        return total
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Optimal returns of seeded FishFeedingEnv episodes.")
+    parser.add_argument("--episodes", type=int, default=100_000)
+    parser.add_argument("--exact-max", type=int, default=11, help="largest tour solved exactly")
+    args = parser.parse_args()
+
+    oracle = FishFeedingOracle(exact_max=args.exact_max)
+    rng = np.random.default_rng(0)
+    layouts = rng.integers(0, 2, size=(args.episodes, oracle.grid_size, oracle.grid_size))
+    start = time.time()
+    result = oracle.solve(layouts)
+    elapsed = time.time() - start
+    print(f"🧭 {args.episodes} episodes in {elapsed:.1f}s")
+    print(f"   Mean optimal return: {result['return'].mean():.2f}")
+    print(f"   Proven optimal: {result['optimal'].mean():.1%}")
+    start = time.time()
+    oracle.solve(layouts)
+    print(f"   Re-scored from the memo in {time.time() - start:.1f}s")
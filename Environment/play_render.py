@@ -1,12 +1,14 @@
 # play_render.py
 
+import os
+import sys
 import time
-from custom_env import FishFeedingEnv
-from rendering import FishFeedingRenderer
 
-# Initialize environment and renderer
-env = FishFeedingEnv()
-renderer = FishFeedingRenderer(env)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Environment.custom_env import FishFeedingEnv
+
+# Initialize environment; "human" mode draws the window on every step
+env = FishFeedingEnv(render_mode="human")
 
 obs = env.reset()
 if isinstance(obs, tuple):  # gymnasium returns (obs, info)
@@ -21,7 +23,6 @@ for step in range(200):
 
     print(f"[Step {step}] Action: {action}, Reward: {reward:.2f}, Info: {info}")
 
-    renderer.render(step=step, reward=reward)
     time.sleep(0.3)
 
     if done:
@@ -29,4 +30,4 @@ for step in range(200):
         if isinstance(obs, tuple):
             obs, _ = obs
 
-renderer.close()
+env.close()
@@ -1,105 +1,100 @@
 # generate_all_gifs.py
 
+import argparse
+import multiprocessing as mp
 import os
 import sys
-import time
-import pygame
-import imageio
-import numpy as np
-
-from stable_baselines3 import PPO, DQN, A2C
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from Environment.custom_env import FishFeedingEnv
-from Environment.rendering import FishFeedingRenderer
-
-def record_agent(env, model=None, gif_name="agent.gif", max_steps=100):
-    renderer = FishFeedingRenderer(env)
+from Environment.video_recorder import StreamingVideoWriter
+from Training import model_registry
+
+# (title, model path or None for random, model type, output name)
+AGENTS = [
+    ("Random", None, None, "fish_agent_random"),
+    ("DQN", "./models/dqn/best_model/best_model.zip", "dqn", "fish_agent_dqn"),
+    ("PPO", "./models/ppo/best_model.zip", "ppo", "fish_agent_ppo"),
+    ("REINFORCE", "./models/pg/reinforce_model2.zip", "a2c", "fish_agent_reinforce"),  # simulated with A2C
+    ("A2C", "./models/a2c/best_model.zip", "a2c", "fish_agent_a2c"),
+    ("Best Overall (PPO)", "./models/ppo/best_model.zip", "ppo", "fish_agent_best"),  # change if needed
+]
+
+def record_agent(env, model=None, gif_name="agent.gif", max_steps=100, fps=1 / 0.7):
+    # env must use render_mode="rgb_array"; each frame goes straight to the encoder
     obs = env.reset()
     if isinstance(obs, tuple):
         obs, _ = obs
 
-    frames = []
-
-    for step in range(max_steps):
-        if model:
-            action, _ = model.predict(obs, deterministic=True)
-        else:
-            action = env.action_space.sample()
+    with StreamingVideoWriter(gif_name, fps=fps) as writer:
+        for step in range(max_steps):
+            if model:
+                action, _ = model.predict(obs, deterministic=True)
+            else:
+                action = env.action_space.sample()
 
-        obs, reward, terminated, truncated, info = env.step(action)
+            obs, reward, terminated, truncated, info = env.step(action)
 
-        renderer.render(step=step, reward=reward)
-        surface = pygame.display.get_surface()
-        frame_array = pygame.surfarray.array3d(surface)
-        frame_array = frame_array.transpose([1, 0, 2])
-        frames.append(frame_array)
+            writer.append(env.render())
 
-        time.sleep(0.1)
-        if terminated or truncated:
-            obs = env.reset()
-            if isinstance(obs, tuple):
-                obs, _ = obs
+            if terminated or truncated:
+                obs = env.reset()
+                if isinstance(obs, tuple):
+                    obs, _ = obs
 
-    renderer.close()
-    imageio.mimsave(gif_name, frames, duration=0.7)
+    env.close()
     print(f"✅ Saved: {gif_name}")
 
 def load_model(path, model_type):
     if not os.path.exists(path):
         print(f"❌ Model not found at: {path}")
         return None
-
-    if model_type == "ppo":
-        return PPO.load(path)
-    elif model_type == "dqn":
-        return DQN.load(path)
-    elif model_type == "a2c":
-        return A2C.load(path)
-    else:
+    if model_type not in ("ppo", "dqn", "a2c"):
         raise ValueError("Unsupported model type.")
+    # The registry loads each file once, and only imports SB3 when asked to
+    return model_registry.load_model(path, model_type)
+
+def record_job(model_path, model_type, recordings, max_steps):
+    """
+    Records every (title, output path) that uses one model, in its own process
+    with its own offscreen renderer. The model is loaded once for all of them.
+    """
+    model = None
+    if model_path is not None:
+        model = load_model(model_path, model_type)
+        if model is None:
+            return []
+    outputs = []
+    for title, output_path in recordings:
+        print(f"🎬 Generating {title} Agent video...")
+        env = FishFeedingEnv(render_mode="rgb_array")
+        record_agent(env, model, gif_name=output_path, max_steps=max_steps)
+        outputs.append(output_path)
+    return outputs
 
 if __name__ == "__main__":
-    os.makedirs("gifs", exist_ok=True)
+    parser = argparse.ArgumentParser(description="Record every trained agent to GIF/MP4.")
+    parser.add_argument("--steps", type=int, default=100, help="steps recorded per agent")
+    parser.add_argument("--format", choices=["gif", "mp4"], default="gif")
+    parser.add_argument("--workers", type=int, default=None, help="parallel recordings (default: CPU count)")
+    args = parser.parse_args()
 
-    # 1. Random Agent
-    print("🎬 Generating Random Agent GIF...")
-    env = FishFeedingEnv(render_mode=None)
-    record_agent(env, model=None, gif_name="gifs/fish_agent_random.gif")
+    # One job per model file, so agents sharing a checkpoint share one load
+    jobs = defaultdict(list)
+    for title, path, model_type, name in AGENTS:
+        jobs[(path, model_type)].append((title, f"gifs/{name}.{args.format}"))
 
-    # 2. DQN Agent
-    print("🎬 Generating DQN Agent GIF...")
-    model = load_model("./models/dqn/best_model/best_model.zip", "dqn")
-    if model:
-        env = FishFeedingEnv(render_mode=None)
-        record_agent(env, model, gif_name="gifs/fish_agent_dqn.gif")
-
-    # 3. PPO Agent
-    print("🎬 Generating PPO Agent GIF...")
-    model = load_model("./models/ppo/best_model.zip", "ppo")
-    if model:
-        env = FishFeedingEnv(render_mode=None)
-        record_agent(env, model, gif_name="gifs/fish_agent_ppo.gif")
-
-    # 4. REINFORCE (simulated with A2C)
-    print("🎬 Generating REINFORCE Agent GIF...")
-    model = load_model("./models/pg/reinforce_model2.zip", "a2c")
-    if model:
-        env = FishFeedingEnv(render_mode=None)
-        record_agent(env, model, gif_name="gifs/fish_agent_reinforce.gif")
-
-    # 5. A2C Agent
-    print("🎬 Generating A2C Agent GIF...")
-    model = load_model("./models/a2c/best_model.zip", "a2c")
-    if model:
-        env = FishFeedingEnv(render_mode=None)
-        record_agent(env, model, gif_name="gifs/fish_agent_a2c.gif")
-
-    # 6. Best Overall (currently set to PPO)
-    print("🎬 Generating Best Overall Agent GIF (PPO)...")
-    model = load_model("./models/ppo/best_model.zip", "ppo")  # change if needed
-    if model:
-        env = FishFeedingEnv(render_mode=None)
-        record_agent(env, model, gif_name="gifs/fish_agent_best.gif")
+    os.makedirs("gifs", exist_ok=True)
+    workers = min(args.workers or os.cpu_count(), len(jobs))
+    ctx = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx) as pool:
+        futures = [
+            pool.submit(record_job, path, model_type, recordings, args.steps)
+            for (path, model_type), recordings in jobs.items()
+        ]
+        for future in futures:
+            future.result()
 
     print("🎉 All GIFs generated in the 'gifs/' folder!")
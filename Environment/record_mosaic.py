@@ -0,0 +1,64 @@
+# record_mosaic.py
+# Records many tanks at once: a FishFeedingVecEnv played by a random or trained
+# agent, drawn as one mosaic per step by MosaicRenderer and streamed to GIF/MP4.
+#
+# Usage:
+#   python Environment/record_mosaic.py --tanks 64 --steps 200 --output gifs/mosaic.mp4
+#   python Environment/record_mosaic.py --model ./models/ppo/best_model.zip
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Environment.mosaic import MosaicRenderer
+from Environment.vec_env import FishFeedingVecEnv
+from Environment.video_recorder import StreamingVideoWriter
+
+
+def record_mosaic(output, n_tanks=64, steps=200, model=None, seed=0, fps=5, cell_size=16):
+    env = FishFeedingVecEnv(num_envs=n_tanks)
+    env.seed(seed)
+    obs = env.reset()
+    renderer = MosaicRenderer(n_tanks, env.grid_size, cell_size=cell_size)
+    rng = np.random.default_rng(seed)
+
+    render_seconds = 0.0
+    with StreamingVideoWriter(output, fps=fps) as writer:
+        for step in range(steps):
+            start = time.perf_counter()
+            frame = renderer.render_env(env)
+            render_seconds += time.perf_counter() - start
+            writer.append(frame)
+            if model is not None:
+                actions, _ = model.predict(obs, deterministic=True)
+            else:
+                actions = rng.integers(0, 6, n_tanks)
+            obs, rewards, dones, infos = env.step(actions)
+
+    env.close()
+    print(f"✅ Saved: {output} ({steps} frames of {n_tanks} tanks, {steps / render_seconds:.0f} frames/s rendered)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record a mosaic of many tanks to GIF/MP4.")
+    parser.add_argument("--tanks", type=int, default=64)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--output", default="gifs/mosaic.gif")
+    parser.add_argument("--model", default=None, help="trained model zip (random agent when omitted)")
+    parser.add_argument("--model-type", choices=["ppo", "dqn", "a2c"], default=None, help="inferred when omitted")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fps", type=float, default=5)
+    parser.add_argument("--cell-size", type=int, default=16, help="pixels per cell")
+    args = parser.parse_args()
+
+    model = None
+    if args.model:
+        from Training import model_registry
+        model = model_registry.load_model(args.model, args.model_type)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    record_mosaic(args.output, args.tanks, args.steps, model, args.seed, args.fps, args.cell_size)
@@ -1,17 +1,19 @@
-import time
-import pygame
-import imageio
-from custom_env import FishFeedingEnv
-from rendering import FishFeedingRenderer
+import os
+import sys
 
-env = FishFeedingEnv()
-renderer = FishFeedingRenderer(env)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Environment.custom_env import FishFeedingEnv
+from Environment.video_recorder import StreamingVideoWriter
+
+# Offscreen rendering: no window, frames come straight from env.render()
+env = FishFeedingEnv(render_mode="rgb_array")
 
 obs = env.reset()
 if isinstance(obs, tuple):
     obs, _ = obs
 
-frames = []
+# Frames are streamed to the GIF encoder as they are rendered
+writer = StreamingVideoWriter("fish_agent_random.gif", fps=1 / 5)
 done = False
 
 for step in range(100):
@@ -19,19 +21,11 @@ for step in range(100):
     obs, reward, terminated, truncated, info = env.step(action)
     done = terminated or truncated
 
-    renderer.render(step=step, reward=reward)
-    
     # Save frame
-    frame_surface = pygame.display.get_surface()
-    frame_array = pygame.surfarray.array3d(frame_surface)
-    frame_array = frame_array.transpose([1, 0, 2])
-    frames.append(frame_array)
+    writer.append(env.render())
 
-    time.sleep(0.1)
     if done:
         break
 
-renderer.close()
-
-# Save as GIF
-imageio.mimsave("fish_agent_random.gif", frames, duration=5)
+env.close()
+writer.close()
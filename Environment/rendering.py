@@ -1,91 +1,197 @@
 # -*- coding: utf-8 -*-
 # rendering.py (with Sprites)
 import pygame
+import numpy as np
 import sys
 import os
 
-GRID_SIZE = 5
-CELL_SIZE = 100
-WIDTH = HEIGHT = GRID_SIZE * CELL_SIZE
+CELL_SIZE = 100  # Cell size for small tanks; larger tanks shrink cells to fit MAX_WINDOW_SIZE
+MAX_WINDOW_SIZE = 1000
+MIN_CELL_SIZE = 2
 FPS = 3
 
-ASSET_DIR = "assets"
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets")
+
+SPRITE_SCALE = 0.6  # Sprites cover 60% of a cell...
+SPRITE_OFFSET = 0.2  # ...and sit 20% of a cell inside it
+TEXT_COLOR = (0, 0, 0)
 
 class FishFeedingRenderer:
-    def __init__(self, env):
-        pygame.init()
+    """
+    Draws the tank with sprites.
+
+    render_mode="human" opens a window and caps the frame rate at FPS.
+    render_mode="rgb_array" draws to an offscreen Surface (no window, no event
+    pump, no frame cap) and `render` returns the frame as an HxWx3 uint8 array,
+    which also works on machines without a display.
+
+    Frames are drawn incrementally: every cell state (hungry/fed, with/without
+    the drone) is pre-composited once, HUD text pieces are rasterized once, and
+    each frame only redraws the cells that changed plus the HUD area. The
+    changed cells are the ones the drones left or entered and those whose
+    hunger differs from the last frame (one NumPy comparison, so fish fed or
+    tanks reset between frames are caught too); no per-cell Python loop runs
+    over the whole tank.
+    """
+
+    def __init__(self, env, render_mode="human"):
         self.env = env
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption("🐟 Precision Aquaculture Simulation")
-        self.clock = pygame.time.Clock()
+        self.render_mode = render_mode
+
+        # Dimensions come from the env's tank
+        self.grid_size = env.grid_size
+        self.cell_size = max(MIN_CELL_SIZE, min(CELL_SIZE, MAX_WINDOW_SIZE // self.grid_size))
+        self.width = self.height = self.grid_size * self.cell_size
+        self.sprite_size = max(1, round(self.cell_size * SPRITE_SCALE))
+        self.sprite_offset = round(self.cell_size * SPRITE_OFFSET)
+
+        if render_mode == "human":
+            pygame.init()
+            self.screen = pygame.display.set_mode((self.width, self.height))
+            pygame.display.set_caption("🐟 Precision Aquaculture Simulation")
+            self.clock = pygame.time.Clock()
+        elif render_mode == "rgb_array":
+            pygame.font.init()
+            self.screen = pygame.Surface((self.width, self.height))
+            self.clock = None
+        else:
+            raise ValueError(f"Unsupported render mode: {render_mode}")
         self.font = pygame.font.SysFont("Arial", 18)
 
         # Load sprites
+        sprite_size = (self.sprite_size, self.sprite_size)
         self.agent_sprite = pygame.image.load(os.path.join(ASSET_DIR, "agent.png"))
-        self.agent_sprite = pygame.transform.scale(self.agent_sprite, (60, 60))
+        self.agent_sprite = pygame.transform.scale(self.agent_sprite, sprite_size)
 
         self.fish_fed_sprite = pygame.image.load(os.path.join(ASSET_DIR, "fish_fed.png"))
-        self.fish_fed_sprite = pygame.transform.scale(self.fish_fed_sprite, (60, 60))
+        self.fish_fed_sprite = pygame.transform.scale(self.fish_fed_sprite, sprite_size)
 
         self.fish_hungry_sprite = pygame.image.load(os.path.join(ASSET_DIR, "fish_hungry.png"))
-        self.fish_hungry_sprite = pygame.transform.scale(self.fish_hungry_sprite, (60, 60))
+        self.fish_hungry_sprite = pygame.transform.scale(self.fish_hungry_sprite, sprite_size)
+
+        # Legend sprites keep their full size whatever the cell size
+        if self.sprite_size == 60:
+            legend_sprites = (self.agent_sprite, self.fish_fed_sprite, self.fish_hungry_sprite)
+        else:
+            legend_sprites = [pygame.transform.scale(pygame.image.load(os.path.join(ASSET_DIR, name)), (60, 60))
+                              for name in ("agent.png", "fish_fed.png", "fish_hungry.png")]
 
         # Optional: background tile
-        self.bg_tile = pygame.Surface((CELL_SIZE, CELL_SIZE))
+        self.bg_tile = pygame.Surface((self.cell_size, self.cell_size))
         self.bg_tile.fill((220, 240, 255))  # Light blue water tile
 
-    def draw_grid(self):
-        for x in range(GRID_SIZE):
-            for y in range(GRID_SIZE):
-                rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                self.screen.blit(self.bg_tile, rect)
-                pygame.draw.rect(self.screen, (180, 180, 180), rect, 1)  # grid lines
-
-    def draw_agent(self, agent_pos):
-        x, y = agent_pos
-        self.screen.blit(self.agent_sprite, (x * CELL_SIZE + 20, y * CELL_SIZE + 20))
-
-    def draw_fish(self, fish_status):
-        for (fx, fy), is_hungry in fish_status:
-            sprite = self.fish_hungry_sprite if is_hungry else self.fish_fed_sprite
-            self.screen.blit(sprite, (fx * CELL_SIZE + 20, fy * CELL_SIZE + 20))
+        # Pre-composited cells keyed by (is_hungry, has_agent): tile, grid line, drone, fish
+        self.cell_surfaces = {}
+        for is_hungry in (False, True):
+            for has_agent in (False, True):
+                cell = pygame.Surface((self.cell_size, self.cell_size))
+                cell.blit(self.bg_tile, (0, 0))
+                pygame.draw.rect(cell, (180, 180, 180), cell.get_rect(), 1)  # grid lines
+                if has_agent:
+                    cell.blit(self.agent_sprite, (self.sprite_offset, self.sprite_offset))
+                sprite = self.fish_hungry_sprite if is_hungry else self.fish_fed_sprite
+                cell.blit(sprite, (self.sprite_offset, self.sprite_offset))
+                self.cell_surfaces[(is_hungry, has_agent)] = cell
+
+        # Legend pieces and the area they cover
+        self.legend_items = [(sprite, (x, self.height - 30)) for sprite, x in zip(legend_sprites, (10, 90, 170))]
+        for label, x in [("Drone", 10), ("Fed", 90), ("Hungry", 170)]:
+            self.legend_items.append((self.font.render(label, True, TEXT_COLOR), (x + 25, self.height - 10)))
+        self.legend_rect = self._bounds(self.legend_items)
+
+        # Rasterized HUD pieces, keyed by text
+        self.text_cache = {}
+        self.hud_items = []
+        self.hud_rect = pygame.Rect(0, 0, 0, 0)
+
+        # Last drawn hunger grid and drone cells; None forces a full redraw
+        self.drawn_hunger = None
+        self.drawn_drones = set()
+
+    @staticmethod
+    def _bounds(items):
+        rects = [surface.get_rect(topleft=pos) for surface, pos in items]
+        return rects[0].unionall(rects[1:])
+
+    def _cell_rect(self, x, y):
+        size = self.cell_size
+        return pygame.Rect(x * size, y * size, size, size)
+
+    def _text(self, text):
+        surface = self.text_cache.get(text)
+        if surface is None:
+            surface = self.text_cache[text] = self.font.render(text, True, TEXT_COLOR)
+        return surface
+
+    def _layout_hud(self, pieces, pos=(10, 5)):
+        x, y = pos
+        items = []
+        for piece in pieces:
+            surface = self._text(piece)
+            items.append((surface, (x, y)))
+            x += surface.get_width()
+        return items
 
     def draw_legend(self):
-        self.screen.blit(self.agent_sprite, (10, HEIGHT - 30))
-        self.screen.blit(self.fish_fed_sprite, (90, HEIGHT - 30))
-        self.screen.blit(self.fish_hungry_sprite, (170, HEIGHT - 30))
-
-        labels = [("Drone", 10), ("Fed", 90), ("Hungry", 170)]
-        for label, x in labels:
-            text = self.font.render(label, True, (0, 0, 0))
-            self.screen.blit(text, (x + 25, HEIGHT - 10))
+        for surface, pos in self.legend_items:
+            self.screen.blit(surface, pos)
+
+    def _redraw(self, rect, hunger, drones):
+        """Repaints everything that overlaps `rect`, clipped to it."""
+        self.screen.set_clip(rect)
+        size, last = self.cell_size, self.grid_size - 1
+        x0, x1 = rect.left // size, min((rect.right - 1) // size, last)
+        y0, y1 = rect.top // size, min((rect.bottom - 1) // size, last)
+        rows = hunger[y0:y1 + 1, x0:x1 + 1].tolist()
+        for y, row in enumerate(rows, y0):
+            for x, is_hungry in enumerate(row, x0):
+                self.screen.blit(self.cell_surfaces[(is_hungry, (x, y) in drones)], (x * size, y * size))
+        if rect.colliderect(self.legend_rect):
+            self.draw_legend()
+        if rect.colliderect(self.hud_rect):
+            for surface, pos in self.hud_items:
+                self.screen.blit(surface, pos)
+        self.screen.set_clip(None)
 
     def render(self, step=0, reward=0.0):
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-        self.screen.fill((255, 255, 255))  # white background
-        self.draw_grid()
-        self.draw_agent(self.env.agent_pos)
+        if self.render_mode == "human":
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
 
-        fish_info = []
-        for y in range(self.env.grid_size):
-            for x in range(self.env.grid_size):
-                is_hungry = self.env.fish_hunger[y][x] == 1
-                fish_info.append(((x, y), is_hungry))
-        self.draw_fish(fish_info)
-
-        self.draw_legend()
+        # One [x, y] drone position, or one per drone for a fleet tank
+        drones = {tuple(pos) for pos in np.reshape(self.env.agent_pos, (-1, 2)).tolist()}
+        hunger = np.asarray(self.env.fish_hunger) == 1
 
         # HUD
-        info = f"Step: {step}  |  Reward: {reward:.2f}  |  Fish Fed: {self.env.fish_fed_count}"
-        hud = self.font.render(info, True, (0, 0, 0))
-        self.screen.blit(hud, (10, 5))
-
-        pygame.display.flip()
+        old_hud_rect = self.hud_rect
+        self.hud_items = self._layout_hud([
+            "Step: ", str(step), "  |  Reward: ", f"{reward:.2f}",
+            "  |  Fish Fed: ", str(self.env.fish_fed_count),
+        ])
+        self.hud_rect = self._bounds(self.hud_items)
+
+        if self.drawn_hunger is None:
+            dirty = [self.screen.get_rect()]
+        else:
+            changed = {(x, y) for y, x in np.argwhere(hunger != self.drawn_hunger).tolist()}
+            changed |= drones ^ self.drawn_drones
+            dirty = [self._cell_rect(x, y) for x, y in changed]
+            dirty.append(self.hud_rect.union(old_hud_rect))
+        for rect in dirty:
+            self._redraw(rect, hunger, drones)
+        self.drawn_hunger = hunger
+        self.drawn_drones = drones
+
+        if self.render_mode == "rgb_array":
+            # Row-major RGB bytes, so no (x, y) -> (y, x) transpose is needed
+            frame = np.frombuffer(bytearray(pygame.image.tobytes(self.screen, "RGB")), dtype=np.uint8)
+            return frame.reshape(self.height, self.width, 3)
+
+        pygame.display.update(dirty)
         self.clock.tick(FPS)
 
     def close(self):
-        pygame.quit()
+        if self.render_mode == "human":
+            pygame.quit()
@@ -0,0 +1,244 @@
+# ✅ Shared-Memory Subprocess Vector Environment
+# Spreads fish tanks over worker processes. Actions, observations, rewards and
+# done flags travel through shared-memory arrays; the pipes only carry short
+# commands and the (usually empty) info dicts; valid-action masks have their
+# own shared array.
+
+import multiprocessing as mp
+import os
+
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper, VecEnv
+
+from Environment.custom_env import spawn_seeds
+from Environment.vec_env import FishFeedingVecEnv
+
+
+def _shared_array(ctx, shape, dtype):
+    dtype = np.dtype(dtype)
+    raw = ctx.RawArray("b", int(np.prod(shape)) * dtype.itemsize)
+    return raw, shape, dtype
+
+
+def _as_numpy(spec):
+    raw, shape, dtype = spec
+    return np.frombuffer(raw, dtype=dtype).reshape(shape)
+
+
+def _answer(remote, fn, *args, **kwargs):
+    """Sends fn's per-env results, or the exception it raised so the parent can re-raise it."""
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as error:
+        remote.send(error)
+    else:
+        remote.send(result)
+
+
+def _set_attr(venv, attr_name, value, indices):
+    venv.set_attr(attr_name, value, indices)
+    return [None for _ in indices]
+
+
+def _worker(remote, parent_remote, vec_env_fn_wrapper, n_envs, start, buffers):
+    parent_remote.close()
+    venv = vec_env_fn_wrapper.var(n_envs)
+    stop = start + n_envs
+    actions, obs, rewards, dones, truncated, terminal_obs, action_masks = (
+        _as_numpy(b)[start:stop] for b in buffers)
+
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                step_obs, step_rewards, step_dones, infos = venv.step(actions)
+                obs[:] = step_obs
+                rewards[:] = step_rewards
+                dones[:] = step_dones
+                # Only the infos that carry more than the standard keys go through the pipe
+                extra = {}
+                for i, info in enumerate(infos):
+                    truncated[i] = info.pop("TimeLimit.truncated", False)
+                    if "terminal_observation" in info:
+                        terminal_obs[i] = info.pop("terminal_observation")
+                    if "action_mask" in info:
+                        action_masks[i] = info.pop("action_mask")
+                    if info:
+                        extra[i] = info
+                remote.send(extra)
+            elif cmd == "reset":
+                seeds, options = data
+                venv._seeds = seeds
+                venv._options = options
+                obs[:] = venv.reset()
+                remote.send(venv.reset_infos)
+            elif cmd == "get_attr":
+                _answer(remote, venv.get_attr, *data)
+            elif cmd == "set_attr":
+                _answer(remote, _set_attr, venv, *data)
+            elif cmd == "env_method":
+                name, args, kwargs, indices = data
+                _answer(remote, venv.env_method, name, *args, indices=indices, **kwargs)
+            elif cmd == "env_is_wrapped":
+                _answer(remote, venv.env_is_wrapped, *data)
+            elif cmd == "get_images":
+                remote.send(venv.get_images())
+            elif cmd == "close":
+                venv.close()
+                remote.close()
+                break
+            else:
+                raise NotImplementedError(f"`{cmd}` is not implemented in the worker")
+    except KeyboardInterrupt:
+        pass
+
+
+class SharedMemoryVecEnv(VecEnv):
+    """
+    Subprocess vector env for the fish tanks, backed by shared memory.
+
+    Each of the `n_workers` processes steps `envs_per_worker` tanks through its own
+    vectorized env (FishFeedingVecEnv by default) and writes the results straight
+    into arrays shared with the parent, so nothing but commands gets pickled on
+    the hot path. `seed(s)` spawns the tank seeds from the root seed s like the
+    in-process env, so both play the same tanks, and no two workers share a stream.
+
+    :param n_workers: number of worker processes (defaults to the CPU count)
+    :param envs_per_worker: tanks stepped by each worker
+    :param vec_env_fn: builds a worker's VecEnv from its tank count
+    :param start_method: multiprocessing start method (defaults to forkserver when available)
+    """
+
+    def __init__(self, n_workers=None, envs_per_worker=1, vec_env_fn=None, start_method=None):
+        self.waiting = False
+        self.closed = False
+        self.n_workers = n_workers or os.cpu_count()
+        self.envs_per_worker = envs_per_worker
+        n_envs = self.n_workers * envs_per_worker
+        vec_env_fn = vec_env_fn or FishFeedingVecEnv
+
+        # Probe one tank for the spaces (and whether its infos carry action masks) before starting the workers
+        probe = vec_env_fn(1)
+        observation_space, action_space = probe.observation_space, probe.action_space
+        probe.reset()
+        self._has_masks = "action_mask" in probe.reset_infos[0]
+        n_masked = len(probe.reset_infos[0]["action_mask"]) if self._has_masks else 0
+        probe.close()
+
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+
+        obs_shape = (n_envs, *observation_space.shape)
+        self._buffers = [
+            _shared_array(ctx, (n_envs, *action_space.shape), action_space.dtype),
+            _shared_array(ctx, obs_shape, observation_space.dtype),
+            _shared_array(ctx, (n_envs,), np.float32),
+            _shared_array(ctx, (n_envs,), np.bool_),
+            _shared_array(ctx, (n_envs,), np.bool_),
+            _shared_array(ctx, obs_shape, observation_space.dtype),
+            _shared_array(ctx, (n_envs, n_masked), np.bool_),
+        ]
+        (self._actions, self._obs, self._rewards, self._dones, self._truncated, self._terminal_obs,
+         self._action_masks) = (_as_numpy(b) for b in self._buffers)
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(self.n_workers)])
+        self.processes = []
+        for w, (work_remote, remote) in enumerate(zip(self.work_remotes, self.remotes)):
+            args = (work_remote, remote, CloudpickleWrapper(vec_env_fn), envs_per_worker,
+                    w * envs_per_worker, self._buffers)
+            # daemon=True: if the main process crashes, we should not cause things to hang
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        super().__init__(n_envs, observation_space, action_space)
+
+    def seed(self, seed=None):
+        """Tank seeds spawned from the root `seed`, sent to the workers by the next reset."""
+        self._seeds = spawn_seeds(seed, self.num_envs)
+        return self._seeds
+
+    def _split(self, per_env):
+        k = self.envs_per_worker
+        return [per_env[w * k:(w + 1) * k] for w in range(self.n_workers)]
+
+    def _targets(self, indices):
+        """Group global env indices by worker as {worker: [local indices]}."""
+        targets = {}
+        for i in self._get_indices(indices):
+            targets.setdefault(i // self.envs_per_worker, []).append(i % self.envs_per_worker)
+        return targets
+
+    def _call(self, cmd, make_data, indices):
+        """Runs cmd on the workers holding `indices`; returns the per-env results in the order of `indices`."""
+        indices = list(self._get_indices(indices))
+        targets = self._targets(indices)
+        for w, local in targets.items():
+            self.remotes[w].send((cmd, make_data(local)))
+        replies = {w: self.remotes[w].recv() for w in targets}
+        for reply in replies.values():
+            if isinstance(reply, Exception):
+                raise reply
+        # Each worker answered its local indices in the order they were sent
+        results = {w: iter(reply) for w, reply in replies.items()}
+        return [next(results[i // self.envs_per_worker]) for i in indices]
+
+    def step_async(self, actions):
+        self._actions[:] = np.asarray(actions).reshape(self._actions.shape)
+        for remote in self.remotes:
+            remote.send(("step", None))
+        self.waiting = True
+
+    def step_wait(self):
+        extras = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+        infos = [{"TimeLimit.truncated": bool(t)} for t in self._truncated]
+        for w, extra in enumerate(extras):
+            for i, info in extra.items():
+                infos[w * self.envs_per_worker + i].update(info)
+        for i in np.flatnonzero(self._dones):
+            infos[i]["terminal_observation"] = self._terminal_obs[i].copy()
+        if self._has_masks:
+            for info, mask in zip(infos, self._action_masks.copy()):
+                info["action_mask"] = mask
+        return self._obs.copy(), self._rewards.copy(), self._dones.copy(), infos
+
+    def reset(self):
+        for remote, seeds, options in zip(self.remotes, self._split(self._seeds), self._split(self._options)):
+            remote.send(("reset", (seeds, options)))
+        self.reset_infos = [info for remote in self.remotes for info in remote.recv()]
+        # Seeds and options are only used once
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs.copy()
+
+    def close(self):
+        if self.closed:
+            return
+        if self.waiting:
+            for remote in self.remotes:
+                remote.recv()
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+    def get_images(self):
+        for remote in self.remotes:
+            remote.send(("get_images", None))
+        return [image for remote in self.remotes for image in remote.recv()]
+
+    def get_attr(self, attr_name, indices=None):
+        return self._call("get_attr", lambda local: (attr_name, local), indices)
+
+    def set_attr(self, attr_name, value, indices=None):
+        self._call("set_attr", lambda local: (attr_name, value, local), indices)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return self._call("env_method", lambda local: (method_name, method_args, method_kwargs, local), indices)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return self._call("env_is_wrapped", lambda local: (wrapper_class, local), indices)
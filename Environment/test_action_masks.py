@@ -0,0 +1,64 @@
+# ✅ Action mask tests
+# The masks the policies compute from observations (action_masks_from_obs)
+# must be the masks the envs report in info["action_mask"].
+#
+# Usage:
+#     python -m pytest -q Environment/test_action_masks.py
+
+import numpy as np
+import pytest
+import torch as th
+
+from Environment.custom_env import FishFeedingEnv, action_masks_from_obs
+from Environment.vec_env import FishFeedingVecEnv
+
+N_STEPS = 1000
+
+
+@pytest.mark.parametrize("env_kwargs", [{}, {"obs_window": 3}, {"grid_size": 7}, {"grid_size": 100}])
+def test_masks_from_obs_match_env(env_kwargs):
+    env = FishFeedingEnv(**env_kwargs)
+    obs, info = env.reset(seed=1)
+    rng = np.random.default_rng(0)
+    for _ in range(N_STEPS):
+        np.testing.assert_array_equal(action_masks_from_obs(obs, env.obs_window), info["action_mask"])
+        np.testing.assert_array_equal(action_masks_from_obs(obs, env.obs_window), env.action_masks())
+        # Only valid actions, so the agent also walks the grid edges
+        obs, _, terminated, truncated, info = env.step(rng.choice(np.flatnonzero(info["action_mask"])))
+        if terminated or truncated:
+            obs, info = env.reset()
+
+
+@pytest.mark.parametrize("env_kwargs", [{}, {"obs_window": 3}])
+def test_batched_masks_match_infos(env_kwargs):
+    env = FishFeedingVecEnv(16, **env_kwargs)
+    env.seed(3)
+    obs = env.reset()
+    masks = np.stack([info["action_mask"] for info in env.reset_infos])
+    rng = np.random.default_rng(0)
+    for _ in range(N_STEPS // 10):
+        np.testing.assert_array_equal(action_masks_from_obs(obs, env.obs_window), masks)
+        torch_masks = action_masks_from_obs(th.as_tensor(obs), env.obs_window)
+        assert torch_masks.dtype == th.bool
+        np.testing.assert_array_equal(torch_masks.numpy(), masks)
+        obs, _, _, infos = env.step(rng.integers(0, 6, env.num_envs))
+        masks = np.stack([info["action_mask"] for info in infos])
+
+
+def test_mask_rules():
+    env = FishFeedingEnv()
+    env.reset(seed=0)
+    env.agent_pos = [0, 0]
+    env.fish_hunger[0, 0] = 1
+    # [up, down, left, right, feed, skip]: walls at the top-left corner, a hungry fish underneath
+    np.testing.assert_array_equal(env.action_masks(), [False, True, False, True, True, False])
+
+
+def test_masked_policies_reject_multi_drone_fleets():
+    from Training.experiment_runner import resolve_model
+
+    job = {"algorithm": "ppo", "action_mask": True, "env": {"type": "fleet", "n_drones": 4}}
+    with pytest.raises(ValueError):
+        resolve_model(job)
+    job["env"]["n_drones"] = 1  # One drone: the fleet's masks are FishFeedingEnv's
+    resolve_model(job)
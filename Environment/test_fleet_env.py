@@ -0,0 +1,62 @@
+# ✅ FishFleetVecEnv tests
+# With one drone per tank, both fleet modes must reproduce a DummyVecEnv over
+# FishFeedingEnv copies step for step, auto-resets and terminal observations
+# included.
+#
+# Usage:
+#     python -m pytest -q Environment/test_fleet_env.py
+
+import numpy as np
+import pytest
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from Environment.custom_env import FishFeedingEnv
+from Environment.fleet_env import MODES, FishFleetVecEnv
+from Environment.test_vec_env import CURRICULUM, assert_same_step
+
+N_TANKS = 8
+N_STEPS = 1000
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("env_kwargs", [{}, {"obs_window": 3}])
+def test_single_drone_matches_fish_feeding_env(mode, env_kwargs):
+    dummy = DummyVecEnv([lambda: FishFeedingEnv(**env_kwargs) for _ in range(N_TANKS)])
+    fleet = FishFleetVecEnv(N_TANKS, n_drones=1, mode=mode, **env_kwargs)
+    dummy._seeds = list(fleet.seed(123))
+    np.testing.assert_array_equal(dummy.reset(), fleet.reset())
+
+    rng = np.random.default_rng(0)
+    episodes = 0
+    for t in range(N_STEPS):
+        if t in CURRICULUM:
+            for env in (dummy, fleet):
+                env.env_method("set_fish_count", CURRICULUM[t])
+        actions = rng.integers(0, 6, N_TANKS)
+        expected = dummy.step(actions)
+        actual = fleet.step(actions if mode == "shared" else actions[:, None])
+        assert_same_step(expected, actual)
+        for done, info in zip(actual[2], actual[3]):
+            assert ("terminal_observation" in info) == done
+        episodes += actual[2].sum()
+    assert episodes > N_TANKS
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_set_attr_writes_only_the_given_sub_envs(mode):
+    fleet = FishFleetVecEnv(3, n_drones=2, mode=mode)
+    fleet.seed(0)
+    fleet.reset()
+    per_env = fleet.num_envs // fleet.n_tanks
+    fleet.set_attr("water_quality", 0.5, indices=[per_env])  # A sub-env of the second tank
+    fleet.step(np.ones(fleet.n_tanks * fleet.n_drones, dtype=np.int64))  # Every drone moves down: no overfeed
+    assert fleet.get_attr("water_quality") == [1.0] * per_env + [0.5] * per_env + [1.0] * per_env
+    assert fleet._obs[per_env, -3 if mode == "shared" else 25] == 0.5
+
+    fleet.set_attr("fish_hunger", np.zeros((5, 5), dtype=np.int64), indices=[0])
+    assert fleet.hungry_count[0] == 0 and fleet.hungry_count[1:].all()
+
+    fleet.set_attr("max_steps", 10)
+    assert fleet.max_steps == 10
+    with pytest.raises(ValueError):
+        fleet.set_attr("max_steps", 20, indices=[0])
@@ -0,0 +1,66 @@
+# ✅ SharedMemoryVecEnv parity tests
+# Tanks stepped in worker processes over shared memory must reproduce a
+# DummyVecEnv over FishFeedingEnv copies, auto-resets and terminal observations
+# included.
+#
+# Usage:
+#     python -m pytest -q Environment/test_shm_vec_env.py
+
+import numpy as np
+import pytest
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from Environment.custom_env import FishFeedingEnv
+from Environment.shm_vec_env import SharedMemoryVecEnv
+from Environment.test_vec_env import CURRICULUM, assert_same_step
+
+N_WORKERS = 2
+ENVS_PER_WORKER = 4
+N_STEPS = 1000
+
+
+@pytest.fixture
+def shm_env():
+    env = SharedMemoryVecEnv(n_workers=N_WORKERS, envs_per_worker=ENVS_PER_WORKER)
+    yield env
+    env.close()
+
+
+def test_matches_dummy_vec_env(shm_env):
+    n_envs = N_WORKERS * ENVS_PER_WORKER
+    dummy = DummyVecEnv([FishFeedingEnv for _ in range(n_envs)])
+    dummy._seeds = list(shm_env.seed(7))
+    np.testing.assert_array_equal(dummy.reset(), shm_env.reset())
+
+    rng = np.random.default_rng(0)
+    episodes = 0
+    for t in range(N_STEPS):
+        if t in CURRICULUM:
+            for env in (dummy, shm_env):
+                env.env_method("set_fish_count", CURRICULUM[t])
+        actions = rng.integers(0, 6, n_envs)
+        expected, actual = dummy.step(actions), shm_env.step(actions)
+        assert_same_step(expected, actual)
+        for done, info in zip(actual[2], actual[3]):
+            assert ("terminal_observation" in info) == done
+        episodes += actual[2].sum()
+    assert episodes > n_envs
+
+
+def test_attributes_reach_the_right_workers(shm_env):
+    shm_env.seed(0)
+    shm_env.reset()
+    shm_env.set_attr("water_quality", 0.5, indices=[1, 6])
+    assert shm_env.get_attr("water_quality") == [1.0, 0.5, 1.0, 1.0, 1.0, 1.0, 0.5, 1.0]
+
+
+def test_calls_answer_in_the_order_of_indices(shm_env):
+    shm_env.seed(0)
+    shm_env.reset()
+    shm_env.set_attr("steps", 10, indices=[2])
+    shm_env.set_attr("steps", 20, indices=[5])
+    assert shm_env.get_attr("steps", indices=[5, 0, 2]) == [20, 0, 10]
+    assert shm_env.env_method("set_fish_count", 3, indices=[6, 1]) == [None, None]
+    with pytest.raises(ValueError):
+        shm_env.set_attr("max_steps", 3, indices=[1])  # Shared by the worker's tanks
+    assert shm_env.get_attr("max_steps", indices=[1]) == [50]  # The worker survived the error
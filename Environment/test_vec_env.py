@@ -0,0 +1,89 @@
+# ✅ FishFeedingVecEnv parity tests
+# The batched env must reproduce a DummyVecEnv over FishFeedingEnv copies step
+# for step, auto-resets, terminal observations and curriculum fish counts
+# (set_fish_count mid-run) included.
+#
+# Usage:
+#     python -m pytest -q Environment/test_vec_env.py
+
+import numpy as np
+import pytest
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from Environment.custom_env import FishFeedingEnv
+from Environment.vec_env import FishFeedingVecEnv
+
+N_ENVS = 8
+N_STEPS = 1000
+CURRICULUM = {300: 3, 700: None}  # Step -> fish count set on every tank (None: back to density)
+
+
+def assert_same_step(expected, actual):
+    """
+    Obs, rewards, dones and every info key of two VecEnv step results are equal,
+    except the action mask of finished sub-envs: the batched envs report the
+    mask of the returned (reset) observation, DummyVecEnv that of the terminal one.
+    """
+    for a, b in zip(expected[:3], actual[:3]):
+        np.testing.assert_array_equal(a, b)
+    for info_a, info_b, done in zip(expected[3], actual[3], expected[2]):
+        assert info_a.keys() == info_b.keys()
+        for key in info_a:
+            if not (done and key == "action_mask"):
+                np.testing.assert_array_equal(info_a[key], info_b[key])
+
+
+@pytest.mark.parametrize("env_kwargs", [{}, {"obs_window": 3}, {"grid_size": 7, "max_steps": 30}])
+def test_matches_dummy_vec_env(env_kwargs):
+    dummy = DummyVecEnv([lambda: FishFeedingEnv(**env_kwargs) for _ in range(N_ENVS)])
+    vec = FishFeedingVecEnv(N_ENVS, **env_kwargs)
+    dummy._seeds = list(vec.seed(123))
+    np.testing.assert_array_equal(dummy.reset(), vec.reset())
+
+    rng = np.random.default_rng(0)
+    episodes = 0
+    for t in range(N_STEPS):
+        if t in CURRICULUM:
+            for env in (dummy, vec):
+                env.env_method("set_fish_count", CURRICULUM[t])
+        actions = rng.integers(0, 6, N_ENVS)
+        expected, actual = dummy.step(actions), vec.step(actions)
+        assert_same_step(expected, actual)
+        for done, info in zip(actual[2], actual[3]):
+            assert ("terminal_observation" in info) == done
+        np.testing.assert_array_equal(np.stack([info["action_mask"] for info in actual[3]]),
+                                      np.stack(dummy.env_method("action_masks")))
+        episodes += actual[2].sum()
+    assert episodes > N_ENVS  # Auto-reset was exercised in every sub-env on average
+
+
+def test_set_attr_writes_only_the_given_tanks():
+    vec = FishFeedingVecEnv(4)
+    vec.seed(0)
+    vec.reset()
+    vec.set_attr("water_quality", 0.5, indices=[1, 3])
+    assert vec.get_attr("water_quality") == [1.0, 0.5, 1.0, 0.5]
+
+
+def test_set_attr_fish_hunger_matches_dummy_vec_env():
+    dummy = DummyVecEnv([FishFeedingEnv for _ in range(2)])
+    vec = FishFeedingVecEnv(2)
+    dummy._seeds = list(vec.seed(5))
+    dummy.reset()
+    vec.reset()
+    empty = np.zeros((vec.grid_size, vec.grid_size), dtype=np.int64)
+    for env in (dummy, vec):
+        env.set_attr("fish_hunger", empty, indices=[0])
+    assert vec.hungry_count[0] == 0
+    actions = np.array([1, 1])
+    expected, actual = dummy.step(actions), vec.step(actions)
+    assert_same_step(expected, actual)
+    assert actual[2].tolist() == [True, False] and actual[3][0]["is_success"]
+
+
+def test_set_attr_rejects_partial_indices_for_shared_attributes():
+    vec = FishFeedingVecEnv(2)
+    with pytest.raises(ValueError):
+        vec.set_attr("max_steps", 3, indices=[1])
+    vec.set_attr("max_steps", 3, indices=[0, 1])
+    assert vec.max_steps == 3
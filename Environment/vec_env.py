@@ -0,0 +1,288 @@
+# ✅ Batched Fish Feeding Environment
+# Steps N fish tanks at once with vectorized NumPy operations instead of looping
+# over N copies of FishFeedingEnv inside a DummyVecEnv.
+
+import numpy as np
+from gymnasium import spaces
+from gymnasium.utils import seeding
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from Environment.custom_env import draw_hunger, place_fish, placement_generator, spawn_seeds
+
+# Per-action displacement: 0=up, 1=down, 2=left, 3=right, 4=feed, 5=skip
+ACTION_DX = np.array([0, 0, -1, 1, 0, 0], dtype=np.int64)
+ACTION_DY = np.array([-1, 1, 0, 0, 0, 0], dtype=np.int64)
+FEED_ACTION = 4
+SKIP_ACTION = 5
+
+# Per-tank state exposed through get_attr under the same names as FishFeedingEnv
+TANK_ATTRS = ("fish_hunger", "agent_pos", "water_quality", "steps", "fish_fed_count")
+
+LAYOUT_BANK_CELLS = 1024  # Hunger cells drawn ahead per tank by default (40 layouts of a 5x5 tank)
+
+
+class FishFeedingVecEnv(VecEnv):
+    """
+    SB3-compatible vectorized version of FishFeedingEnv.
+
+    All tanks live in stacked arrays (hunger grids, agent positions, water quality,
+    step counters) and every call to step applies moves, feeding, rewards,
+    termination and auto-reset to all of them at once. For the same seeds it
+    produces exactly the trajectories of a DummyVecEnv over FishFeedingEnv copies.
+
+    `get_attr` answers the FishFeedingEnv state names per tank, and `env_method`
+    calls methods of this class that accept an `indices` keyword.
+
+    Tank size, step budget, fish density and the egocentric `obs_window` work
+    as in FishFeedingEnv; hunger is always kept as dense grids here. So does the
+    curriculum: `env_method("set_fish_count", n)` sets the fish count of every
+    tank (or of `indices`) for their next resets.
+
+    Every tank draws from its own generator. `seed(s)` spawns the tank seeds
+    from the root seed s with SeedSequence (see spawn_seeds), so tanks never
+    share a stream, within a run or across runs. Each tank draws the hunger
+    layouts of its next `layout_batch` episodes in one call and hands them out
+    at its resets: the same layouts, in the same order, as drawing them one
+    reset at a time. Fish-count placements come from a child generator of the
+    tank's (see placement_generator), so the bank doesn't shift them.
+    `set_options({"hunger": grid})` makes the next reset() start from a given
+    layout (e.g. to replay an episode).
+
+    Valid-action masks work as in FishFeedingEnv: `env_method("action_masks")`
+    returns one per tank, and every reset and step info carries the mask of
+    the returned observation (after the auto-reset for finished tanks) under
+    "action_mask".
+    """
+
+    def __init__(self, num_envs=8, render_mode=None, grid_size=5, max_steps=50, fish_density=0.5,
+                 obs_window=None, fish_count=None, layout_batch=None):
+        if obs_window is not None and obs_window % 2 == 0:
+            raise ValueError(f"obs_window must be odd so the agent sits in its centre, got {obs_window}")
+        self.grid_size = grid_size  # Tank is grid_size x grid_size
+        self.max_steps = max_steps
+        self.fish_density = fish_density
+        self.obs_window = obs_window
+        self.render_mode = render_mode
+
+        n_obs_cells = grid_size * grid_size if obs_window is None else obs_window * obs_window
+        observation_space = spaces.Box(low=0, high=1, shape=(n_obs_cells + 3,), dtype=np.float32)
+        super().__init__(num_envs, observation_space, spaces.Discrete(6))
+
+        n, g = self.num_envs, self.grid_size
+        if obs_window is None:
+            self.fish_hunger = np.zeros((n, g, g), dtype=np.int64)
+        else:
+            # Hunger grids with a border of empty cells, so windows never need bounds checks
+            r = obs_window // 2
+            self._padded = np.zeros((n, g + 2 * r, g + 2 * r), dtype=np.int64)
+            self.fish_hunger = self._padded[:, r:r + g, r:r + g]
+            offsets = np.arange(obs_window)
+            self._window_dy = offsets[None, :, None]
+            self._window_dx = offsets[None, None, :]
+        self.agent_pos = np.zeros((n, 2), dtype=np.int64)  # columns: x, y
+        self.water_quality = np.ones(n, dtype=np.float64)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.fish_fed_count = np.zeros(n, dtype=np.int64)
+        self.hungry_count = np.zeros(n, dtype=np.int64)
+
+        self._rngs = [None] * n
+        self._placement_rngs = [None] * n  # Fish-count placements, see placement_generator
+        self._tanks = np.arange(n)
+        self._coords = np.arange(g) / max(g - 1, 1)  # normalized x/y
+        self._obs = np.zeros((n, n_obs_cells + 3), dtype=np.float32)
+        self._rewards = np.zeros(n, dtype=np.float32)
+        self._actions = np.zeros(n, dtype=np.int64)
+        self._fish_counts = [fish_count] * n  # Per tank; None draws hunger by density
+        self._mosaic = None  # Renderer for get_images, created on first use
+
+        # Layouts drawn ahead per tank; a bank is used up when its cursor reaches layout_batch
+        self.layout_batch = layout_batch or max(1, LAYOUT_BANK_CELLS // (g * g))
+        self._layouts = np.zeros((n, self.layout_batch, g, g), dtype=np.int8)
+        self._layout_next = np.full(n, self.layout_batch)
+
+    # ------------------------------------------------------------------
+    # Tank state
+    # ------------------------------------------------------------------
+    def seed(self, seed=None):
+        """Tank seeds spawned from the root `seed`, used by the next reset."""
+        self._seeds = spawn_seeds(seed, self.num_envs)
+        return self._seeds
+
+    def _reset_tanks(self, tanks):
+        g = self.grid_size
+        by_density = []
+        for i in tanks:
+            seed = self._seeds[i]
+            if seed is not None or self._rngs[i] is None:
+                self._rngs[i], _ = seeding.np_random(seed)
+                self._placement_rngs[i] = placement_generator(self._rngs[i])
+                self._layout_next[i] = self.layout_batch  # Drawn from the previous generator
+            hunger = self._options[i].get("hunger")
+            if hunger is not None:
+                self.fish_hunger[i] = hunger
+            elif self._fish_counts[i] is None:
+                by_density.append(i)
+            else:
+                self.fish_hunger[i] = 0
+                cells = place_fish(self._placement_rngs[i], g, self._fish_counts[i])
+                self.fish_hunger[i, cells // g, cells % g] = 1
+        if by_density:
+            self._next_layouts(np.array(by_density))
+        self.agent_pos[tanks] = 0  # Start in top-left corner
+        self.water_quality[tanks] = 1.0
+        self.steps[tanks] = 0
+        self.fish_fed_count[tanks] = 0
+        self.hungry_count[tanks] = self.fish_hunger[tanks].reshape(len(tanks), -1).sum(axis=1)
+
+    def _next_layouts(self, tanks):
+        """Sets the hunger grids of `tanks` from their layout banks, refilling the used-up banks."""
+        for i in tanks[self._layout_next[tanks] == self.layout_batch]:
+            self._layouts[i] = draw_hunger(self._rngs[i], self.grid_size, self.fish_density, n=self.layout_batch)
+            self._layout_next[i] = 0
+        self.fish_hunger[tanks] = self._layouts[tanks, self._layout_next[tanks]]
+        self._layout_next[tanks] += 1
+
+    def set_fish_count(self, count, indices=None):
+        """Hungry fish placed by the next resets of the tanks; None draws them by density."""
+        if count is not None and not 0 <= count <= self.grid_size * self.grid_size:
+            raise ValueError(f"fish_count must be between 0 and {self.grid_size * self.grid_size}, got {count}")
+        for i in self._get_indices(indices):
+            self._fish_counts[i] = count
+        return [None for _ in self._get_indices(indices)]
+
+    def _action_masks(self):
+        """(num_envs, 6) valid actions of every tank: no moves into walls, feed hungry cells, skip fed ones."""
+        x, y = self.agent_pos[:, 0], self.agent_pos[:, 1]
+        last = self.grid_size - 1
+        hungry = self.fish_hunger[self._tanks, y, x] == 1
+        return np.stack([y > 0, y < last, x > 0, x < last, hungry, ~hungry], axis=1)
+
+    def action_masks(self, indices=None):
+        """Valid-action masks of the tanks (see FishFeedingEnv.action_masks)."""
+        return list(self._action_masks()[list(self._get_indices(indices))])
+
+    def _write_obs(self, tanks=None):
+        if tanks is None:
+            tanks = self._tanks
+        obs = self._obs
+        if self.obs_window is None:
+            obs[tanks, :-3] = self.fish_hunger[tanks].reshape(len(tanks), -1)
+        else:
+            x = self.agent_pos[tanks, 0][:, None, None]
+            y = self.agent_pos[tanks, 1][:, None, None]
+            windows = self._padded[tanks[:, None, None], y + self._window_dy, x + self._window_dx]
+            obs[tanks, :-3] = windows.reshape(len(tanks), -1)
+        obs[tanks, -3] = self.water_quality[tanks]
+        obs[tanks, -2] = self._coords[self.agent_pos[tanks, 0]]
+        obs[tanks, -1] = self._coords[self.agent_pos[tanks, 1]]
+
+    # ------------------------------------------------------------------
+    # VecEnv API
+    # ------------------------------------------------------------------
+    def reset(self):
+        self._reset_tanks(self._tanks)
+        self._write_obs()
+        self.reset_infos = [{"action_mask": mask} for mask in self._action_masks()]
+        # Seeds and options are only used once
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs.copy()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self):
+        actions = self._actions
+        tanks = self._tanks
+        g = self.grid_size
+        self.steps += 1
+
+        # Move (walls turn the move into a no-op)
+        x = np.clip(self.agent_pos[:, 0] + ACTION_DX[actions], 0, g - 1)
+        y = np.clip(self.agent_pos[:, 1] + ACTION_DY[actions], 0, g - 1)
+        self.agent_pos[:, 0] = x
+        self.agent_pos[:, 1] = y
+
+        # Feed / skip against the hunger of the current cell
+        hungry = self.fish_hunger[tanks, y, x] == 1
+        feed = actions == FEED_ACTION
+        fed = feed & hungry
+        overfed = feed & ~hungry
+        skipped = (actions == SKIP_ACTION) & hungry
+
+        rewards = self._rewards
+        rewards.fill(-1)  # Small default penalty
+        rewards[fed] = 10  # Correct feeding
+        rewards[overfed] = -5  # Overfeeding
+        rewards[skipped] = -3  # Skipped feeding
+
+        self.fish_hunger[tanks[fed], y[fed], x[fed]] = 0
+        self.fish_fed_count += fed
+        self.hungry_count -= fed
+        self.water_quality[overfed] -= 0.1
+
+        # Termination Conditions
+        dones = (self.steps >= self.max_steps) | (self.water_quality <= 0.4) | (self.hungry_count == 0)
+
+        self._write_obs()
+        infos = [{"TimeLimit.truncated": False} for _ in range(self.num_envs)]
+        done_tanks = np.flatnonzero(dones)
+        if len(done_tanks):
+            for i in done_tanks:
+                infos[i]["terminal_observation"] = self._obs[i].copy()
+                # Episode outcome, as reported by FishFeedingEnv
+                infos[i]["fish_fed"] = int(self.fish_fed_count[i])
+                infos[i]["water_quality"] = float(self.water_quality[i])
+                infos[i]["is_success"] = bool(self.hungry_count[i] == 0)
+            self._reset_tanks(done_tanks)
+            self._write_obs(done_tanks)
+        for info, mask in zip(infos, self._action_masks()):
+            info["action_mask"] = mask
+
+        return self._obs.copy(), rewards.copy(), dones, infos
+
+    def close(self):
+        pass
+
+    def get_images(self):
+        """Per-tank frames from a MosaicRenderer when render_mode="rgb_array" (no pygame involved)."""
+        if self.render_mode != "rgb_array":
+            return [None for _ in range(self.num_envs)]
+        if self._mosaic is None:
+            from Environment.mosaic import MosaicRenderer
+            self._mosaic = MosaicRenderer(self.num_envs, self.grid_size, padding=0)
+        frames = self._mosaic.tank_frames(self.fish_hunger, self.agent_pos, self.water_quality)
+        return list(frames.copy())
+
+    def get_attr(self, attr_name, indices=None):
+        """Return attribute from the tanks; per-tank state is split by index."""
+        indices = self._get_indices(indices)
+        value = getattr(self, attr_name)
+        if attr_name in TANK_ATTRS:
+            return [value[i].tolist() if attr_name == "agent_pos" else value[i] for i in indices]
+        return [value for _ in indices]
+
+    def set_attr(self, attr_name, value, indices=None):
+        """
+        Set attribute for the tanks; per-tank state is written by index. Other
+        attributes are shared by all tanks and can only be set for every tank.
+        """
+        indices = list(self._get_indices(indices))
+        if attr_name in TANK_ATTRS:
+            for i in indices:
+                getattr(self, attr_name)[i] = value
+            if attr_name == "fish_hunger":
+                self.hungry_count[indices] = self.fish_hunger[indices].reshape(len(indices), -1).sum(axis=1)
+            self._write_obs()
+        elif len(set(indices)) < self.num_envs:
+            raise ValueError(f"'{attr_name}' is shared by all tanks; set it without indices")
+        else:
+            setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        """Call a tank method of this class, which receives the target `indices`."""
+        method = getattr(self, method_name)
+        return method(*method_args, indices=list(self._get_indices(indices)), **method_kwargs)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
@@ -0,0 +1,76 @@
+# video_recorder.py
+# Streams rendered frames straight into an encoder instead of collecting them in
+# a list, so memory stays bounded no matter how long the recording is.
+
+import os
+
+import imageio
+import numpy as np
+
+# The GIF palette is built from the first frame only and reused for the rest:
+# the tank's colors never change, and a palettegen pass over the whole clip
+# would make ffmpeg buffer every frame until the end
+GIF_FILTER = "split[a][b];[a]trim=end_frame=1,palettegen[p];[b][p]paletteuse"
+
+
+class StreamingVideoWriter:
+    """
+    Writes frames to a GIF or MP4 file as they are produced.
+
+    Both formats are encoded by an ffmpeg subprocess (imageio-ffmpeg) that
+    receives each frame through a pipe. Without imageio-ffmpeg, GIFs fall back
+    to imageio's default writer, which keeps the frames until close.
+    """
+
+    def __init__(self, path, fps=1 / 0.7):
+        self.path = path
+        self.fps = fps
+        self.frames_written = 0
+        self.ext = os.path.splitext(path)[1].lower()
+        if self.ext not in (".gif", ".mp4"):
+            raise ValueError(f"Unsupported video format '{self.ext}', use .gif or .mp4")
+
+        try:
+            import imageio_ffmpeg
+        except ImportError:
+            imageio_ffmpeg = None
+        if imageio_ffmpeg is None and self.ext == ".mp4":
+            raise ImportError("Writing MP4 needs imageio-ffmpeg (pip install imageio-ffmpeg)")
+
+        self._ffmpeg = imageio_ffmpeg
+        self._encoder = None  # Started on the first frame, once the size is known
+        self._fallback = None if imageio_ffmpeg else imageio.get_writer(path, mode="I", duration=1 / fps)
+
+    def _start_encoder(self, frame):
+        height, width = frame.shape[:2]
+        if self.ext == ".gif":
+            options = dict(codec="gif", pix_fmt_out="pal8", output_params=["-filter_complex", GIF_FILTER])
+        else:
+            options = dict(codec="libx264", pix_fmt_out="yuv420p")
+        self._encoder = self._ffmpeg.write_frames(
+            self.path, (width, height), fps=self.fps, macro_block_size=1, quality=None,
+            ffmpeg_log_level="error", **options
+        )
+        self._encoder.send(None)  # Start the ffmpeg process
+
+    def append(self, frame):
+        if self._fallback is not None:
+            self._fallback.append_data(frame)
+        else:
+            if self._encoder is None:
+                self._start_encoder(frame)
+            self._encoder.send(np.ascontiguousarray(frame))
+        self.frames_written += 1
+
+    def close(self):
+        if self._fallback is not None:
+            self._fallback.close()
+        elif self._encoder is not None:
+            self._encoder.close()
+            self._encoder = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
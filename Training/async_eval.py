@@ -0,0 +1,261 @@
+"""
+async_eval.py
+=============
+EvalCallback that evaluates in a separate process while training continues.
+
+Every `eval_freq` steps `AsyncEvalCallback` snapshots the model into memory
+(`model.save` to a BytesIO, a few ms for these MLPs) and queues it for an
+evaluation worker. The worker loads the snapshot, plays the evaluation
+episodes on its own env, appends to `evaluations.npz`, writes
+`best_model.zip` on a new best, and sends the result back. The callback picks
+results up as they arrive, logs them under `eval/` and runs
+`callback_on_new_best` / `callback_after_eval` (e.g.
+StopTrainingOnNoModelImprovement) on them, so early stopping works as with
+EvalCallback, only a little later in wall time.
+
+If evaluations fall behind, at most `max_pending` snapshots wait for the
+worker and newer snapshots replace the queued one. At the end of training
+the callback waits for the outstanding evaluations, so the logs and best
+model are complete when `learn()` returns. If the worker dies, the next
+evaluation (or that wait) raises a RuntimeError instead of hanging.
+
+The worker needs a core of its own to pay off: on a single core (or a run
+pinned to one) it competes with training instead of running alongside it.
+"""
+
+import io
+import multiprocessing as mp
+import os
+import queue
+import time
+
+import numpy as np
+from stable_baselines3.common.callbacks import EventCallback
+from stable_baselines3.common.vec_env import DummyVecEnv, VecEnv
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper
+
+WORKER_POLL_SECONDS = 1.0  # How often a blocking wait for results checks that the worker is still alive
+CLOSE_TIMEOUT = 30.0  # Seconds the worker gets to exit after the stop signal before it is terminated
+
+
+# ======================
+# WORKER
+# ======================
+def _save_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _eval_worker(jobs, results, env_fn_wrapper, n_eval_episodes, deterministic, log_path, best_model_save_path):
+    import torch
+    from stable_baselines3.common.evaluation import evaluate_policy
+
+    torch.set_num_threads(1)  # Leave the cores to training
+    eval_env = env_fn_wrapper.var()
+    if not isinstance(eval_env, VecEnv):
+        eval_env = DummyVecEnv([lambda: eval_env])
+
+    timesteps, rewards, lengths, successes = [], [], [], []
+    best_mean_reward = -np.inf
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        num_timesteps, algo_class, snapshot = job
+        start = time.perf_counter()
+        model = algo_class.load(io.BytesIO(snapshot), device="cpu")
+
+        is_success = []
+
+        def log_success(locals_, globals_):
+            if locals_["done"]:
+                maybe_is_success = locals_["info"].get("is_success")
+                if maybe_is_success is not None:
+                    is_success.append(maybe_is_success)
+
+        episode_rewards, episode_lengths = evaluate_policy(
+            model, eval_env, n_eval_episodes=n_eval_episodes, deterministic=deterministic,
+            return_episode_rewards=True, warn=False, callback=log_success,
+        )
+
+        if log_path is not None:
+            timesteps.append(num_timesteps)
+            rewards.append(episode_rewards)
+            lengths.append(episode_lengths)
+            kwargs = {}
+            if is_success:
+                successes.append(is_success)
+                kwargs = dict(successes=successes)
+            np.savez(log_path + ".tmp.npz", timesteps=timesteps, results=rewards, ep_lengths=lengths, **kwargs)
+            os.replace(log_path + ".tmp.npz", log_path + ".npz")
+
+        mean_reward = float(np.mean(episode_rewards))
+        new_best = mean_reward > best_mean_reward
+        if new_best:
+            best_mean_reward = mean_reward
+            if best_model_save_path is not None:
+                _save_atomic(os.path.join(best_model_save_path, "best_model.zip"), snapshot)
+
+        results.put({
+            "timesteps": num_timesteps,
+            "mean_reward": mean_reward,
+            "std_reward": float(np.std(episode_rewards)),
+            "mean_ep_length": float(np.mean(episode_lengths)),
+            "std_ep_length": float(np.std(episode_lengths)),
+            "success_rate": float(np.mean(is_success)) if is_success else None,
+            "new_best": new_best,
+            "seconds": time.perf_counter() - start,
+        })
+    eval_env.close()
+
+
+# ======================
+# CALLBACK
+# ======================
+class AsyncEvalCallback(EventCallback):
+    """
+    Drop-in for EvalCallback that evaluates out of process.
+
+    :param eval_env_fn: builds the evaluation env inside the worker (picklable
+        with cloudpickle; e.g. a functools.partial)
+    :param max_pending: snapshots sent to the worker and not evaluated yet
+    :param start_method: multiprocessing start method (defaults to forkserver when available)
+    Other parameters are those of EvalCallback.
+    """
+
+    def __init__(self, eval_env_fn, callback_on_new_best=None, callback_after_eval=None, n_eval_episodes=5,
+                 eval_freq=10000, log_path=None, best_model_save_path=None, deterministic=True, max_pending=2,
+                 start_method=None, verbose=1):
+        super().__init__(callback_after_eval, verbose=verbose)
+        self.callback_on_new_best = callback_on_new_best
+        if self.callback_on_new_best is not None:
+            self.callback_on_new_best.parent = self
+        self.eval_env_fn = eval_env_fn
+        self.n_eval_episodes = n_eval_episodes
+        self.eval_freq = eval_freq
+        self.best_model_save_path = best_model_save_path
+        self.log_path = os.path.join(log_path, "evaluations") if log_path is not None else None
+        self.deterministic = deterministic
+        self.max_pending = max_pending
+        self.start_method = start_method
+        self.best_mean_reward = -np.inf
+        self.last_mean_reward = -np.inf
+        self.n_pending = 0
+        self.n_skipped = 0
+        self._queued = None  # Newest snapshot waiting for the worker to catch up
+        self._process = None
+
+    def _init_callback(self):
+        if self.best_model_save_path is not None:
+            os.makedirs(self.best_model_save_path, exist_ok=True)
+        if self.log_path is not None:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        if self.callback_on_new_best is not None:
+            self.callback_on_new_best.init_callback(self.model)
+
+        start_method = self.start_method
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+        self._jobs, self._results = ctx.Queue(), ctx.Queue()
+        args = (self._jobs, self._results, CloudpickleWrapper(self.eval_env_fn), self.n_eval_episodes,
+                self.deterministic, self.log_path, self.best_model_save_path)
+        # daemon=True: if the main process crashes, we should not cause things to hang
+        self._process = ctx.Process(target=_eval_worker, args=args, daemon=True)
+        self._process.start()
+
+    def _snapshot(self):
+        buffer = io.BytesIO()
+        self.model.save(buffer)
+        return self.num_timesteps, type(self.model), buffer.getvalue()
+
+    def _submit(self, job):
+        if self.n_pending < self.max_pending:
+            self._jobs.put(job)
+            self.n_pending += 1
+        else:
+            if self._queued is not None:
+                self.n_skipped += 1
+                if self.verbose >= 1:
+                    print(f"⚠️ Evaluation of step {self._queued[0]} skipped: the eval worker is behind")
+            self._queued = job
+
+    def _check_worker(self):
+        if not self._process.is_alive():
+            exitcode, n_pending = self._process.exitcode, self.n_pending
+            self.close()
+            raise RuntimeError(f"Evaluation worker exited with code {exitcode} ({n_pending} evaluation(s) pending)")
+
+    def _on_step(self):
+        continue_training = self._collect()
+        if self.eval_freq > 0 and self.n_calls % self.eval_freq == 0:
+            self._check_worker()
+            self._submit(self._snapshot())
+        return continue_training
+
+    def _collect(self, block=False):
+        """Handles the evaluation results that have arrived; returns whether to keep training."""
+        continue_training = True
+        while self.n_pending:
+            try:
+                result = self._results.get(timeout=WORKER_POLL_SECONDS) if block else self._results.get(block=False)
+            except queue.Empty:
+                if not block:
+                    break
+                self._check_worker()
+                continue
+            self.n_pending -= 1
+            if self._queued is not None:
+                self._submit(self._queued)
+                self._queued = None
+            continue_training = self._on_result(result) and continue_training
+        return continue_training
+
+    def _on_result(self, result):
+        self.last_mean_reward = result["mean_reward"]
+        if self.verbose >= 1:
+            print(f"Eval num_timesteps={result['timesteps']}, "
+                  f"episode_reward={result['mean_reward']:.2f} +/- {result['std_reward']:.2f}")
+            print(f"Episode length: {result['mean_ep_length']:.2f} +/- {result['std_ep_length']:.2f}")
+        self.logger.record("eval/mean_reward", result["mean_reward"])
+        self.logger.record("eval/mean_ep_length", result["mean_ep_length"])
+        self.logger.record("eval/seconds", result["seconds"])
+        self.logger.record("eval/lag_timesteps", self.num_timesteps - result["timesteps"])
+        if result["success_rate"] is not None:
+            if self.verbose >= 1:
+                print(f"Success rate: {100 * result['success_rate']:.2f}%")
+            self.logger.record("eval/success_rate", result["success_rate"])
+
+        continue_training = True
+        if result["new_best"]:
+            if self.verbose >= 1:
+                print("New best mean reward!")
+            self.best_mean_reward = result["mean_reward"]
+            if self.callback_on_new_best is not None:
+                continue_training = self.callback_on_new_best.on_step()
+        if self.callback is not None:
+            continue_training = continue_training and self._on_event()
+        return continue_training
+
+    def _on_training_end(self):
+        # Finish the outstanding evaluations so the logs and best model are complete
+        while self.n_pending:
+            self._collect(block=True)
+        self.close()
+
+    def close(self):
+        if self._process is not None:
+            if self._process.is_alive():
+                self._jobs.put(None)
+                self._process.join(CLOSE_TIMEOUT)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+            self._jobs.cancel_join_thread()  # Snapshots a dead worker never read must not block interpreter exit
+            self._process = None
+
+    def update_child_locals(self, locals_):
+        if self.callback:
+            self.callback.update_locals(locals_)
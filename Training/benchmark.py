@@ -0,0 +1,391 @@
+"""
+benchmark.py
+============
+Speed benchmarks for the environment, renderer and training loops, with JSON
+baselines to catch regressions.
+
+`run` times every benchmark a few times and writes the median of each to a
+JSON file, together with the machine and library versions it ran on.
+`compare` checks a result file against a baseline and exits with status 1
+when any benchmark got slower by more than the threshold, so it can gate CI
+or an overnight job.
+
+Benchmarks:
+    env_step, env_reset, env_obs      single FishFeedingEnv (steps/resets/observations per second)
+    vec_env_step                      FishFeedingVecEnv with 64 tanks (env transitions per second)
+    fleet_step                        FishFleetVecEnv with 64 tanks x 4 drones (drone transitions per second)
+    render_fps                        headless rgb_array frames per second
+    mosaic_fps                        MosaicRenderer frames of 64 tanks per second
+    learn_dqn, learn_ppo, learn_a2c   short learn() runs with the hyperparameters from Training/configs
+    predict_ppo, predict_dqn          single-observation predict latency (ms)
+
+The committed benchmarks/baseline.json is a --quick run. Training/test_benchmark.py
+runs every benchmark under pytest with the baseline's budgets and fails on a
+regression past its threshold. The timings are machine-specific, so that check
+is opt-in (RUN_BENCHMARKS=1), and a CI machine should record its own baseline
+with --save-baseline first.
+
+Usage:
+    python Training/benchmark.py run --save-baseline                   # record benchmarks/baseline.json
+    python Training/benchmark.py run --baseline benchmarks/baseline.json
+    python Training/benchmark.py run --only env_step,render_fps --quick
+    python Training/benchmark.py compare benchmarks/baseline.json benchmarks/latest.json --threshold 0.1
+    RUN_BENCHMARKS=1 python -m pytest -q Training/test_benchmark.py   # BENCHMARK_THRESHOLD=0.1 to tighten
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, "latest.json")
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "configs")
+DEFAULT_THRESHOLD = 0.15  # Allowed slowdown before a benchmark counts as a regression
+
+BENCHMARKS = {}
+
+
+def benchmark(name, unit, higher_is_better=True):
+    """
+    Registers `fn(quick)` as a benchmark. It sets itself up, times one trial
+    and returns the measured value in `unit`.
+    """
+    def register(fn):
+        BENCHMARKS[name] = {"fn": fn, "unit": unit, "higher_is_better": higher_is_better}
+        return fn
+    return register
+
+
+def _timed(fn, n):
+    """Calls fn() n times and returns calls per second."""
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - start)
+
+
+# ======================
+# ENVIRONMENT
+# ======================
+@benchmark("env_step", "steps/s")
+def bench_env_step(quick):
+    from Environment.custom_env import FishFeedingEnv
+
+    env = FishFeedingEnv()
+    env.reset(seed=0)
+    n = 20_000 if quick else 200_000
+    actions = np.random.default_rng(0).integers(0, 6, n).tolist()
+    start = time.perf_counter()
+    for action in actions:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+    return n / (time.perf_counter() - start)
+
+
+@benchmark("env_reset", "resets/s")
+def bench_env_reset(quick):
+    from Environment.custom_env import FishFeedingEnv
+
+    env = FishFeedingEnv()
+    env.reset(seed=0)
+    return _timed(env.reset, 20_000 if quick else 50_000)
+
+
+@benchmark("env_obs", "obs/s")
+def bench_env_obs(quick):
+    from Environment.custom_env import FishFeedingEnv
+
+    env = FishFeedingEnv()
+    env.reset(seed=0)
+    return _timed(env._get_obs, 200_000 if quick else 500_000)
+
+
+@benchmark("vec_env_step", "steps/s")
+def bench_vec_env_step(quick):
+    from Environment.vec_env import FishFeedingVecEnv
+
+    env = FishFeedingVecEnv(num_envs=64)
+    env.seed(0)
+    env.reset()
+    n = 500 if quick else 5_000
+    actions = np.random.default_rng(0).integers(0, 6, (n, env.num_envs))
+    start = time.perf_counter()
+    for batch in actions:
+        env.step(batch)
+    return n * env.num_envs / (time.perf_counter() - start)
+
+
+@benchmark("fleet_step", "steps/s")
+def bench_fleet_step(quick):
+    from Environment.fleet_env import FishFleetVecEnv
+
+    env = FishFleetVecEnv(num_envs=64, n_drones=4)
+    env.seed(0)
+    env.reset()
+    n = 500 if quick else 5_000
+    actions = np.random.default_rng(0).integers(0, 6, (n, env.num_envs))
+    start = time.perf_counter()
+    for batch in actions:
+        env.step(batch)
+    return n * env.num_envs / (time.perf_counter() - start)
+
+
+# ======================
+# RENDERING
+# ======================
+@benchmark("render_fps", "frames/s")
+def bench_render_fps(quick):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Headless, even where a display exists
+    from Environment.custom_env import FishFeedingEnv
+
+    env = FishFeedingEnv(render_mode="rgb_array")
+    env.reset(seed=0)
+    env.render()  # Renderer setup (sprite loading) is not part of the frame cost
+    n = 200 if quick else 2_000
+    actions = np.random.default_rng(0).integers(0, 6, n).tolist()
+    start = time.perf_counter()
+    for action in actions:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+        env.render()
+    fps = n / (time.perf_counter() - start)
+    env.close()
+    return fps
+
+
+@benchmark("mosaic_fps", "frames/s")
+def bench_mosaic_fps(quick):
+    from Environment.mosaic import MosaicRenderer
+    from Environment.vec_env import FishFeedingVecEnv
+
+    env = FishFeedingVecEnv(num_envs=64)
+    env.seed(0)
+    env.reset()
+    renderer = MosaicRenderer(env.num_envs, env.grid_size)  # Sprite loading is not part of the frame cost
+    n = 100 if quick else 1_000
+    actions = np.random.default_rng(0).integers(0, 6, (n, env.num_envs))
+    start = time.perf_counter()
+    for batch in actions:
+        env.step(batch)
+        renderer.render_env(env)
+    return n / (time.perf_counter() - start)
+
+
+# ======================
+# TRAINING & INFERENCE
+# ======================
+def _config_run(algorithm):
+    """First run of Training/configs/<algorithm>.yaml: (hyperparameters, number of envs)."""
+    from Training.experiment_runner import load_spec
+
+    run = load_spec(os.path.join(CONFIG_DIR, f"{algorithm}.yaml"))["runs"][0]
+    env_spec = run.get("env", {})
+    n_envs = env_spec.get("n_envs") or env_spec.get("n_workers", 1) * env_spec.get("envs_per_worker", 1)
+    return dict(run.get("hyperparameters", {})), n_envs
+
+
+def _learn_throughput(algorithm, quick):
+    """
+    Timesteps per second of a short learn() with the configured hyperparameters.
+    The tanks are stepped in-process, so the number measures the algorithm and
+    the env rather than worker start-up.
+    """
+    import stable_baselines3
+    from stable_baselines3.common.vec_env import VecMonitor
+    from Environment.vec_env import FishFeedingVecEnv
+
+    hyperparameters, n_envs = _config_run(algorithm)
+    if "learning_starts" in hyperparameters:
+        hyperparameters["learning_starts"] = 0  # Train from the first step, the budget is short
+    env = VecMonitor(FishFeedingVecEnv(num_envs=n_envs))
+    model = getattr(stable_baselines3, algorithm.upper())(
+        "MlpPolicy", env, seed=0, device="cpu", verbose=0, **hyperparameters
+    )
+    budget = 4_096 if quick else 20_480
+    start = time.perf_counter()
+    model.learn(total_timesteps=budget)
+    rate = model.num_timesteps / (time.perf_counter() - start)
+    env.close()
+    return rate
+
+
+@benchmark("learn_dqn", "timesteps/s")
+def bench_learn_dqn(quick):
+    return _learn_throughput("dqn", quick)
+
+
+@benchmark("learn_ppo", "timesteps/s")
+def bench_learn_ppo(quick):
+    return _learn_throughput("ppo", quick)
+
+
+@benchmark("learn_a2c", "timesteps/s")
+def bench_learn_a2c(quick):
+    return _learn_throughput("a2c", quick)
+
+
+def _predict_latency(algorithm, quick):
+    """Milliseconds per single-observation predict() of a freshly built MlpPolicy model."""
+    import stable_baselines3
+    from Environment.custom_env import FishFeedingEnv
+
+    env = FishFeedingEnv()
+    model = getattr(stable_baselines3, algorithm)("MlpPolicy", env, seed=0, device="cpu", verbose=0)
+    obs, _ = env.reset(seed=0)
+    model.predict(obs, deterministic=True)  # Warm-up
+    n = 500 if quick else 5_000
+    start = time.perf_counter()
+    for _ in range(n):
+        model.predict(obs, deterministic=True)
+    return (time.perf_counter() - start) / n * 1000
+
+
+@benchmark("predict_ppo", "ms", higher_is_better=False)
+def bench_predict_ppo(quick):
+    return _predict_latency("PPO", quick)
+
+
+@benchmark("predict_dqn", "ms", higher_is_better=False)
+def bench_predict_dqn(quick):
+    return _predict_latency("DQN", quick)
+
+
+# ======================
+# RUN & COMPARE
+# ======================
+def machine_info():
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+    for module in ("torch", "stable_baselines3", "pygame"):
+        try:
+            info[module] = __import__(module).__version__
+        except ImportError:
+            pass
+    try:
+        import torch
+        info["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return info
+
+
+def run_benchmarks(names=None, repeats=3, quick=False):
+    """Runs the benchmarks `repeats` times each and returns the results document."""
+    names = names or list(BENCHMARKS)
+    unknown = sorted(set(names) - set(BENCHMARKS))
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {unknown}. Choose from {sorted(BENCHMARKS)}")
+
+    results = {}
+    for name in names:
+        spec = BENCHMARKS[name]
+        samples = [spec["fn"](quick) for _ in range(repeats)]
+        results[name] = {
+            "value": statistics.median(samples),
+            "unit": spec["unit"],
+            "higher_is_better": spec["higher_is_better"],
+            "samples": samples,
+        }
+        print(f"⏱️ {name:<16}{results[name]['value']:>14.4g} {spec['unit']}")
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "quick": quick,
+        "repeats": repeats,
+        "machine": machine_info(),
+        "results": results,
+    }
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Prints a baseline-vs-current table and returns the names of the benchmarks
+    that slowed down by more than `threshold` (0.15 = 15%).
+    """
+    if baseline.get("machine") != current.get("machine"):
+        print("⚠️ Baseline was recorded on a different machine or library versions; differences may not be regressions.")
+    if baseline.get("quick") != current.get("quick"):
+        print("⚠️ Comparing a --quick run with a full run; budgets differ.")
+
+    header = f"{'Benchmark':<16}{'Baseline':>14}{'Current':>14}{'Change':>10}  Unit"
+    print(header)
+    print("-" * (len(header) + 12))
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<16}{'-':>14}{result['value']:>14.4g}{'new':>10}  {result['unit']}")
+            continue
+        change = result["value"] / base["value"] - 1
+        slowdown = -change if result["higher_is_better"] else change
+        regressed = slowdown > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<16}{base['value']:>14.4g}{result['value']:>14.4g}{change:>+10.1%}  {result['unit']}"
+              f"{'  ❌ regression' if regressed else ''}")
+    return regressions
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save(document, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"💾 Results saved to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Speed benchmarks with JSON baselines.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--only", default=None, help=f"comma-separated subset of: {', '.join(BENCHMARKS)}")
+    run_parser.add_argument("--repeats", type=int, default=3, help="trials per benchmark (the median is kept)")
+    run_parser.add_argument("--quick", action="store_true", help="smaller budgets, for a fast sanity check")
+    run_parser.add_argument("--output", default=RESULTS_PATH)
+    run_parser.add_argument("--save-baseline", action="store_true", help=f"also write the results to {BASELINE_PATH}")
+    run_parser.add_argument("--baseline", default=None, help="compare against this baseline afterwards")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    compare_parser = commands.add_parser("compare", help="compare a result file against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current", nargs="?", default=RESULTS_PATH)
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        document = run_benchmarks(args.only.split(",") if args.only else None, args.repeats, args.quick)
+        _save(document, args.output)
+        if args.save_baseline:
+            _save(document, BASELINE_PATH)
+        baseline_path = args.baseline
+    else:
+        document = _load(args.current)
+        baseline_path = args.baseline
+
+    if baseline_path:
+        regressions = compare_results(_load(baseline_path), document, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"✅ No benchmark regressed by more than {args.threshold:.0%}")
@@ -0,0 +1,264 @@
+"""
+checkpoints.py
+==============
+Checkpoints that don't stall training and don't fill the disk.
+
+The training thread only serializes the model into memory (`model.save` to a
+BytesIO, a few ms for these MLPs, no disk access). A `CheckpointWriter`
+thread writes the bytes out atomically (temporary file, fsync, rename), so a
+crash leaves either the previous file or the complete new one, never a
+half-written zip. After each periodic checkpoint it applies a
+`RetentionPolicy`:
+- keep the `keep_last` most recent checkpoints,
+- keep the `keep_best` checkpoints with the best eval score,
+- of the older ones, keep only the first of every `keep_every` timesteps,
+and deletes the rest. Scores and timesteps are kept in a `checkpoints.json`
+manifest next to the checkpoints, so a resumed run keeps managing them.
+
+`BackgroundCheckpointCallback` replaces CheckpointCallback (same file names,
+`<prefix>_<steps>_steps.zip`) and `BackgroundEvalCallback` replaces
+EvalCallback with `best_model.zip` written by the writer thread.
+"""
+
+import atexit
+import glob
+import io
+import json
+import math
+import os
+import queue
+import re
+import threading
+from dataclasses import dataclass
+
+from stable_baselines3.common.callbacks import BaseCallback, EvalCallback
+
+from Training.profiling import TimedCallback
+
+MANIFEST_NAME = "checkpoints.json"
+
+
+def write_atomic(path, data):
+    """Writes `data` to `path` through a temporary file, so readers only ever see a complete file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    if hasattr(os, "O_DIRECTORY"):  # Make the rename itself durable
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def serialize_model(model):
+    """The model's zip (parameters, optimizer state, hyperparameters) as bytes, without touching the disk."""
+    buffer = io.BytesIO()
+    model.save(buffer)
+    return buffer.getvalue()
+
+
+# ======================
+# RETENTION
+# ======================
+@dataclass
+class RetentionPolicy:
+    keep_last: int = None  # None keeps every checkpoint
+    keep_best: int = 0
+    keep_every: int = None  # Timesteps between the older checkpoints that are kept
+
+    def __post_init__(self):
+        if self.keep_last is not None and self.keep_last < 1:
+            raise ValueError("keep_last must be at least 1, the newest checkpoint is needed to resume")
+
+    def select(self, checkpoints):
+        """
+        Returns the paths to keep from `checkpoints`, a dict path -> (timesteps, score).
+        """
+        if self.keep_last is None:
+            return set(checkpoints)
+        by_age = sorted(checkpoints, key=lambda path: checkpoints[path][0], reverse=True)
+        keep = set(by_age[:self.keep_last])
+
+        scored = [path for path in by_age if checkpoints[path][1] is not None]
+        scored.sort(key=lambda path: checkpoints[path][1], reverse=True)
+        keep.update(scored[:self.keep_best])
+
+        if self.keep_every:
+            buckets = set()
+            for path in reversed(by_age):  # Oldest first: the first checkpoint of each bucket survives
+                bucket = checkpoints[path][0] // self.keep_every
+                if bucket not in buckets:
+                    buckets.add(bucket)
+                    keep.add(path)
+        return keep
+
+
+# ======================
+# WRITER
+# ======================
+class CheckpointWriter:
+    """
+    Background thread that writes serialized models and applies the retention
+    policy to the periodic checkpoints of `directory`. An error in the thread
+    is raised again by the next submit/flush/close.
+    """
+
+    def __init__(self, directory=None, retention=None):
+        self.directory = directory
+        self.retention = retention or RetentionPolicy()
+        self.checkpoints = {}  # path -> (timesteps, score) of the managed checkpoints
+        if directory is not None:
+            self._load_manifest()
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)  # Pending writes still land if the script ends without close()
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def _load_manifest(self):
+        manifest = {}
+        if os.path.exists(self._manifest_path()):
+            with open(self._manifest_path()) as f:
+                manifest = json.load(f)
+        for entry in manifest.get("checkpoints", []):
+            path = os.path.join(self.directory, entry["file"])
+            if os.path.exists(path):
+                self.checkpoints[path] = (entry["timesteps"], entry.get("score"))
+        # Checkpoints from before the manifest existed
+        for path in glob.glob(os.path.join(self.directory, "*_steps.zip")):
+            match = re.search(r"_(\d+)_steps\.zip$", path)
+            if match and path not in self.checkpoints:
+                self.checkpoints[path] = (int(match.group(1)), None)
+
+    def _save_manifest(self):
+        entries = [{"file": os.path.basename(path), "timesteps": steps, "score": score}
+                   for path, (steps, score) in sorted(self.checkpoints.items(), key=lambda item: item[1][0])]
+        write_atomic(self._manifest_path(), json.dumps({"checkpoints": entries}, indent=2).encode())
+
+    def _check(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Checkpoint writer failed") from error
+
+    def submit(self, path, data, timesteps=None, score=None):
+        """
+        Queues `data` to be written to `path`. With `timesteps`, the file is a
+        periodic checkpoint and falls under the retention policy.
+        """
+        self._check()
+        self._queue.put((path, data, timesteps, score))
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                path, data, timesteps, score = job
+                write_atomic(path, data)
+                if timesteps is not None and self.directory is not None:
+                    self.checkpoints[path] = (timesteps, score)
+                    self._apply_retention()
+            except Exception as e:  # Reported to the training thread on its next call
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _apply_retention(self):
+        keep = self.retention.select(self.checkpoints)
+        for path in set(self.checkpoints) - keep:
+            if os.path.exists(path):
+                os.remove(path)
+            del self.checkpoints[path]
+        self._save_manifest()
+
+    def flush(self):
+        """Blocks until everything submitted so far is on disk."""
+        self._queue.join()
+        self._check()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        atexit.unregister(self.close)
+        self._check()
+
+
+# ======================
+# CALLBACKS
+# ======================
+def _score(eval_callback):
+    """Latest eval mean reward of an (optionally TimedCallback-wrapped) eval callback, if any."""
+    if isinstance(eval_callback, TimedCallback):
+        eval_callback = eval_callback.callback
+    score = getattr(eval_callback, "last_mean_reward", None)
+    return score if score is not None and math.isfinite(score) else None
+
+
+class BackgroundCheckpointCallback(BaseCallback):
+    """
+    Periodic checkpoints written by a CheckpointWriter thread, under the same
+    names as CheckpointCallback. `eval_callback` provides the score used by
+    `keep_best` (its latest mean eval reward at checkpoint time).
+    """
+
+    def __init__(self, save_freq, save_path, name_prefix="checkpoint", keep_last=None, keep_best=0,
+                 keep_every=None, eval_callback=None, verbose=0):
+        super().__init__(verbose)
+        self.save_freq = save_freq
+        self.save_path = save_path
+        self.name_prefix = name_prefix
+        self.retention = RetentionPolicy(keep_last, keep_best, keep_every)
+        self.eval_callback = eval_callback
+        self.writer = None
+
+    def _init_callback(self):
+        os.makedirs(self.save_path, exist_ok=True)
+        self.writer = CheckpointWriter(self.save_path, self.retention)
+
+    def _on_step(self):
+        if self.n_calls % self.save_freq == 0:
+            path = os.path.join(self.save_path, f"{self.name_prefix}_{self.num_timesteps}_steps.zip")
+            self.writer.submit(path, serialize_model(self.model), self.num_timesteps, _score(self.eval_callback))
+            if self.verbose >= 2:
+                print(f"Saving model checkpoint to {path}")
+        return True
+
+    def _on_training_end(self):
+        self.writer.close()
+
+
+class BackgroundEvalCallback(EvalCallback):
+    """EvalCallback whose `best_model.zip` is written by a CheckpointWriter thread."""
+
+    def __init__(self, eval_env, best_model_save_path=None, **kwargs):
+        super().__init__(eval_env, best_model_save_path=None, **kwargs)
+        self.best_model_dir = best_model_save_path
+        self.writer = None
+
+    def _init_callback(self):
+        super()._init_callback()
+        if self.best_model_dir is not None:
+            os.makedirs(self.best_model_dir, exist_ok=True)
+            self.writer = CheckpointWriter()
+
+    def _on_step(self):
+        best_mean_reward = self.best_mean_reward
+        continue_training = super()._on_step()
+        if self.writer is not None and self.best_mean_reward > best_mean_reward:
+            self.writer.submit(os.path.join(self.best_model_dir, "best_model.zip"), serialize_model(self.model))
+        return continue_training
+
+    def _on_training_end(self):
+        if self.writer is not None:
+            self.writer.close()
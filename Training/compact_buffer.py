@@ -0,0 +1,165 @@
+"""
+compact_buffer.py
+=================
+Memory-compact DQN replay buffer for the fish tank observations.
+
+A FishFeedingEnv observation is 0/1 hunger cells followed by water quality
+and the agent's normalized x/y. SB3's ReplayBuffer keeps it as float32 twice
+per transition (obs and next_obs): 244 bytes for the 5x5 tank with an int64
+action. `CompactReplayBuffer` stores instead:
+- the hunger cells as packed bits (4 bytes for 25 cells),
+- water quality as the number of overfeeds (uint8) and x/y as grid indices,
+- each observation once: the next observation of a transition is the
+  observation stored in the following slot, and only episode-ending
+  transitions keep their terminal observation on the side,
+- actions as uint8 and dones/timeouts as bools,
+about 14 bytes per transition. Minibatches are decoded back to the exact
+float32 observations with vectorized unpacking at sample time.
+
+Usage:
+    model = DQN("MlpPolicy", env, replay_buffer_class=CompactReplayBuffer,
+                replay_buffer_kwargs={"grid_size": 5}, ...)
+    # or `replay_buffer: compact` in an experiment spec run
+"""
+
+import math
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.buffers import BaseBuffer, ReplayBuffer
+from stable_baselines3.common.type_aliases import ReplayBufferSamples
+
+MAX_OVERFEEDS = 255  # Water quality levels representable by the uint8 field
+
+
+def _water_levels():
+    """Water quality after k overfeeds, computed like the envs do (repeated -0.1 in float64)."""
+    levels = np.empty(MAX_OVERFEEDS + 1, dtype=np.float32)
+    water_quality = 1.0
+    for k in range(len(levels)):
+        levels[k] = water_quality
+        water_quality -= 0.1
+    return levels
+
+
+class CompactReplayBuffer(ReplayBuffer):
+    """
+    ReplayBuffer for FishFeedingEnv / FishFeedingVecEnv observations, with the
+    same sampling behaviour as SB3's memory-optimized variant.
+
+    :param grid_size: tank size; only needed when the observation is an
+        `obs_window` patch, otherwise it follows from the observation length
+    """
+
+    def __init__(self, buffer_size, observation_space, action_space, device="auto", n_envs=1,
+                 optimize_memory_usage=False, handle_timeout_termination=True, grid_size=None):
+        # BaseBuffer only: ReplayBuffer.__init__ would allocate the float32 arrays we replace
+        BaseBuffer.__init__(self, buffer_size, observation_space, action_space, device, n_envs=n_envs)
+        if not isinstance(action_space, spaces.Discrete) or action_space.n > 256:
+            raise ValueError("CompactReplayBuffer needs a Discrete action space with at most 256 actions")
+        self.buffer_size = max(buffer_size // n_envs, 1)
+        self.optimize_memory_usage = True  # Next observations always come from the following slot
+        self.handle_timeout_termination = handle_timeout_termination
+
+        self.n_cells = self.obs_shape[0] - 3
+        if grid_size is None:
+            grid_size = math.isqrt(self.n_cells)
+            if grid_size * grid_size != self.n_cells:
+                raise ValueError("Pass grid_size= for windowed observations; it can't be inferred")
+        self._coords = (np.arange(grid_size) / max(grid_size - 1, 1)).astype(np.float32)
+        self._water_levels = _water_levels()
+
+        shape = (self.buffer_size, self.n_envs)
+        self.hunger_bits = np.zeros((*shape, (self.n_cells + 7) // 8), dtype=np.uint8)
+        self.overfeeds = np.zeros(shape, dtype=np.uint8)
+        self.agent_pos = np.zeros((*shape, 2), dtype=np.uint8 if grid_size <= 256 else np.uint16)
+        self.actions = np.zeros((*shape, self.action_dim), dtype=np.uint8)
+        self.rewards = np.zeros(shape, dtype=np.float32)
+        self.dones = np.zeros(shape, dtype=bool)
+        self.timeouts = np.zeros(shape, dtype=bool)
+        self.terminal_obs = {}  # (slot, env) -> encoded terminal observation of an episode-ending transition
+
+    @property
+    def nbytes(self):
+        """
+        Bytes held by the buffer arrays and the encoded terminal observations
+        (7 bytes each for the 5x5 tank). The per-object overhead of the dict
+        holding the terminal observations is not counted.
+        """
+        arrays = (self.hunger_bits, self.overfeeds, self.agent_pos, self.actions, self.rewards, self.dones,
+                  self.timeouts)
+        terminal = sum(field.nbytes for encoded in self.terminal_obs.values() for field in encoded)
+        return sum(a.nbytes for a in arrays) + terminal
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+    def _encode(self, obs):
+        obs = np.asarray(obs, dtype=np.float32).reshape(-1, self.obs_shape[0])
+        bits = np.packbits(obs[:, :self.n_cells].astype(np.uint8), axis=1)
+        overfeeds = np.rint((1.0 - obs[:, -3]) * 10).astype(np.int64)
+        g = len(self._coords)
+        pos = np.rint(obs[:, -2:] * max(g - 1, 1)).astype(np.int64)
+        encoded = (bits, overfeeds.astype(np.uint8), pos.astype(self.agent_pos.dtype))
+        # Encoding must be lossless: anything that isn't a fish tank observation is rejected here
+        if (overfeeds.min() < 0 or overfeeds.max() > MAX_OVERFEEDS or pos.min() < 0 or pos.max() >= g
+                or not np.array_equal(self._decode(*encoded), obs)):
+            raise ValueError("Observation can't be stored compactly: expected 0/1 hunger cells, "
+                             "water quality 1.0 - 0.1 * k and agent x/y on the grid")
+        return encoded
+
+    def _decode(self, bits, overfeeds, pos):
+        obs = np.empty((len(bits), self.n_cells + 3), dtype=np.float32)
+        obs[:, :self.n_cells] = np.unpackbits(bits, axis=1, count=self.n_cells)
+        obs[:, -3] = self._water_levels[overfeeds]
+        obs[:, -2:] = self._coords[pos]
+        return obs
+
+    def _store(self, slot, encoded):
+        self.hunger_bits[slot], self.overfeeds[slot], self.agent_pos[slot] = encoded
+
+    # ------------------------------------------------------------------
+    # ReplayBuffer API
+    # ------------------------------------------------------------------
+    def add(self, obs, next_obs, action, reward, done, infos):
+        slot, next_slot = self.pos, (self.pos + 1) % self.buffer_size
+        self._store(slot, self._encode(obs))
+        next_encoded = self._encode(next_obs)
+        self._store(next_slot, next_encoded)  # Overwritten by the next add with the same (or reset) obs
+        self.actions[slot] = np.asarray(action).reshape(self.n_envs, self.action_dim)
+        self.rewards[slot] = reward
+        self.dones[slot] = done
+        if self.handle_timeout_termination:
+            self.timeouts[slot] = [info.get("TimeLimit.truncated", False) for info in infos]
+
+        for env in range(self.n_envs):
+            self.terminal_obs.pop((slot, env), None)
+            if done[env]:
+                self.terminal_obs[(slot, env)] = tuple(field[env].copy() for field in next_encoded)
+
+        self.pos += 1
+        if self.pos == self.buffer_size:
+            self.full = True
+            self.pos = 0
+
+    def _get_samples(self, batch_inds, env=None):
+        env_indices = np.random.randint(0, high=self.n_envs, size=(len(batch_inds),))
+        obs = self._decode(self.hunger_bits[batch_inds, env_indices], self.overfeeds[batch_inds, env_indices],
+                           self.agent_pos[batch_inds, env_indices])
+        next_inds = (batch_inds + 1) % self.buffer_size
+        next_obs = self._decode(self.hunger_bits[next_inds, env_indices], self.overfeeds[next_inds, env_indices],
+                                self.agent_pos[next_inds, env_indices])
+        dones = self.dones[batch_inds, env_indices]
+        for row in np.flatnonzero(dones):
+            bits, overfeeds, pos = self.terminal_obs[(batch_inds[row], env_indices[row])]
+            next_obs[row] = self._decode(bits[None], np.array([overfeeds]), pos[None])[0]
+
+        data = (
+            self._normalize_obs(obs, env),
+            self.actions[batch_inds, env_indices].astype(np.int64),
+            self._normalize_obs(next_obs, env),
+            # Only use dones that are not due to timeouts
+            (dones & ~self.timeouts[batch_inds, env_indices]).astype(np.float32).reshape(-1, 1),
+            self._normalize_reward(self.rewards[batch_inds, env_indices].reshape(-1, 1), env),
+        )
+        return ReplayBufferSamples(*tuple(map(self.to_torch, data)))
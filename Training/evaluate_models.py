@@ -0,0 +1,201 @@
+"""
+evaluate_models.py
+==================
+High-throughput evaluation of every saved model under `models/`.
+
+Each model plays thousands of seeded episodes on the batched FishFeedingVecEnv.
+One `policy.predict` call per step covers all live episodes, and the models are
+spread over a process pool. Every model sees the same tanks (same root seed),
+so differences between models aren't down to luck of the draw.
+
+Reports, per model: mean episode reward with a 95% confidence interval, the mean
+regret against the oracle planner's best return for the same tanks, mean fish
+fed, the share of episodes ended by water quality and mean episode length.
+
+Usage:
+    python Training/evaluate_models.py --episodes 10000
+"""
+
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Training.model_registry import index_models, load_model
+
+WATER_QUALITY_LIMIT = 0.4  # FishFeedingEnv ends the episode at or below this
+
+_oracle = None  # Per process, so its memo is shared by every model evaluated there
+
+
+# ======================
+# HELPER FUNCTIONS
+# ======================
+def discover_models(models_dir="models"):
+    """
+    Lists (path, algorithm) for every .zip model under models_dir.
+    """
+    return [(info.path, info.algorithm) for info in index_models(models_dir)]
+
+
+def confidence_interval(values, z=1.96):
+    """
+    Half-width of the normal-approximation confidence interval of the mean.
+    """
+    if len(values) < 2:
+        return float("nan")
+    return float(z * np.std(values, ddof=1) / math.sqrt(len(values)))
+
+
+# ======================
+# BATCHED ROLLOUTS
+# ======================
+def run_episodes(predict, n_episodes, n_envs=1000, seed=0, env_kwargs=None):
+    """
+    Plays `n_episodes` episodes on a FishFeedingVecEnv with `n_envs` tanks
+    (built with `env_kwargs`) and returns per-episode arrays: reward, length,
+    fish_fed, water_quality_end and hunger (the tank's layout at the start of
+    the episode).
+
+    `predict` maps a batch of observations to a batch of actions. Each tank plays
+    a fixed quota of episodes, so short episodes aren't over-represented.
+    """
+    from Environment.vec_env import FishFeedingVecEnv
+
+    n_envs = min(n_envs, n_episodes)
+    quota = np.full(n_envs, n_episodes // n_envs)
+    quota[: n_episodes % n_envs] += 1
+
+    env = FishFeedingVecEnv(num_envs=n_envs, **(env_kwargs or {}))
+    env.seed(seed)
+    obs = env.reset()
+    start_hunger = env.fish_hunger.copy()
+
+    returns = np.zeros(n_envs)
+    lengths = np.zeros(n_envs, dtype=np.int64)
+    finished = np.zeros(n_envs, dtype=np.int64)
+    results = {"reward": [], "length": [], "fish_fed": [], "water_quality_end": [], "hunger": []}
+
+    while (finished < quota).any():
+        actions = predict(obs)
+        obs, rewards, dones, infos = env.step(actions)
+        returns += rewards
+        lengths += 1
+        for i in np.flatnonzero(dones):
+            if finished[i] < quota[i]:
+                results["reward"].append(returns[i])
+                results["length"].append(lengths[i])
+                results["fish_fed"].append(infos[i]["fish_fed"])
+                results["water_quality_end"].append(infos[i]["water_quality"])
+                results["hunger"].append(start_hunger[i].copy())
+                finished[i] += 1
+            start_hunger[i] = env.fish_hunger[i]  # Already reset for the next episode
+        returns[dones] = 0
+        lengths[dones] = 0
+
+    env.close()
+    return {key: np.asarray(values) for key, values in results.items()}
+
+
+def optimal_returns(hunger):
+    """Oracle planner's best return for each episode's starting layout."""
+    global _oracle
+    if _oracle is None:
+        from Environment.oracle import FishFeedingOracle
+        _oracle = FishFeedingOracle()
+    return _oracle.solve(hunger)["return"]
+
+
+def summarize(episodes, regret=True):
+    rewards = episodes["reward"]
+    summary = {
+        "episodes": int(len(rewards)),
+        "mean_reward": float(rewards.mean()),
+        "reward_ci95": confidence_interval(rewards),
+        "mean_fish_fed": float(episodes["fish_fed"].mean()),
+        "water_quality_terminations": float((episodes["water_quality_end"] <= WATER_QUALITY_LIMIT).mean()),
+        "mean_length": float(episodes["length"].mean()),
+        "mean_regret": float("nan"),
+    }
+    if regret:
+        summary["mean_regret"] = float((optimal_returns(episodes["hunger"]) - rewards).mean())
+    return summary
+
+
+def evaluate_model(path, algorithm, n_episodes, n_envs=1000, seed=0, regret=True):
+    """
+    Loads one saved model and evaluates it greedily over `n_episodes` episodes.
+    """
+    start = time.time()
+    model = load_model(path, algorithm)
+
+    def predict(obs):
+        actions, _ = model.predict(obs, deterministic=True)
+        return actions
+
+    summary = summarize(run_episodes(predict, n_episodes, n_envs=n_envs, seed=seed), regret=regret)
+    summary.update({"model": path, "algorithm": algorithm, "wall_time": time.time() - start})
+    return summary
+
+
+def _init_worker(torch_threads):
+    # One torch thread per worker so parallel evaluations don't oversubscribe the CPUs
+    import torch
+    torch.set_num_threads(torch_threads)
+
+
+def evaluate_all(models, n_episodes, n_envs=1000, seed=0, workers=None, regret=True):
+    """
+    Evaluates every (path, algorithm) in `models` over a process pool.
+    """
+    workers = min(workers or os.cpu_count(), len(models))
+    if workers <= 1:
+        return [evaluate_model(path, algo, n_episodes, n_envs, seed, regret) for path, algo in models]
+
+    ctx = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=(1,)) as pool:
+        futures = [pool.submit(evaluate_model, path, algo, n_episodes, n_envs, seed, regret)
+                   for path, algo in models]
+        return [future.result() for future in futures]
+
+
+def print_table(summaries):
+    header = (f"{'Model':<62}{'Algo':<6}{'Reward':>9}{'±95% CI':>9}{'Regret':>8}"
+              f"{'Fed':>7}{'WQ end':>8}{'Length':>8}{'Secs':>7}")
+    print("\n" + header)
+    print("-" * len(header))
+    for s in sorted(summaries, key=lambda s: s["mean_reward"], reverse=True):
+        print(f"{s['model']:<62}{s['algorithm']:<6}{s['mean_reward']:>9.2f}{s['reward_ci95']:>9.2f}{s['mean_regret']:>8.2f}"
+              f"{s['mean_fish_fed']:>7.2f}{s['water_quality_terminations']:>8.1%}"
+              f"{s['mean_length']:>8.1f}{s['wall_time']:>7.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate every saved model over many seeded episodes.")
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--episodes", type=int, default=10_000, help="episodes per model")
+    parser.add_argument("--envs", type=int, default=1000, help="tanks stepped together per model")
+    parser.add_argument("--seed", type=int, default=0, help="root seed shared by all models")
+    parser.add_argument("--workers", type=int, default=None, help="models evaluated in parallel")
+    parser.add_argument("--output", default=None, help="optional JSON file for the results")
+    parser.add_argument("--no-regret", action="store_true", help="skip the oracle planner")
+    args = parser.parse_args()
+
+    models = discover_models(args.models_dir)
+    print(f"🔎 Evaluating {len(models)} models x {args.episodes} episodes")
+    start = time.time()
+    summaries = evaluate_all(models, args.episodes, n_envs=args.envs, seed=args.seed, workers=args.workers,
+                             regret=not args.no_regret)
+    print_table(summaries)
+    print(f"\n✅ Done in {time.time() - start:.1f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summaries, f, indent=2)
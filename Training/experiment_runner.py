@@ -0,0 +1,471 @@
+"""
+experiment_runner.py
+====================
+Config-driven, multi-seed experiment runner for the fish feeding agents.
+
+An experiment spec (YAML or JSON) lists runs: algorithm, hyperparameters, seeds,
+total timesteps, env settings, evaluation / checkpoint / curriculum settings and
+output paths.
+- `replay_buffer: compact` stores DQN transitions bit-packed (Training/compact_buffer.py)
+- `eval: {async: true}` evaluates in a worker process while training continues
+  (Training/async_eval.py)
+- checkpoints and best models are written by a background thread; `keep_last`,
+  `keep_best` and `keep_every` in `checkpoint` prune old checkpoints
+  (Training/checkpoints.py)
+- a `profile` section adds per-phase timings and optional profiler snapshots to
+  the run's TensorBoard log (Training/profiling.py)
+- `action_mask: true` trains with the mask-aware policies, which never pick
+  moves into walls, overfeeding or skipping a hungry fish (Training/masking.py);
+  not for multi-drone fleets, whose masks also depend on the other drones
+Every (run, seed) pair becomes one job. Jobs are scheduled over a process pool
+where each worker is pinned to its own cores and limited to a fixed number of
+torch threads. Progress is recorded in a state file, so re-running the same spec
+skips finished jobs and resumes interrupted ones from their latest checkpoint.
+
+Usage:
+    python Training/experiment_runner.py Training/configs/overnight.yaml --workers 8
+"""
+
+import argparse
+import copy
+import glob
+import json
+import multiprocessing as mp
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Algorithms by spec name (REINFORCE is simulated with A2C)
+ALGORITHMS = {
+    "dqn": "DQN",
+    "ppo": "PPO",
+    "a2c": "A2C",
+    "reinforce": "A2C",
+}
+
+
+# ======================
+# SPEC LOADING
+# ======================
+def load_spec(path):
+    """
+    Loads an experiment spec from a YAML or JSON file.
+    """
+    with open(path) as f:
+        if path.endswith(".json"):
+            spec = json.load(f)
+        else:
+            import yaml
+            spec = yaml.safe_load(f)
+
+    if not spec.get("runs"):
+        raise ValueError(f"Experiment spec {path} has no runs")
+    spec.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return spec
+
+
+def _merge(base, override):
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def _format_paths(value, fields):
+    if isinstance(value, str):
+        return value.format(**fields)
+    if isinstance(value, dict):
+        return {k: _format_paths(v, fields) for k, v in value.items()}
+    return value
+
+
+def expand_jobs(spec):
+    """
+    Expands the spec into one job per (run, seed). `defaults` are merged into
+    every run and "{name}", "{algorithm}" and "{seed}" are filled in the paths.
+    """
+    jobs = []
+    defaults = spec.get("defaults", {})
+    for run in spec["runs"]:
+        run = _merge(defaults, run)
+        algorithm = run["algorithm"].lower()
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unsupported algorithm '{algorithm}'. Choose from {sorted(ALGORITHMS)}")
+        name = run.get("name", algorithm)
+        for seed in run.get("seeds", [0]):
+            fields = {"name": name, "algorithm": algorithm, "seed": seed}
+            job = {k: _format_paths(v, fields) for k, v in run.items() if k != "seeds"}
+            job.update(fields)
+            job["id"] = f"{name}_seed{seed}"
+            jobs.append(job)
+
+    ids = [job["id"] for job in jobs]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Run names must be unique per algorithm/seed; add a `name` to the duplicated runs")
+    return jobs
+
+
+# ======================
+# ENVIRONMENTS & CALLBACKS
+# ======================
+def make_env(env_spec):
+    """
+    Builds the training env described by the `env` section of a run:
+    - type "shm": SharedMemoryVecEnv with n_workers x envs_per_worker tanks
+    - type "batched": in-process FishFeedingVecEnv with n_envs tanks
+    - type "fleet": FishFleetVecEnv with n_envs tanks of n_drones drones, one
+      sub-env per drone (mode "shared") or per tank (mode "joint")
+    - type "single": one Monitor-wrapped FishFeedingEnv
+    """
+    from stable_baselines3.common.monitor import Monitor
+    from stable_baselines3.common.vec_env import VecMonitor
+    from Environment.custom_env import FishFeedingEnv
+    from Environment.vec_env import FishFeedingVecEnv
+    from Environment.fleet_env import FishFleetVecEnv
+    from Environment.shm_vec_env import SharedMemoryVecEnv
+
+    env_type = env_spec.get("type", "batched")
+    kwargs = env_spec.get("kwargs", {})
+    if env_type == "shm":
+        env = SharedMemoryVecEnv(
+            n_workers=env_spec.get("n_workers"),
+            envs_per_worker=env_spec.get("envs_per_worker", 1),
+            vec_env_fn=partial(FishFeedingVecEnv, **kwargs),
+        )
+    elif env_type == "batched":
+        env = FishFeedingVecEnv(num_envs=env_spec.get("n_envs", 8), **kwargs)
+    elif env_type == "fleet":
+        env = FishFleetVecEnv(num_envs=env_spec.get("n_envs", 8), n_drones=env_spec.get("n_drones", 2),
+                              mode=env_spec.get("mode", "shared"), **kwargs)
+    elif env_type == "single":
+        return Monitor(FishFeedingEnv(**kwargs))
+    else:
+        raise ValueError(f"Unknown env type '{env_type}'")
+    return VecMonitor(env)
+
+
+def make_eval_env(env_spec):
+    """One tank; a fleet run is evaluated on a fleet tank (episode rewards per drone in shared mode)."""
+    from stable_baselines3.common.monitor import Monitor
+    from Environment.custom_env import FishFeedingEnv
+
+    if env_spec.get("type") == "fleet":
+        return make_env({**env_spec, "n_envs": 1})
+    return Monitor(FishFeedingEnv(**env_spec.get("kwargs", {})))
+
+
+def build_callbacks(job, n_envs):
+    """
+    Builds the callbacks requested by a job. Frequencies in the spec are counted
+    in environment transitions and converted to vectorized steps here.
+    """
+    from stable_baselines3.common.callbacks import StopTrainingOnNoModelImprovement
+    from Training.checkpoints import BackgroundCheckpointCallback, BackgroundEvalCallback
+
+    callbacks = []
+    profile_spec = job.get("profile")
+    eval_spec = job.get("eval")
+    if eval_spec:
+        stop = None
+        if eval_spec.get("max_no_improvement_evals"):
+            stop = StopTrainingOnNoModelImprovement(
+                max_no_improvement_evals=eval_spec["max_no_improvement_evals"],
+                verbose=1,
+            )
+        eval_kwargs = dict(
+            best_model_save_path=eval_spec.get("best_model_save_path"),
+            log_path=eval_spec.get("log_path"),
+            eval_freq=max(eval_spec.get("freq", 10000) // n_envs, 1),
+            n_eval_episodes=eval_spec.get("episodes", 10),
+            deterministic=True,
+            callback_after_eval=stop,
+        )
+        if eval_spec.get("async"):
+            # Evaluates in a worker process while training continues
+            from Training.async_eval import AsyncEvalCallback
+            eval_callback = AsyncEvalCallback(partial(make_eval_env, job.get("env", {})), **eval_kwargs)
+        else:
+            # best_model.zip is written by a background thread
+            eval_callback = BackgroundEvalCallback(make_eval_env(job.get("env", {})), **eval_kwargs)
+        if profile_spec is not None:
+            from Training.profiling import TimedCallback
+            eval_callback = TimedCallback(eval_callback, phase="eval")
+        callbacks.append(eval_callback)
+
+    curriculum_spec = job.get("curriculum")
+    if curriculum_spec:
+        from Environment.curriculum_callback import CurriculumCallback
+        callbacks.append(CurriculumCallback(**curriculum_spec))
+
+    checkpoint_spec = job.get("checkpoint")
+    if checkpoint_spec:
+        callbacks.append(BackgroundCheckpointCallback(
+            save_freq=max(checkpoint_spec.get("freq", 50_000) // n_envs, 1),
+            save_path=checkpoint_spec["path"],
+            name_prefix=checkpoint_spec.get("name_prefix", "checkpoint"),
+            keep_last=checkpoint_spec.get("keep_last"),
+            keep_best=checkpoint_spec.get("keep_best", 0),
+            keep_every=checkpoint_spec.get("keep_every"),
+            eval_callback=eval_callback if eval_spec else None,
+        ))
+
+    if profile_spec is not None:
+        from Training.profiling import PhaseTimingCallback, TimedCallback
+        timed = [cb for cb in callbacks if isinstance(cb, TimedCallback)]
+        callbacks.append(PhaseTimingCallback(timed_callbacks=timed, **profile_spec))
+    return callbacks
+
+
+def resolve_model(job):
+    """
+    Returns (algorithm class, policy, extra hyperparameters) of a run. With
+    `action_mask` the policy (and for DQN the algorithm) are the mask-aware ones.
+    """
+    import stable_baselines3
+
+    algo_class = getattr(stable_baselines3, ALGORITHMS[job["algorithm"]])
+    policy = job.get("policy", "MlpPolicy")
+    if not job.get("action_mask"):
+        return algo_class, policy, {}
+    if policy != "MlpPolicy":
+        raise ValueError(f"action_mask needs the MlpPolicy, got '{policy}'")
+    env_spec = job.get("env", {})
+    if env_spec.get("type") == "fleet" and env_spec.get("n_drones", 2) != 1:
+        raise ValueError("action_mask doesn't support fleets with several drones: their env masks also "
+                         "block moves into cells held by other drones, which the observation doesn't show")
+    from Training.masking import MaskedActorCriticPolicy, MaskedDQN, MaskedDQNPolicy
+
+    policy_kwargs = {"obs_window": env_spec.get("kwargs", {}).get("obs_window")}
+    if algo_class is stable_baselines3.DQN:
+        return MaskedDQN, MaskedDQNPolicy, {"policy_kwargs": policy_kwargs}
+    return algo_class, MaskedActorCriticPolicy, {"policy_kwargs": policy_kwargs}
+
+
+def latest_checkpoint(job):
+    """
+    Returns (path, timesteps) of the newest checkpoint written for this job, if any.
+    """
+    checkpoint_spec = job.get("checkpoint")
+    if not checkpoint_spec:
+        return None, 0
+    prefix = checkpoint_spec.get("name_prefix", "checkpoint")
+    best_path, best_steps = None, 0
+    for path in glob.glob(os.path.join(checkpoint_spec["path"], f"{prefix}_*_steps.zip")):
+        match = re.search(r"_(\d+)_steps\.zip$", path)
+        if match and int(match.group(1)) > best_steps:
+            best_path, best_steps = path, int(match.group(1))
+    return best_path, best_steps
+
+
+# ======================
+# RUNNING ONE JOB
+# ======================
+def train_job(job, resume=True):
+    """
+    Trains and evaluates one (run, seed) job in the current process and returns
+    its result record. With `resume`, training continues from the job's latest
+    checkpoint when there is one.
+    """
+    from stable_baselines3.common.evaluation import evaluate_policy
+
+    start = time.time()
+    algo_class, policy, mask_hyperparameters = resolve_model(job)
+    env_spec = job.get("env", {})
+    env = make_env(env_spec)
+    if job.get("profile") is not None:
+        from stable_baselines3.common.vec_env import DummyVecEnv, VecEnv
+        from Training.profiling import TimedVecEnv
+        if not isinstance(env, VecEnv):
+            single_env = env
+            env = DummyVecEnv([lambda: single_env])
+        env = TimedVecEnv(env)
+    total_timesteps = job["total_timesteps"]
+
+    checkpoint_path, done_steps = latest_checkpoint(job) if resume else (None, 0)
+    if checkpoint_path:
+        print(f"⏩ [{job['id']}] Resuming from {checkpoint_path}")
+        model = algo_class.load(checkpoint_path, env=env)
+    else:
+        hyperparameters = dict(job.get("hyperparameters", {}))
+        for key, value in mask_hyperparameters.items():
+            hyperparameters[key] = {**hyperparameters.get(key, {}), **value}
+        replay_buffer = job.get("replay_buffer")
+        if replay_buffer == "compact":
+            from Training.compact_buffer import CompactReplayBuffer
+            hyperparameters["replay_buffer_class"] = CompactReplayBuffer
+            hyperparameters["replay_buffer_kwargs"] = {"grid_size": env_spec.get("kwargs", {}).get("grid_size", 5)}
+        elif replay_buffer is not None:
+            raise ValueError(f"Unknown replay_buffer '{replay_buffer}'. Choose from ['compact']")
+        model = algo_class(
+            policy=policy,
+            env=env,
+            seed=job["seed"],
+            tensorboard_log=job.get("tensorboard_log"),
+            verbose=job.get("verbose", 0),
+            **hyperparameters,
+        )
+
+    callbacks = build_callbacks(job, env.num_envs if hasattr(env, "num_envs") else 1)
+    model.learn(
+        total_timesteps=max(total_timesteps - done_steps, 0),
+        callback=callbacks,
+        reset_num_timesteps=not checkpoint_path,
+    )
+
+    if job.get("save_path"):
+        os.makedirs(os.path.dirname(job["save_path"]) or ".", exist_ok=True)
+        model.save(job["save_path"])
+
+    # Final Evaluation
+    eval_env = make_eval_env(env_spec)
+    mean_reward, std_reward = evaluate_policy(
+        model, eval_env, n_eval_episodes=job.get("final_eval_episodes", 10)
+    )
+    env.close()
+    print(f"✅ [{job['id']}] Evaluation - Mean reward: {mean_reward:.2f} ± {std_reward:.2f}")
+
+    return {
+        "id": job["id"],
+        "algorithm": job["algorithm"],
+        "name": job.get("name", job["algorithm"]),
+        "seed": job["seed"],
+        "status": "done",
+        "timesteps": int(model.num_timesteps),
+        "mean_reward": float(mean_reward),
+        "std_reward": float(std_reward),
+        "wall_time": time.time() - start,
+    }
+
+
+def _run_job_safely(job, resume=True):
+    try:
+        return train_job(job, resume=resume)
+    except Exception as e:  # keep the rest of the experiment going
+        print(f"❌ [{job['id']}] Failed: {e!r}")
+        return {"id": job["id"], "algorithm": job["algorithm"], "name": job.get("name", job["algorithm"]),
+                "seed": job["seed"], "status": "failed", "error": repr(e)}
+
+
+# ======================
+# PROCESS POOL
+# ======================
+def _init_worker(slot_counter, cores_per_run, torch_threads):
+    """
+    Pins each pool worker to its own block of cores and caps its torch threads,
+    so parallel runs don't oversubscribe the CPUs.
+    """
+    with slot_counter.get_lock():
+        slot = slot_counter.value
+        slot_counter.value += 1
+
+    if cores_per_run and hasattr(os, "sched_setaffinity"):
+        available = sorted(os.sched_getaffinity(0))
+        first = (slot * cores_per_run) % len(available)
+        cores = {available[(first + k) % len(available)] for k in range(cores_per_run)}
+        os.sched_setaffinity(0, cores)
+
+    if torch_threads:
+        # Set before torch is imported so OpenMP/MKL pick the limit up too
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ[var] = str(torch_threads)
+        import torch
+        torch.set_num_threads(torch_threads)
+
+
+def _load_state(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def _save_state(path, state):
+    # Write-then-rename so an interrupted run never leaves a truncated state file
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_experiment(spec, max_workers=None, state_path=None, resume=True):
+    """
+    Runs every job of an experiment spec that hasn't finished yet, then prints a
+    summary table. Returns the per-job result records. With `resume=False`
+    previous state and checkpoints are ignored and every job is trained again.
+    """
+    jobs = expand_jobs(spec)
+    state_path = state_path or spec.get("state_file") or os.path.join(
+        "logs", "experiments", f"{spec['name']}.json"
+    )
+    state = _load_state(state_path) if resume else {}
+    pending = [job for job in jobs if state.get(job["id"], {}).get("status") != "done"]
+    print(f"🧪 Experiment '{spec['name']}': {len(jobs)} runs, {len(jobs) - len(pending)} already done")
+
+    resources = spec.get("resources", {})
+    max_workers = max_workers or resources.get("workers") or os.cpu_count()
+    max_workers = min(max_workers, len(pending)) if pending else 1
+
+    if max_workers == 1:
+        # In-process, which also lets runs use the subprocess vector env freely
+        for job in pending:
+            state[job["id"]] = _run_job_safely(job, resume)
+            _save_state(state_path, state)
+    elif pending:
+        ctx = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+        slot_counter = ctx.Value("i", 0)
+        initargs = (slot_counter, resources.get("cores_per_run", 1), resources.get("torch_threads", 1))
+        with ProcessPoolExecutor(max_workers, mp_context=ctx, initializer=_init_worker, initargs=initargs) as pool:
+            futures = [pool.submit(_run_job_safely, job, resume) for job in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                state[result["id"]] = result
+                _save_state(state_path, state)
+
+    results = [state[job["id"]] for job in jobs if job["id"] in state]
+    print_summary(results)
+    return results
+
+
+# ======================
+# SUMMARY
+# ======================
+def print_summary(results):
+    """
+    Prints one row per run name with the mean ± std of the final evaluation
+    reward across seeds.
+    """
+    groups = {}
+    for result in results:
+        groups.setdefault(result["name"], []).append(result)
+
+    header = f"{'Run':<20}{'Algorithm':<12}{'Seeds':>6}{'Failed':>8}{'Mean reward':>14}{'Std':>9}{'Wall (min)':>12}"
+    print("\n" + header)
+    print("-" * len(header))
+    for name, group in groups.items():
+        done = [r for r in group if r["status"] == "done"]
+        rewards = [r["mean_reward"] for r in done]
+        mean = sum(rewards) / len(rewards) if rewards else float("nan")
+        std = (sum((r - mean) ** 2 for r in rewards) / len(rewards)) ** 0.5 if rewards else float("nan")
+        wall = sum(r["wall_time"] for r in done) / 60
+        print(f"{name:<20}{group[0]['algorithm']:<12}{len(done):>6}{len(group) - len(done):>8}"
+              f"{mean:>14.2f}{std:>9.2f}{wall:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fish feeding RL experiment spec.")
+    parser.add_argument("spec", help="YAML or JSON experiment spec")
+    parser.add_argument("--workers", type=int, default=None, help="parallel runs (default: spec or CPU count)")
+    parser.add_argument("--state", default=None, help="state file used to resume the experiment")
+    parser.add_argument("--restart", action="store_true", help="ignore previous state and checkpoints")
+    args = parser.parse_args()
+
+    run_experiment(load_spec(args.spec), max_workers=args.workers, state_path=args.state, resume=not args.restart)
@@ -0,0 +1,167 @@
+"""
+load_generator.py
+=================
+Load test for the policy server (Training/policy_server.py).
+
+Starts `--clients` controller processes. Each one plays its own FishFeedingEnv
+tank and asks the server for every action over the socket, one observation
+at a time, as a feeding controller would. Reports the client-side latencies
+(p50/p90/p99) and request throughput, and the server's mean batch size. Without
+`--address` a server is started on a temporary Unix socket for the run, so no
+other service is needed. With `--baseline` it also measures the current way:
+`model.predict` on one observation at a time in the controller's own process.
+
+Usage:
+    python Training/load_generator.py --clients 32 --seconds 10
+    python Training/load_generator.py --address unix:/tmp/fish_policy.sock --model ppo/best_model --baseline
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Training.policy_server import PolicyClient, PolicyServer, parse_address
+
+
+def _context():
+    return mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+
+
+def _run_server(address, server_kwargs):
+    PolicyServer(**server_kwargs).run(address)
+
+
+def _wait_for_server(address, process, timeout=120):
+    family, target = parse_address(address)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if not process.is_alive():
+            raise RuntimeError("Policy server exited during startup")
+        try:
+            with socket.socket(family, socket.SOCK_STREAM) as probe:
+                probe.connect(target)
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Policy server not reachable on {address}")
+
+
+def _controller(address, model, seed, seconds, barrier, results):
+    """One tank controller: plays its tank with the served policy and reports its request latencies."""
+    from Environment.custom_env import FishFeedingEnv
+
+    env = FishFeedingEnv()
+    obs, _ = env.reset(seed=seed)
+    latencies = []
+    with PolicyClient(address, model) as client:
+        client.predict(obs)  # Connection and model warm-up
+        barrier.wait()
+        deadline = time.perf_counter() + seconds
+        while True:
+            start = time.perf_counter()
+            if start >= deadline:
+                break
+            action = client.predict(obs)
+            latencies.append(time.perf_counter() - start)
+            obs, _, terminated, truncated, _ = env.step(action)
+            if terminated or truncated:
+                obs, _ = env.reset()
+    results.put(np.array(latencies))
+
+
+def run_load(address, n_clients, seconds, model=""):
+    """Runs the controllers against the server at `address`; returns the latencies (s) of all requests."""
+    ctx = _context()
+    barrier = ctx.Barrier(n_clients + 1)
+    results = ctx.Queue()
+    clients = [ctx.Process(target=_controller, args=(address, model, seed, seconds, barrier, results))
+               for seed in range(n_clients)]
+    for process in clients:
+        process.start()
+    barrier.wait()  # Every controller connected and warmed up
+    latencies = np.concatenate([results.get() for _ in clients])
+    for process in clients:
+        process.join()
+    return latencies
+
+
+def baseline(model_path, seconds):
+    """Latencies (s) of model.predict on one observation at a time, in the controller's process."""
+    from Environment.custom_env import FishFeedingEnv
+    from Training.model_registry import load_model
+
+    model = load_model(model_path)
+    env = FishFeedingEnv()
+    obs, _ = env.reset(seed=0)
+    model.predict(obs, deterministic=True)
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        action, _ = model.predict(obs, deterministic=True)
+        latencies.append(time.perf_counter() - start)
+        obs, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            obs, _ = env.reset()
+    return np.array(latencies)
+
+
+def print_latencies(label, latencies, seconds):
+    ms = latencies * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    print(f"{label:<28}{len(ms) / seconds:>10.0f}{p50:>10.3f}{p90:>10.3f}{p99:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the policy server with simulated tank controllers.")
+    parser.add_argument("--address", default=None, help="running server (default: start one for the run)")
+    parser.add_argument("--clients", type=int, default=32, help="controller processes")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--model", default="", help="model name under models/ (default: the server's default)")
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--backend", choices=["numpy", "sb3"], default="numpy")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=0.0)
+    parser.add_argument("--baseline", action="store_true", help="also time model.predict in-process")
+    args = parser.parse_args()
+
+    server, tmp_dir, address = None, None, args.address
+    if address is None:
+        tmp_dir = tempfile.mkdtemp(prefix="fish_policy_")
+        address = f"unix:{os.path.join(tmp_dir, 'server.sock')}"
+        server_kwargs = dict(models_dir=args.models_dir, default_model=args.model or None, backend=args.backend,
+                             max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+        server = _context().Process(target=_run_server, args=(address, server_kwargs))
+        server.start()
+        _wait_for_server(address, server)
+
+    try:
+        print(f"👥 {args.clients} controllers for {args.seconds:g}s against {address}")
+        latencies = run_load(address, args.clients, args.seconds, args.model)
+        with PolicyClient(address) as client:
+            stats = client.stats()
+
+        header = f"{'':<28}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+        print("\n" + header)
+        print("-" * len(header))
+        print_latencies("Policy server (clients)", latencies, args.seconds)
+        print(f"{'Policy server (server)':<28}{'':>10}{stats['p50_ms']:>10.3f}{'':>10}{stats['p99_ms']:>10.3f}")
+        if args.baseline:
+            model = args.model or next(iter(stats["models"]))
+            model_path = os.path.join(args.models_dir, model + ".zip")
+            print_latencies("model.predict, 1 process", baseline(model_path, args.seconds), args.seconds)
+        print(f"\n📦 Mean batch: {stats['mean_batch']:.1f} observations over {stats['batches']} forward passes")
+    finally:
+        if server is not None:
+            os.kill(server.pid, signal.SIGINT)
+            server.join()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
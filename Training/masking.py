@@ -0,0 +1,165 @@
+"""
+masking.py
+==========
+Action masking for the PPO/A2C/DQN fish feeding agents.
+
+Moves into a wall are no-ops, feeding a fed cell is overfeeding and skipping a
+hungry cell always loses to feeding it, so about a third of the actions an
+unmasked agent samples teach it nothing new. The valid actions only depend on
+the observation (agent x/y and the hunger of its cell, see
+Environment/custom_env.py:action_masks_from_obs), so the policies here compute
+the mask from the observation they are given and no rollout or replay buffer
+has to store it:
+- MaskedActorCriticPolicy (PPO/A2C) gives the invalid actions a logit of
+  -1e8, for sampling, log-probabilities and entropy alike
+- MaskedDQNPolicy (DQN) gives them a Q-value of -1e8, so neither the greedy
+  action nor the bootstrapped target can pick them
+- MaskedDQN also draws its random warm-up and epsilon-greedy actions among
+  the valid ones only
+The mask is FishFeedingEnv's own `action_masks()` (and FishFeedingVecEnv's),
+so trained models also pick valid actions in evaluate_policy, the recorders
+and the plain FishFeedingEnv. It is not FishFleetVecEnv's with several
+drones: the fleet also masks moves into cells held by other drones, which the
+observation doesn't show, so experiment_runner rejects `action_mask` there.
+
+Usage:
+    model = PPO(MaskedActorCriticPolicy, env, ...)
+    model = MaskedDQN("MlpPolicy", env, ...)          # MaskedDQNPolicy
+    # or `action_mask: true` in an experiment spec run
+"""
+
+import os
+import sys
+
+import numpy as np
+import torch as th
+from gymnasium import spaces
+from stable_baselines3 import DQN
+from stable_baselines3.common.distributions import CategoricalDistribution
+from stable_baselines3.common.policies import ActorCriticPolicy
+from stable_baselines3.dqn.policies import DQNPolicy, QNetwork
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Environment.custom_env import action_masks_from_obs
+
+MASKED_VALUE = -1e8  # Logit / Q-value of an invalid action
+
+
+def _check_action_space(action_space):
+    if not isinstance(action_space, spaces.Discrete) or action_space.n != 6:
+        raise ValueError(f"Action masking needs FishFeedingEnv's Discrete(6) actions, got {action_space}")
+
+
+def random_valid_actions(masks):
+    """One uniformly random valid action per mask row (np.random, like DQN's own exploration)."""
+    return (np.random.random_sample(masks.shape) * masks).argmax(axis=-1)
+
+
+# ======================
+# PPO / A2C
+# ======================
+class MaskedCategoricalDistribution(CategoricalDistribution):
+    """Categorical distribution over the valid actions only."""
+
+    def proba_distribution(self, action_logits, action_masks=None):
+        if action_masks is not None:
+            action_logits = th.where(action_masks, action_logits, MASKED_VALUE)
+        return super().proba_distribution(action_logits)
+
+
+class MaskedActorCriticPolicy(ActorCriticPolicy):
+    """
+    ActorCriticPolicy whose action distribution excludes the invalid actions of
+    each observation.
+
+    :param obs_window: the env's obs_window, if its observations are patches
+    """
+
+    def __init__(self, observation_space, action_space, lr_schedule, obs_window=None, **kwargs):
+        _check_action_space(action_space)
+        super().__init__(observation_space, action_space, lr_schedule, **kwargs)
+        self.obs_window = obs_window
+        self.action_dist = MaskedCategoricalDistribution(action_space.n)
+        self._action_masks = None  # Masks of the observations being evaluated, see _get_action_dist_from_latent
+
+    def _get_constructor_parameters(self):
+        data = super()._get_constructor_parameters()
+        data["obs_window"] = self.obs_window
+        return data
+
+    # The entry points that see the observations keep their masks for the distribution
+    def forward(self, obs, deterministic=False):
+        self._action_masks = action_masks_from_obs(obs, self.obs_window)
+        return super().forward(obs, deterministic)
+
+    def evaluate_actions(self, obs, actions):
+        self._action_masks = action_masks_from_obs(obs, self.obs_window)
+        return super().evaluate_actions(obs, actions)
+
+    def get_distribution(self, obs):
+        self._action_masks = action_masks_from_obs(obs, self.obs_window)
+        return super().get_distribution(obs)
+
+    def _get_action_dist_from_latent(self, latent_pi):
+        return self.action_dist.proba_distribution(self.action_net(latent_pi), self._action_masks)
+
+
+# ======================
+# DQN
+# ======================
+class MaskedQNetwork(QNetwork):
+    """QNetwork reporting MASKED_VALUE for the invalid actions."""
+
+    def __init__(self, *args, obs_window=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.obs_window = obs_window
+
+    def forward(self, obs):
+        q_values = super().forward(obs)
+        return th.where(action_masks_from_obs(obs, self.obs_window), q_values, MASKED_VALUE)
+
+
+class MaskedDQNPolicy(DQNPolicy):
+    """
+    DQNPolicy on MaskedQNetworks (online and target).
+
+    :param obs_window: the env's obs_window, if its observations are patches
+    """
+
+    def __init__(self, observation_space, action_space, lr_schedule, obs_window=None, **kwargs):
+        _check_action_space(action_space)
+        self.obs_window = obs_window  # Read by make_q_net, which the parent constructor calls
+        super().__init__(observation_space, action_space, lr_schedule, **kwargs)
+
+    def make_q_net(self):
+        net_args = self._update_features_extractor(self.net_args, features_extractor=None)
+        return MaskedQNetwork(obs_window=self.obs_window, **net_args).to(self.device)
+
+    def _get_constructor_parameters(self):
+        data = super()._get_constructor_parameters()
+        data["obs_window"] = self.obs_window
+        return data
+
+
+class MaskedDQN(DQN):
+    """
+    DQN whose warm-up and epsilon-greedy actions are drawn among the valid ones.
+    Every action in the replay buffer is then valid, so the masked Q-values are
+    never regressed on.
+    """
+
+    policy_aliases = {"MlpPolicy": MaskedDQNPolicy}
+
+    def _random_actions(self, observation):
+        return random_valid_actions(action_masks_from_obs(np.asarray(observation), self.policy.obs_window))
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=False):
+        if not deterministic and np.random.rand() < self.exploration_rate:
+            return self._random_actions(observation), state
+        return self.policy.predict(observation, state, episode_start, deterministic)
+
+    def _sample_action(self, learning_starts, action_noise=None, n_envs=1):
+        if self.num_timesteps < learning_starts:
+            actions = self._random_actions(self._last_obs)
+            return actions, actions
+        return super()._sample_action(learning_starts, action_noise, n_envs)
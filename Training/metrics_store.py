@@ -0,0 +1,322 @@
+"""
+metrics_store.py
+================
+Incremental, cached reader for the training logs the plotting scripts use.
+
+TensorBoard event files are read as raw TFRecords (length-prefixed protobuf
+`Event`s) with a tiny hand-rolled decoder, so neither tensorboard nor protobuf
+is imported. For every event file the parsed scalars are kept as columns
+(step, wall time, value per tag) in a `.<name>.metrics.npz` cache beside it,
+together with the byte offset parsed so far. Re-reading a run that has grown
+only parses the new bytes; a file that shrank or was replaced is re-read from
+the start. `evaluations.npz` files are rewritten whole by EvalCallback, so
+they are cached in memory by modification time and size.
+
+Usage:
+    from Training.metrics_store import MetricsStore
+    store = MetricsStore()
+    steps, values = store.scalars("logs/reinforce/A2C_1", "rollout/ep_rew_mean", max_points=500)
+    python Training/metrics_store.py logs/reinforce/A2C_1        # list the tags of a run
+"""
+
+import glob
+import os
+import struct
+import sys
+
+import numpy as np
+
+CACHE_SUFFIX = ".metrics.npz"
+HEAD_BYTES = 64  # Start of the file kept with the cache to spot a replaced file
+EVENT_FILE_PATTERN = "*tfevents*"
+
+# TensorFlow dtype enum values of the tensors that can hold a scalar summary
+_DT_FLOAT, _DT_DOUBLE = 1, 2
+
+
+# ======================
+# PROTOBUF DECODING
+# ======================
+def _varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf):
+    """Yields (field number, wire type, value) for a protobuf message; length-delimited values are memoryviews."""
+    pos, end = 0, len(buf)
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _varint(buf, pos)
+        elif wire_type == 1:
+            value, pos = buf[pos:pos + 8], pos + 8
+        elif wire_type == 2:
+            length, pos = _varint(buf, pos)
+            value, pos = buf[pos:pos + length], pos + length
+        elif wire_type == 5:
+            value, pos = buf[pos:pos + 4], pos + 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield field, wire_type, value
+
+
+def _tensor_scalar(buf):
+    """First value of a float/double TensorProto (newer writers log scalars as tensors)."""
+    dtype, content, values = None, None, []
+    for field, wire_type, value in _fields(buf):
+        if field == 1:
+            dtype = value
+        elif field == 4:
+            content = bytes(value)
+        elif field == 5:  # float_val, packed or not
+            values.extend(struct.unpack(f"<{len(value) // 4}f", value))
+        elif field == 6:  # double_val
+            values.extend(struct.unpack(f"<{len(value) // 8}d", value))
+    if values:
+        return values[0]
+    if content and dtype in (_DT_FLOAT, _DT_DOUBLE):
+        return struct.unpack_from("<f" if dtype == _DT_FLOAT else "<d", content)[0]
+    return None
+
+
+def _parse_event(buf):
+    """Returns (step, wall_time, [(tag, value), ...]) for one serialized Event."""
+    step, wall_time, scalars = 0, 0.0, []
+    for field, _, value in _fields(buf):
+        if field == 1:
+            wall_time = struct.unpack("<d", value)[0]
+        elif field == 2:
+            step = value
+        elif field == 5:  # Summary
+            for _, _, summary_value in _fields(value):
+                tag, scalar = None, None
+                for vfield, _, v in _fields(summary_value):
+                    if vfield == 1:
+                        tag = bytes(v).decode("utf-8")
+                    elif vfield == 2:
+                        scalar = struct.unpack("<f", v)[0]
+                    elif vfield == 8 and scalar is None:
+                        scalar = _tensor_scalar(v)
+                if tag is not None and scalar is not None:
+                    scalars.append((tag, scalar))
+    return step, wall_time, scalars
+
+
+def read_records(path, offset=0):
+    """
+    Reads the complete TFRecords of `path` from `offset`. Returns the record
+    payloads and the offset just past the last complete one, so a record that
+    is still being written is picked up by the next read.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    records, pos = [], 0
+    view = memoryview(data)
+    while pos + 12 <= len(data):
+        (length,) = struct.unpack_from("<Q", data, pos)
+        end = pos + 12 + length + 4  # length, length CRC, payload, payload CRC
+        if end > len(data):
+            break
+        records.append(view[pos + 12:pos + 12 + length])
+        pos = end
+    return records, offset + pos
+
+
+# ======================
+# CACHE
+# ======================
+class _EventFileCache:
+    """Scalar columns of one event file, plus the offset, mtime and head they were parsed with."""
+
+    def __init__(self):
+        self.offset = 0
+        self.mtime = 0.0
+        self.head = b""
+        self.columns = {}  # tag -> (steps, wall_times, values)
+
+    @classmethod
+    def load(cls, path):
+        cache = cls()
+        with np.load(path, allow_pickle=False) as data:
+            cache.offset = int(data["offset"])
+            cache.mtime = float(data["mtime"])
+            cache.head = data["head"].tobytes()
+            for i, tag in enumerate(data["tags"]):
+                cache.columns[str(tag)] = (data[f"steps{i}"], data[f"wall_times{i}"], data[f"values{i}"])
+        return cache
+
+    def save(self, path):
+        arrays = {"offset": self.offset, "mtime": self.mtime, "head": np.frombuffer(self.head, dtype=np.uint8),
+                  "tags": np.array(sorted(self.columns), dtype=str)}
+        for i, tag in enumerate(sorted(self.columns)):
+            arrays[f"steps{i}"], arrays[f"wall_times{i}"], arrays[f"values{i}"] = self.columns[tag]
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def extend(self, records):
+        new = {}
+        for record in records:
+            step, wall_time, scalars = _parse_event(record)
+            for tag, value in scalars:
+                new.setdefault(tag, ([], [], []))
+                new[tag][0].append(step)
+                new[tag][1].append(wall_time)
+                new[tag][2].append(value)
+        for tag, (steps, wall_times, values) in new.items():
+            columns = (np.array(steps, dtype=np.int64), np.array(wall_times), np.array(values, dtype=np.float32))
+            if tag in self.columns:
+                columns = tuple(np.concatenate(pair) for pair in zip(self.columns[tag], columns))
+            self.columns[tag] = columns
+
+
+def _read_head(path):
+    with open(path, "rb") as f:
+        return f.read(HEAD_BYTES)
+
+
+def _cache_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}{CACHE_SUFFIX}")
+
+
+# ======================
+# SERIES HELPERS
+# ======================
+def downsample(steps, values, max_points):
+    """Averages consecutive points into at most `max_points` buckets."""
+    steps, values = np.asarray(steps), np.asarray(values)
+    if max_points is None or len(steps) <= max_points:
+        return steps, values
+    starts = np.linspace(0, len(steps), max_points, endpoint=False).astype(np.int64)
+    counts = np.diff(np.append(starts, len(steps)))
+    return (np.add.reduceat(steps.astype(np.float64), starts) / counts,
+            np.add.reduceat(values.astype(np.float64), starts) / counts)
+
+
+def align(series, n_points=500):
+    """
+    Interpolates named (steps, values) series onto one shared step grid over
+    their combined range; each series is NaN outside its own range.
+    """
+    series = {name: s for name, s in series.items() if len(s[0])}
+    if not series:
+        return np.array([]), {}
+    low = min(float(np.min(t)) for t, _ in series.values())
+    high = max(float(np.max(t)) for t, _ in series.values())
+    grid = np.linspace(low, high, n_points)
+    aligned = {}
+    for name, (t, v) in series.items():
+        order = np.argsort(t, kind="stable")
+        t, v = np.asarray(t)[order], np.asarray(v)[order]
+        values = np.interp(grid, t, v)
+        values[(grid < t[0]) | (grid > t[-1])] = np.nan
+        aligned[name] = values
+    return grid, aligned
+
+
+# ======================
+# STORE
+# ======================
+class MetricsStore:
+    """
+    Serves scalar series from TensorBoard logs and EvalCallback results.
+
+    Event files are parsed incrementally and their columns cached on disk
+    (`persist=False` keeps the cache in memory only); `bytes_read` counts the
+    event-file bytes parsed so far, which shows what a refresh actually cost.
+    """
+
+    def __init__(self, persist=True):
+        self.persist = persist
+        self.bytes_read = 0
+        self._event_files = {}  # abspath -> _EventFileCache
+        self._evaluations = {}  # abspath -> ((mtime, size), timesteps, results)
+
+    def _event_file(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        cache = self._event_files.get(path)
+        if cache is None and self.persist and os.path.exists(_cache_path(path)):
+            try:
+                cache = _EventFileCache.load(_cache_path(path))
+            except (OSError, ValueError, KeyError):
+                cache = None  # Unreadable cache: parse the file again
+        if cache is not None and stat.st_mtime == cache.mtime and stat.st_size == cache.offset:
+            return cache  # Unchanged since the last read
+        head = _read_head(path)
+        if cache is None or stat.st_size < cache.offset or head[:len(cache.head)] != cache.head:
+            cache = _EventFileCache()  # New, or truncated/replaced since it was cached
+        records, offset = read_records(path, cache.offset)
+        self.bytes_read += offset - cache.offset
+        cache.extend(records)
+        cache.offset, cache.mtime, cache.head = offset, stat.st_mtime, head[:min(offset, HEAD_BYTES)]
+        if self.persist:
+            cache.save(_cache_path(path))
+        self._event_files[path] = cache
+        return cache
+
+    @staticmethod
+    def event_files(log_dir):
+        """Event files of a run directory (not recursive, like TensorBoard's per-run reader), oldest first."""
+        if os.path.isfile(log_dir):
+            return [log_dir]
+        if not os.path.isdir(log_dir):
+            raise FileNotFoundError(f"Log directory not found: {log_dir}")
+        paths = [p for p in glob.glob(os.path.join(log_dir, EVENT_FILE_PATTERN)) if not p.endswith(CACHE_SUFFIX)]
+        return sorted(paths, key=os.path.getmtime)
+
+    def tags(self, log_dir):
+        tags = set()
+        for path in self.event_files(log_dir):
+            tags.update(self._event_file(path).columns)
+        return sorted(tags)
+
+    def scalars(self, log_dir, tag, max_points=None, wall_time=False):
+        """
+        Returns (steps, values) of a scalar tag across the run's event files,
+        sorted by step, optionally downsampled (and wall times with `wall_time`).
+        """
+        columns = [self._event_file(path).columns.get(tag) for path in self.event_files(log_dir)]
+        columns = [c for c in columns if c is not None]
+        if not columns:
+            raise ValueError(f"Tag '{tag}' not found. Available: {self.tags(log_dir)}")
+        steps, wall_times, values = (np.concatenate(parts) for parts in zip(*columns))
+        order = np.argsort(steps, kind="stable")
+        steps, wall_times, values = steps[order], wall_times[order], values[order]
+        if wall_time:
+            return steps, wall_times, values
+        return downsample(steps, values, max_points)
+
+    def evaluations(self, path, max_points=None):
+        """Returns (timesteps, mean reward over the eval episodes) from an evaluations.npz."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        key = (stat.st_mtime, stat.st_size)
+        cached = self._evaluations.get(path)
+        if cached is None or cached[0] != key:
+            with np.load(path) as data:
+                cached = (key, data["timesteps"], data["results"].mean(axis=1))
+            self._evaluations[path] = cached
+        return downsample(cached[1], cached[2], max_points)
+
+
+if __name__ == "__main__":
+    store = MetricsStore()
+    for log_dir in sys.argv[1:] or ["logs"]:
+        for root, _, _ in os.walk(log_dir):
+            if not glob.glob(os.path.join(root, EVENT_FILE_PATTERN)):
+                continue
+            print(f"📈 {root}")
+            for tag in store.tags(root):
+                steps, values = store.scalars(root, tag)
+                print(f"   {tag:<32}{len(steps):>7} points   last step {steps[-1]:>9}   last value {values[-1]:.4g}")
@@ -0,0 +1,167 @@
+"""
+model_registry.py
+=================
+Index of the trained checkpoints under `models/`, with load-once caching.
+
+Indexing only reads the small `data` entry inside each SB3 zip and the
+`evaluations.npz` eval logs, so it never imports torch or stable_baselines3.
+Those heavy imports happen on the first `load_model` call, and every model is
+loaded at most once per process (LRU cache keyed by path + modification time,
+so a retrained model is picked up automatically). Loaded models are for
+inference: their training schedules are not unpickled (see INFERENCE_OBJECTS).
+
+Usage:
+    python Training/model_registry.py          # print the index
+"""
+
+import glob
+import json
+import os
+import re
+import zipfile
+from dataclasses import dataclass
+from functools import lru_cache
+
+# Algorithm by the model's folder name (REINFORCE models are A2C)
+ALGO_BY_DIR = {
+    "dqn": "DQN",
+    "ppo": "PPO",
+    "a2c": "A2C",
+    "pg": "A2C",
+    "pg_checkpoints": "A2C",
+}
+
+MODEL_CACHE_SIZE = 16
+
+
+@dataclass
+class ModelInfo:
+    path: str
+    algorithm: str
+    timesteps: int
+    eval_score: float = None  # Mean eval reward logged for this checkpoint, if any
+    mtime: float = 0.0
+
+
+# ======================
+# INDEXING
+# ======================
+def _read_zip_data(path):
+    """Returns the JSON `data` entry SB3 stores in its model zips."""
+    with zipfile.ZipFile(path) as archive:
+        return json.loads(archive.read("data"))
+
+
+def infer_algorithm(path, data=None, models_dir="models"):
+    """
+    Returns the SB3 algorithm name of a saved model. The saved hyperparameters
+    decide (PPO has a clip range, DQN an exploration rate); the folder name under
+    models/ is the fallback.
+    """
+    if data is not None:
+        if "exploration_rate" in data or "target_update_interval" in data:
+            return "DQN"
+        if "clip_range" in data:
+            return "PPO"
+        if "n_steps" in data:
+            return "A2C"
+    parts = os.path.relpath(path, models_dir).split(os.sep)
+    for part in parts[:-1]:
+        if part in ALGO_BY_DIR:
+            return ALGO_BY_DIR[part]
+    raise ValueError(f"Can't tell the algorithm of {path}; expected one of {sorted(ALGO_BY_DIR)} in its path")
+
+
+def _eval_log_candidates(path, models_dir, logs_dir):
+    model_dir = os.path.dirname(path)
+    parts = os.path.relpath(path, models_dir).split(os.sep)
+    candidates = [
+        os.path.join(model_dir, "logs", "evaluations.npz"),
+        os.path.join(model_dir, "..", "logs", "evaluations.npz"),
+    ]
+    if len(parts) > 1:
+        candidates.append(os.path.join(logs_dir, parts[0], "evaluations.npz"))
+    return [c for c in candidates if os.path.exists(c)]
+
+
+def _eval_score(path, timesteps, models_dir, logs_dir):
+    """
+    Eval reward of a checkpoint from the EvalCallback logs: the best mean for
+    `best_model.zip`, otherwise the mean logged at the checkpoint's timestep.
+    """
+    import numpy as np
+
+    for log_path in _eval_log_candidates(path, models_dir, logs_dir):
+        evals = np.load(log_path)
+        means = evals["results"].mean(axis=1)
+        if os.path.basename(path) == "best_model.zip":
+            return float(means.max())
+        match = np.flatnonzero(evals["timesteps"] == timesteps)
+        if len(match):
+            return float(means[match[-1]])
+    return None
+
+
+def index_models(models_dir="models", logs_dir="logs"):
+    """
+    Lists a ModelInfo for every .zip model under models_dir, sorted by path.
+    """
+    infos = []
+    for path in sorted(glob.glob(os.path.join(models_dir, "**", "*.zip"), recursive=True)):
+        data = _read_zip_data(path)
+        timesteps = data.get("num_timesteps")
+        if timesteps is None:
+            match = re.search(r"_(\d+)_steps\.zip$", path)
+            timesteps = int(match.group(1)) if match else 0
+        infos.append(ModelInfo(
+            path=path,
+            algorithm=infer_algorithm(path, data, models_dir),
+            timesteps=int(timesteps),
+            eval_score=_eval_score(path, timesteps, models_dir, logs_dir),
+            mtime=os.path.getmtime(path),
+        ))
+    return infos
+
+
+# ======================
+# LOADING
+# ======================
+# Saved training schedules, replaced by constants on load. They are pickled
+# functions, which fail to unpickle on another Python version than the one the
+# model was trained with ("code() argument 13 must be str, not int"), and
+# predict() never calls them.
+INFERENCE_OBJECTS = ("lr_schedule", "clip_range", "clip_range_vf", "exploration_schedule")
+
+
+@lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _load_cached(path, mtime, algorithm, device):
+    import stable_baselines3  # Deferred: only paid once a model is actually needed
+    from stable_baselines3.common.utils import ConstantSchedule
+
+    data = _read_zip_data(path)
+    custom_objects = {key: ConstantSchedule(0.0) for key in INFERENCE_OBJECTS if key in data}
+    return getattr(stable_baselines3, algorithm).load(path, device=device, custom_objects=custom_objects)
+
+
+def load_model(path, algorithm=None, device="cpu"):
+    """
+    Loads a saved SB3 model, at most once per process while the file is unchanged.
+    The algorithm is inferred from the zip when not given.
+    """
+    path = os.path.abspath(path)
+    if algorithm is None:
+        algorithm = infer_algorithm(path, _read_zip_data(path))
+    return _load_cached(path, os.path.getmtime(path), algorithm.upper(), device)
+
+
+def clear_cache():
+    _load_cached.cache_clear()
+
+
+if __name__ == "__main__":
+    header = f"{'Model':<62}{'Algo':<6}{'Timesteps':>11}{'Eval score':>12}"
+    print(header)
+    print("-" * len(header))
+    for info in index_models():
+        score = f"{info.eval_score:.2f}" if info.eval_score is not None else "-"
+        print(f"{info.path:<62}{info.algorithm:<6}{info.timesteps:>11}{score:>12}")
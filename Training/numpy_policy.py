@@ -0,0 +1,207 @@
+"""
+numpy_policy.py
+===============
+Torch-free inference for the trained MlpPolicy networks.
+
+`export_policy` turns a saved PPO/A2C/DQN zip into a small `.npz` of layer
+weights. `NumpyPolicy` loads that file and picks greedy actions for a batch of
+observations with a few NumPy matrix products, the same actions as
+`model.predict(obs, deterministic=True)`, including the action masks of models
+trained with Training/masking.py. Only the exporter needs torch and
+stable_baselines3; importing this module for inference costs only NumPy.
+
+Usage:
+    python Training/numpy_policy.py models/ppo/best_model.zip            # writes models/ppo/best_model.npz
+    python Training/numpy_policy.py models/ppo/best_model.zip --check    # also compares against SB3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ACTIVATIONS = {
+    "identity": lambda x: x,
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+    "leakyrelu": lambda x: np.where(x > 0, x, 0.01 * x),
+    "elu": lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+}
+
+
+class NumpyPolicy:
+    """
+    Greedy MLP policy evaluated with NumPy.
+
+    The network is a chain of dense layers `x @ W + b`, each followed by its
+    activation. The action is the argmax of the last layer: the action logits
+    for PPO/A2C, the Q-values for DQN. With `action_mask` the argmax only runs
+    over the valid actions of each observation.
+    """
+
+    def __init__(self, weights, biases, activations, algorithm="", action_mask=False, obs_window=None):
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activations = [ACTIVATIONS[name] for name in activations]
+        self.activation_names = list(activations)
+        self.algorithm = algorithm
+        self.obs_dim = self.weights[0].shape[0]
+        self.n_actions = self.weights[-1].shape[1]
+        self.action_mask = action_mask
+        self.obs_window = obs_window
+        self._action_masks_from_obs = None
+        if action_mask:
+            # Resolved once here, so only masked policies load custom_env (and gymnasium)
+            root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+            if root not in sys.path:
+                sys.path.append(root)
+            from Environment.custom_env import action_masks_from_obs
+            self._action_masks_from_obs = action_masks_from_obs
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            n_layers = int(data["n_layers"])
+            return cls(
+                [data[f"W{i}"] for i in range(n_layers)],
+                [data[f"b{i}"] for i in range(n_layers)],
+                [str(name) for name in data["activations"]],
+                algorithm=str(data["algorithm"]),
+                action_mask=bool(data["action_mask"]) if "action_mask" in data else False,
+                obs_window=(int(data["obs_window"]) or None) if "obs_window" in data else None,
+            )
+
+    def save(self, path):
+        arrays = {"n_layers": len(self.weights), "algorithm": self.algorithm,
+                  "activations": np.array(self.activation_names), "action_mask": self.action_mask,
+                  "obs_window": self.obs_window or 0}
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"W{i}"] = w
+            arrays[f"b{i}"] = b
+        np.savez(path, **arrays)
+
+    def forward(self, obs):
+        """Returns the output layer (logits or Q-values) for a batch of observations."""
+        x = np.asarray(obs, dtype=np.float32).reshape(-1, self.obs_dim)
+        for w, b, activation in zip(self.weights, self.biases, self.activations):
+            x = activation(x @ w + b)
+        return x
+
+    def predict(self, obs):
+        """
+        Greedy actions for a batch of observations, or a single action for one
+        observation.
+        """
+        output = self.forward(obs)
+        if self.action_mask:
+            masks = self._action_masks_from_obs(np.asarray(obs, dtype=np.float32).reshape(-1, self.obs_dim), self.obs_window)
+            output[~masks] = -np.inf
+        actions = output.argmax(axis=1)
+        return actions[0] if np.ndim(obs) == 1 else actions
+
+
+# ======================
+# EXPORT (needs torch + stable_baselines3)
+# ======================
+def _dense_layers(modules):
+    """Splits a sequence of torch modules into (Linear, activation name) pairs."""
+    import torch.nn as nn
+
+    layers = []
+    for module in modules:
+        if isinstance(module, nn.Linear):
+            layers.append([module, "identity"])
+        elif isinstance(module, (nn.Flatten, nn.Identity)):
+            continue
+        else:
+            name = type(module).__name__.lower()
+            if name not in ACTIVATIONS or not layers:
+                raise ValueError(f"Unsupported layer in policy network: {module}")
+            layers[-1][1] = name
+    return layers
+
+
+def policy_from_model(model):
+    """NumpyPolicy with the greedy network of a loaded SB3 model (ValueError if it isn't an MLP)."""
+    policy = model.policy
+    if hasattr(policy, "q_net"):  # DQN: argmax over the online Q-network
+        extractor = policy.q_net.features_extractor
+        modules = list(policy.q_net.q_net)
+    else:  # PPO / A2C: the actor half of the MlpExtractor, then the action head
+        extractor = policy.pi_features_extractor
+        modules = list(policy.mlp_extractor.policy_net) + [policy.action_net]
+    if type(extractor).__name__ != "FlattenExtractor":
+        raise ValueError("Only MlpPolicy models (FlattenExtractor features) can be exported")
+
+    layers = _dense_layers(modules)
+    return NumpyPolicy(
+        [linear.weight.detach().cpu().numpy().T for linear, _ in layers],
+        [linear.bias.detach().cpu().numpy() for linear, _ in layers],
+        [name for _, name in layers],
+        algorithm=type(model).__name__,
+        action_mask=hasattr(policy, "obs_window"),  # The mask-aware policies of Training/masking.py
+        obs_window=getattr(policy, "obs_window", None),
+    )
+
+
+def export_policy(model_path, output_path=None, algorithm=None):
+    """
+    Writes the greedy network of a saved SB3 model to `output_path` (defaults to
+    the model path with a .npz extension) and returns the NumpyPolicy.
+    """
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from Training.model_registry import load_model
+
+    numpy_policy = policy_from_model(load_model(model_path, algorithm))
+    numpy_policy.save(output_path or os.path.splitext(model_path)[0] + ".npz")
+    return numpy_policy
+
+
+def check_policy(model_path, numpy_policy, n_obs=100_000, seed=0):
+    """
+    Compares greedy actions with the SB3 model on observations from the batched
+    environment and returns the agreement rate and per-batch latencies.
+    """
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from Environment.vec_env import FishFeedingVecEnv
+    from Training.model_registry import load_model
+
+    model = load_model(model_path, numpy_policy.algorithm)
+    env = FishFeedingVecEnv(num_envs=1000)
+    env.seed(seed)
+    obs = env.reset()
+    rng = np.random.default_rng(seed)
+    batches = []
+    while len(batches) * env.num_envs < n_obs:
+        batches.append(obs)
+        obs, _, _, _ = env.step(rng.integers(0, env.action_space.n, env.num_envs))
+    obs = np.concatenate(batches)
+
+    start = time.perf_counter()
+    expected, _ = model.predict(obs, deterministic=True)
+    sb3_time = time.perf_counter() - start
+    start = time.perf_counter()
+    actions = numpy_policy.predict(obs)
+    numpy_time = time.perf_counter() - start
+    return float((actions == expected).mean()), sb3_time, numpy_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a saved SB3 MlpPolicy to a NumPy .npz.")
+    parser.add_argument("model", help="path of the SB3 .zip")
+    parser.add_argument("--output", default=None, help="defaults to the model path with .npz")
+    parser.add_argument("--algorithm", default=None, help="PPO/A2C/DQN, inferred when omitted")
+    parser.add_argument("--check", action="store_true", help="compare actions with SB3 afterwards")
+    args = parser.parse_args()
+
+    numpy_policy = export_policy(args.model, args.output, args.algorithm)
+    output = args.output or os.path.splitext(args.model)[0] + ".npz"
+    print(f"✅ Exported {numpy_policy.algorithm} policy to {output} ({os.path.getsize(output) / 1024:.1f} KB)")
+
+    if args.check:
+        agreement, sb3_time, numpy_time = check_policy(args.model, numpy_policy)
+        print(f"🔎 Greedy action agreement with SB3: {agreement:.4%}")
+        print(f"⏱️ 100k observations: SB3 {sb3_time * 1000:.1f} ms, NumPy {numpy_time * 1000:.1f} ms")
@@ -0,0 +1,325 @@
+"""
+pbt.py
+======
+Population-based training (PBT) of PPO / A2C agents on the fish tanks.
+
+A population of learners trains side by side, one worker process each
+(pinned to its own cores like the experiment runner's workers). Every
+`ready_steps` timesteps all members evaluate on the same seeded tanks and
+publish their policy weights into one shared-memory array. The driver ranks
+them; each member in the bottom `truncation` fraction copies the weights of
+a random member of the top fraction straight from shared memory (exploit)
+and continues with that member's hyperparameters, perturbed (explore):
+continuous values are scaled by one of `perturb_factors` and clipped to
+their range, choices move to a neighbouring value. The copying member's
+optimizer state is reset, since its moments belong to the old weights.
+
+Member 0 starts from the spec's hand-tuned `hyperparameters`, the others
+from values sampled in the `search` space. With `--no-exploit` the members
+just train independently on the same budget, which is the random-search
+baseline PBT should beat.
+
+The history of every round (scores, hyperparameters, who copied whom) is
+written to `<log_path>/pbt_history.json` and the final best member is saved
+to `save_path`.
+
+Usage:
+    python Training/pbt.py Training/configs/pbt_ppo.yaml
+    python Training/pbt.py Training/configs/pbt_ppo.yaml --no-exploit
+"""
+
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+PBT_ALGORITHMS = ("ppo", "a2c")
+PERTURB_FACTORS = (0.8, 1.2)
+
+
+def load_pbt_spec(path, exploit=True):
+    """
+    Loads a PBT spec (YAML or JSON). "{name}" in log_path / save_path is filled
+    in; runs without exploit get "_no_exploit" appended to the name.
+    """
+    with open(path) as f:
+        if path.endswith(".json"):
+            spec = json.load(f)
+        else:
+            import yaml
+            spec = yaml.safe_load(f)
+    spec.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    if not exploit:
+        spec["name"] += "_no_exploit"
+    for key in ("log_path", "save_path", "tensorboard_log"):
+        if isinstance(spec.get(key), str):
+            spec[key] = spec[key].format(name=spec["name"])
+    return spec
+
+
+# ======================
+# HYPERPARAMETERS
+# ======================
+def sample_hyperparameters(search, rng):
+    """
+    Draws one value per entry of the search space: `{values: [...]}` picks one,
+    `{min, max}` is uniform, and log-uniform with `log: true`.
+    """
+    hyperparameters = {}
+    for name, space in search.items():
+        if "values" in space:
+            hyperparameters[name] = space["values"][rng.integers(len(space["values"]))]
+        elif space.get("log"):
+            hyperparameters[name] = float(math.exp(rng.uniform(math.log(space["min"]), math.log(space["max"]))))
+        else:
+            hyperparameters[name] = float(rng.uniform(space["min"], space["max"]))
+    return hyperparameters
+
+
+def perturb(hyperparameters, search, rng, factors=PERTURB_FACTORS):
+    """Explore step: each searched value scaled by a random factor (clipped), or moved to a neighbouring choice."""
+    perturbed = dict(hyperparameters)
+    for name, space in search.items():
+        if "values" in space:
+            values = space["values"]
+            i = values.index(hyperparameters[name]) + rng.choice([-1, 1])
+            perturbed[name] = values[min(max(i, 0), len(values) - 1)]
+        else:
+            value = hyperparameters[name] * factors[rng.integers(len(factors))]
+            perturbed[name] = float(min(max(value, space["min"]), space["max"]))
+    return perturbed
+
+
+def apply_hyperparameters(model, hyperparameters):
+    """Sets hyperparameters on a live PPO / A2C model, rebuilding what depends on them."""
+    from stable_baselines3.common.utils import FloatSchedule
+
+    rebuild_buffer = False
+    for name, value in hyperparameters.items():
+        if name == "learning_rate":
+            model.learning_rate = value
+            model.lr_schedule = FloatSchedule(value)
+        elif name == "clip_range":
+            model.clip_range = FloatSchedule(value)
+        elif name in ("n_steps", "gamma", "gae_lambda"):
+            rebuild_buffer = rebuild_buffer or getattr(model, name) != value
+            setattr(model, name, value)
+        elif name in ("ent_coef", "vf_coef", "max_grad_norm", "n_epochs", "batch_size"):
+            setattr(model, name, value)
+        else:
+            raise ValueError(f"Hyperparameter '{name}' can't be changed during PBT")
+    if rebuild_buffer:
+        model.rollout_buffer = model.rollout_buffer_class(
+            model.n_steps, model.observation_space, model.action_space, device=model.device, gamma=model.gamma,
+            gae_lambda=model.gae_lambda, n_envs=model.n_envs, **model.rollout_buffer_kwargs,
+        )
+
+
+# ======================
+# MEMBERS
+# ======================
+def build_model(spec, hyperparameters, seed):
+    from Training.experiment_runner import make_env, resolve_model
+
+    algo_class, policy, mask_hyperparameters = resolve_model(spec)
+    hyperparameters = {**spec.get("hyperparameters", {}), **hyperparameters}
+    for key, value in mask_hyperparameters.items():
+        hyperparameters[key] = {**hyperparameters.get(key, {}), **value}
+    return algo_class(
+        policy=policy,
+        env=make_env(spec.get("env", {})),
+        seed=seed,
+        tensorboard_log=spec.get("tensorboard_log"),
+        verbose=0,
+        **hyperparameters,
+    )
+
+
+def _member_worker(remote, parent_remote, index, spec, hyperparameters, weights, slot_counter):
+    """Trains one member on command; its weights live in row `index` of the shared `weights` array."""
+    parent_remote.close()
+    from Training.experiment_runner import _init_worker
+    resources = spec.get("resources", {})
+    _init_worker(slot_counter, resources.get("cores_per_run", 1), resources.get("torch_threads", 1))
+
+    import torch
+    from torch.nn.utils import parameters_to_vector, vector_to_parameters
+    from Training.evaluate_models import run_episodes
+
+    model = build_model(spec, hyperparameters, spec.get("seed", 0) + index)
+    population = np.frombuffer(weights, dtype=np.float32).reshape(spec["population"], -1)
+    env_kwargs = spec.get("env", {}).get("kwargs", {})
+
+    def predict(obs):
+        actions, _ = model.predict(obs, deterministic=True)
+        return actions
+
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == "train":
+                steps, eval_seed = data
+                start = time.perf_counter()
+                model.learn(steps, reset_num_timesteps=False, tb_log_name=f"member_{index}")
+                episodes = run_episodes(predict, spec.get("eval_episodes", 200),
+                                        n_envs=min(spec.get("eval_episodes", 200), 256), seed=eval_seed,
+                                        env_kwargs=env_kwargs)
+                population[index] = parameters_to_vector(model.policy.parameters()).detach().cpu().numpy()
+                remote.send({"timesteps": int(model.num_timesteps), "score": float(episodes["reward"].mean()),
+                             "seconds": time.perf_counter() - start})
+            elif cmd == "exploit":
+                source, hyperparameters = data
+                with torch.no_grad():
+                    vector_to_parameters(torch.as_tensor(population[source].copy(), device=model.device),
+                                         model.policy.parameters())
+                model.policy.optimizer.state.clear()  # Its moments belong to the old weights
+                apply_hyperparameters(model, hyperparameters)
+                remote.send(None)
+            elif cmd == "save":
+                model.save(data)
+                remote.send(None)
+            elif cmd == "close":
+                model.get_env().close()
+                remote.close()
+                break
+            else:
+                raise NotImplementedError(f"`{cmd}` is not implemented in the PBT worker")
+    except KeyboardInterrupt:
+        pass
+
+
+class Population:
+    """Worker processes of the members, and the shared array their weights are exchanged through."""
+
+    def __init__(self, spec, hyperparameters):
+        self.size = len(hyperparameters)
+        # Weight vector length from a throwaway model with the same architecture
+        probe = build_model(spec, hyperparameters[0], 0)
+        self.n_params = sum(p.numel() for p in probe.policy.parameters())
+        probe.get_env().close()
+
+        ctx = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+        self.weights = ctx.RawArray("f", self.size * self.n_params)
+        self._slot_counter = ctx.Value("i", 0)  # Kept alive until every worker has unpickled it
+        self.remotes, self.processes = [], []
+        for i, member_hyperparameters in enumerate(hyperparameters):
+            remote, work_remote = ctx.Pipe()
+            args = (work_remote, remote, i, spec, member_hyperparameters, self.weights, self._slot_counter)
+            # daemon=True: if the main process crashes, we should not cause things to hang
+            process = ctx.Process(target=_member_worker, args=args, daemon=True)
+            process.start()
+            work_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+
+    def call(self, cmd, data_per_member):
+        """Sends one command per member in `data_per_member` ({index: data}) and returns {index: reply}."""
+        for i, data in data_per_member.items():
+            self.remotes[i].send((cmd, data))
+        return {i: self.remotes[i].recv() for i in data_per_member}
+
+    def close(self):
+        for remote, process in zip(self.remotes, self.processes):
+            if process.is_alive():
+                remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+
+
+# ======================
+# DRIVER
+# ======================
+def run_pbt(spec, exploit=True):
+    """
+    Trains the population until every member has `total_timesteps`, exploiting
+    and exploring every `ready_steps`. Returns the history of rounds.
+    """
+    if spec["algorithm"] not in PBT_ALGORITHMS:
+        raise ValueError(f"PBT supports {PBT_ALGORITHMS}, got '{spec['algorithm']}'")
+    size = spec["population"]
+    search = spec.get("search", {})
+    rng = np.random.default_rng(spec.get("seed", 0))
+    # Member 0 starts from the hand-tuned values, the others anywhere in the search space
+    base = {name: spec.get("hyperparameters", {})[name] for name in search if name in spec.get("hyperparameters", {})}
+    hyperparameters = [{**sample_hyperparameters(search, rng), **(base if i == 0 else {})} for i in range(size)]
+    n_cut = max(1, int(size * spec.get("truncation", 0.25)))
+    factors = tuple(spec.get("perturb_factors", PERTURB_FACTORS))
+    log_path = spec.get("log_path", os.path.join("logs", "pbt", spec["name"]))
+    os.makedirs(log_path, exist_ok=True)
+
+    print(f"🧬 PBT '{spec['name']}': {size} {spec['algorithm'].upper()} members, "
+          f"{spec['total_timesteps']} timesteps each, ready every {spec['ready_steps']}"
+          f"{'' if exploit else ' (no exploit: independent members)'}")
+    population = Population(spec, hyperparameters)
+    history = []
+    start = time.time()
+    try:
+        timesteps = 0
+        round_index = 0
+        ranking = list(range(size))
+        while timesteps < spec["total_timesteps"]:
+            # Every member is scored on the same tanks in a round
+            eval_seed = spec.get("seed", 0) * 100_000 + round_index
+            results = population.call("train", {i: (spec["ready_steps"], eval_seed) for i in range(size)})
+            timesteps = min(result["timesteps"] for result in results.values())
+            ranking = sorted(range(size), key=lambda i: results[i]["score"], reverse=True)
+            record = {"round": round_index, "timesteps": timesteps, "wall_time": time.time() - start,
+                      "members": [{**results[i], "hyperparameters": hyperparameters[i]} for i in range(size)],
+                      "exploits": []}
+            print(f"🏁 Round {round_index} ({timesteps} steps): best member {ranking[0]} "
+                  f"{results[ranking[0]]['score']:.2f}, worst member {ranking[-1]} {results[ranking[-1]]['score']:.2f}")
+
+            if exploit and timesteps < spec["total_timesteps"]:
+                winners, losers = ranking[:n_cut], ranking[-n_cut:]
+                orders = {}
+                for loser in losers:
+                    source = int(rng.choice(winners))
+                    hyperparameters[loser] = perturb(hyperparameters[source], search, rng, factors)
+                    orders[loser] = (source, hyperparameters[loser])
+                    record["exploits"].append({"member": loser, "source": source})
+                    print(f"   🔁 member {loser} <- member {source}: {hyperparameters[loser]}")
+                population.call("exploit", orders)
+
+            history.append(record)
+            with open(os.path.join(log_path, "pbt_history.json.tmp"), "w") as f:
+                json.dump({"spec": spec, "rounds": history}, f, indent=2)
+            os.replace(os.path.join(log_path, "pbt_history.json.tmp"), os.path.join(log_path, "pbt_history.json"))
+            round_index += 1
+
+        best = ranking[0]
+        if spec.get("save_path"):
+            os.makedirs(os.path.dirname(spec["save_path"]) or ".", exist_ok=True)
+            population.call("save", {best: spec["save_path"]})
+            print(f"💾 Best member {best} saved to {spec['save_path']}")
+    finally:
+        population.close()
+
+    print_leaderboard(history[-1])
+    return history
+
+
+def print_leaderboard(record):
+    members = record["members"]
+    names = sorted({name for member in members for name in member["hyperparameters"]})
+    header = f"{'Member':<8}{'Score':>9}" + "".join(f"{name:>16}" for name in names)
+    print("\n" + header)
+    print("-" * len(header))
+    for i in sorted(range(len(members)), key=lambda i: members[i]["score"], reverse=True):
+        values = "".join(f"{members[i]['hyperparameters'][name]:>16.4g}" for name in names)
+        print(f"{i:<8}{members[i]['score']:>9.2f}{values}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Population-based training of PPO / A2C fish feeding agents.")
+    parser.add_argument("spec", help="YAML or JSON PBT spec")
+    parser.add_argument("--no-exploit", action="store_true", help="train the members independently (baseline)")
+    args = parser.parse_args()
+
+    run_pbt(load_pbt_spec(args.spec, exploit=not args.no_exploit), exploit=not args.no_exploit)
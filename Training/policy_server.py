@@ -0,0 +1,430 @@
+"""
+policy_server.py
+================
+Local policy-serving daemon for the tank feeding controllers.
+
+Controllers connect over a Unix socket (or TCP) and send FishFeedingEnv
+observations; the server answers with greedy actions. Requests for the same
+model that queue up while a forward pass runs are stacked and go through the
+next one together, so many controllers cost about as much as one;
+`max_wait_ms` also holds the first request of a batch for a short window.
+
+Models are loaded from `models/` (through Training/model_registry.py) and
+run as NumpyPolicy networks (Training/numpy_policy.py), or through SB3 for
+policies that can't be exported. A model whose zip changes on disk is
+reloaded in the background and swapped in between two batches. The server
+keeps request counts, batch sizes and p50/p99 latencies, returned by the
+`stats` command and printed every `log_interval` seconds.
+
+Wire format (little-endian), one response per request:
+    request:  command (u8), model name bytes (u16), observation floats (u32),
+              the model name (utf-8, empty for the default model), then the
+              float32 observations, one or more rows
+    response: status (u8, 0 = ok), payload bytes (u32), then the payload:
+              int32 actions, JSON stats, or an error message
+
+Usage:
+    python Training/policy_server.py                                   # best indexed model, unix:/tmp/fish_policy.sock
+    python Training/policy_server.py --model ppo/best_model --address 127.0.0.1:7878
+    # from a controller:
+    with PolicyClient("unix:/tmp/fish_policy.sock") as client:
+        action = client.predict(obs)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DEFAULT_ADDRESS = "unix:/tmp/fish_policy.sock"
+LATENCY_WINDOW = 100_000  # Latest requests kept for the percentiles
+
+REQUEST = struct.Struct("<BHI")
+RESPONSE = struct.Struct("<BI")
+PREDICT, STATS, RELOAD = 0, 1, 2
+OK, ERROR = 0, 1
+
+
+def parse_address(address):
+    """(socket family, address) of "unix:/path" (or a bare path) or "host:port"."""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    if os.sep in address or ":" not in address:
+        return socket.AF_UNIX, address
+    host, port = address.rsplit(":", 1)
+    return socket.AF_INET, (host, int(port))
+
+
+# ======================
+# SERVER
+# ======================
+@dataclass
+class _Request:
+    obs: np.ndarray
+    future: asyncio.Future
+
+
+@dataclass
+class _ServedModel:
+    name: str
+    path: str
+    mtime: float
+    predict: object  # Batch of observations -> batch of actions
+    obs_dim: int
+    backend: str
+    reloads: int = 0
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+
+
+class PolicyServer:
+    """
+    Serves the models under `models_dir` by name (their path there, without
+    .zip), with dynamic batching per model.
+
+    :param default_model: model used by requests without a name (default: the
+        best eval score in the model index)
+    :param backend: "numpy" (NumpyPolicy, falls back to SB3 for non-MLP
+        policies) or "sb3" (model.predict)
+    :param max_batch: observations per forward pass at most
+    :param max_wait_ms: how long the first request of a batch waits for others
+        (0: batch what is queued; a window only pays when cores are spare, on
+        one core it keeps the controllers in lockstep)
+    :param reload_interval: seconds between checks for changed model files
+    :param log_interval: seconds between stats lines (None: quiet)
+    """
+
+    def __init__(self, models_dir="models", default_model=None, backend="numpy", max_batch=256,
+                 max_wait_ms=0.0, reload_interval=2.0, log_interval=None):
+        if backend not in ("numpy", "sb3"):
+            raise ValueError(f"Unknown backend '{backend}'. Choose from ['numpy', 'sb3']")
+        self.models_dir = os.path.abspath(models_dir)
+        self.default_model = default_model or self._best_model()
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.reload_interval = reload_interval
+        self.log_interval = log_interval
+        self.models = {}
+        self._load_lock = None  # Created in the server's event loop
+        self._tasks = []  # Background tasks (batching per model, reload checks, logging)
+        self._loop = None
+        self._stopped = None
+        self._thread = None
+        self.reset_stats()
+
+    def _best_model(self):
+        from Training.model_registry import index_models
+
+        infos = index_models(self.models_dir)
+        if not infos:
+            raise ValueError(f"No models under {self.models_dir}")
+        best = max(infos, key=lambda info: (info.eval_score is not None, info.eval_score or 0, info.mtime))
+        return os.path.splitext(os.path.relpath(best.path, self.models_dir))[0]
+
+    def _model_path(self, name):
+        path = os.path.abspath(os.path.join(self.models_dir, name if name.endswith(".zip") else name + ".zip"))
+        if os.path.commonpath([path, self.models_dir]) != self.models_dir:
+            raise ValueError(f"Model '{name}' is outside {self.models_dir}")
+        if not os.path.exists(path):
+            raise ValueError(f"No model '{name}' under {self.models_dir}")
+        return path
+
+    def _load(self, path):
+        """(predict, obs_dim, backend) of the model at `path`; runs outside the event loop."""
+        from Training.model_registry import load_model
+
+        model = load_model(path)
+        obs_dim = model.observation_space.shape[0]
+        if self.backend == "numpy":
+            from Training.numpy_policy import policy_from_model
+            try:
+                return policy_from_model(model).predict, obs_dim, "numpy"
+            except ValueError as e:
+                print(f"⚠️ {os.path.basename(path)}: {e}; serving it through SB3")
+        return (lambda obs: model.predict(obs, deterministic=True)[0]), obs_dim, "sb3"
+
+    async def _get_model(self, name):
+        name = name or self.default_model
+        served = self.models.get(name)
+        if served is not None:
+            return served
+        async with self._load_lock:
+            if name not in self.models:
+                path = self._model_path(name)
+                mtime = os.path.getmtime(path)
+                predict, obs_dim, backend = await asyncio.get_running_loop().run_in_executor(None, self._load, path)
+                served = _ServedModel(name, path, mtime, predict, obs_dim, backend)
+                self.models[name] = served
+                self._tasks.append(asyncio.create_task(self._batch_loop(served)))
+                print(f"📦 Serving '{name}' ({backend}, {obs_dim} observation values)")
+        return self.models[name]
+
+    async def _batch_loop(self, served):
+        """Stacks the queued requests of one model into batches and answers them."""
+        queue = served.queue
+        while True:
+            batch = [await queue.get()]
+            if self.max_wait > 0:
+                await asyncio.sleep(self.max_wait)  # Lets the other controllers' requests arrive
+            rows = len(batch[0].obs)
+            while rows < self.max_batch and not queue.empty():
+                request = queue.get_nowait()
+                batch.append(request)
+                rows += len(request.obs)
+
+            obs = batch[0].obs if len(batch) == 1 else np.concatenate([request.obs for request in batch])
+            try:
+                actions = np.asarray(served.predict(obs), dtype=np.int32).reshape(rows)
+            except Exception as e:  # one bad batch must not stop the model
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            start = 0
+            for request in batch:
+                request.future.set_result(actions[start:start + len(request.obs)])
+                start += len(request.obs)
+            self.n_batches += 1
+            self.n_observations += rows
+
+    async def _predict(self, name, data):
+        served = await self._get_model(name)
+        obs = np.frombuffer(data, dtype=np.float32)
+        if len(obs) == 0 or len(obs) % served.obs_dim:
+            raise ValueError(f"Expected rows of {served.obs_dim} observation values, got {len(obs)} values")
+        future = asyncio.get_running_loop().create_future()
+        served.queue.put_nowait(_Request(obs.reshape(-1, served.obs_dim), future))
+        return (await future).tobytes()
+
+    async def _reload(self, name=None):
+        """Reloads the served models (or model `name`) whose file changed; returns their names."""
+        loop = asyncio.get_running_loop()
+        reloaded = []
+        for served in list(self.models.values()):
+            if name is not None and served.name != name:
+                continue
+            try:
+                mtime = os.path.getmtime(served.path)
+                if mtime == served.mtime:
+                    continue
+                predict, obs_dim, backend = await loop.run_in_executor(None, self._load, served.path)
+            except Exception as e:  # e.g. a zip still being written: keep the current model, retry later
+                print(f"⚠️ Reloading '{served.name}' failed: {e!r}")
+                continue
+            # Swapped between two batches of the event loop
+            served.predict, served.obs_dim, served.backend, served.mtime = predict, obs_dim, backend, mtime
+            served.reloads += 1
+            reloaded.append(served.name)
+            print(f"🔄 Reloaded '{served.name}'")
+        return reloaded
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self._reload()
+
+    async def _log(self):
+        while True:
+            await asyncio.sleep(self.log_interval)
+            s = self.stats()
+            print(f"📈 {s['requests_per_s']:.0f} req/s, batch {s['mean_batch']:.1f}, "
+                  f"p50 {s['p50_ms']:.2f} ms, p99 {s['p99_ms']:.2f} ms")
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                command, name_size, n_values = REQUEST.unpack(await reader.readexactly(REQUEST.size))
+                body = await reader.readexactly(name_size + 4 * n_values)
+                start = time.perf_counter()
+                name = body[:name_size].decode()
+                status = OK
+                try:
+                    if command == PREDICT:
+                        payload = await self._predict(name, body[name_size:])
+                    elif command == STATS:
+                        payload = json.dumps(self.stats()).encode()
+                    elif command == RELOAD:
+                        payload = json.dumps(await self._reload(name or None)).encode()
+                    else:
+                        raise ValueError(f"Unknown command {command}")
+                except Exception as e:  # reported to the client, the connection stays open
+                    status, payload = ERROR, repr(e).encode()
+                writer.write(RESPONSE.pack(status, len(payload)) + payload)
+                await writer.drain()
+                if command == PREDICT and status == OK:
+                    self.latencies.append(time.perf_counter() - start)
+                    self.n_requests += 1
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Controller disconnected
+        finally:
+            writer.close()
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def reset_stats(self):
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # Seconds from request read to response written
+        self.n_requests = 0
+        self.n_observations = 0
+        self.n_batches = 0
+        self._stats_start = time.perf_counter()
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000
+        elapsed = time.perf_counter() - self._stats_start
+        return {
+            "requests": self.n_requests,
+            "observations": self.n_observations,
+            "batches": self.n_batches,
+            "mean_batch": self.n_observations / max(self.n_batches, 1),
+            "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            "requests_per_s": self.n_requests / elapsed if elapsed > 0 else 0.0,
+            "uptime_s": elapsed,
+            "models": {s.name: {"backend": s.backend, "reloads": s.reloads, "obs_dim": s.obs_dim}
+                       for s in self.models.values()},
+        }
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+    async def serve(self, address=DEFAULT_ADDRESS, ready=None):
+        """Serves until stop(); `ready` (a threading.Event) is set once the socket accepts connections."""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._load_lock = asyncio.Lock()
+        await self._get_model("")  # Fails fast on a bad default model
+        family, target = parse_address(address)
+        if family == socket.AF_UNIX:
+            if os.path.exists(target):
+                os.unlink(target)  # Left over by a previous server
+            server = await asyncio.start_unix_server(self._handle, path=target)
+        else:
+            server = await asyncio.start_server(self._handle, host=target[0], port=target[1])
+        self._tasks.append(asyncio.create_task(self._watch()))
+        if self.log_interval:
+            self._tasks.append(asyncio.create_task(self._log()))
+        print(f"🚀 Policy server on {address} (max batch {self.max_batch}, window {self.max_wait * 1000:g} ms)")
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await self._stopped.wait()
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            self._tasks = []
+            self.models = {}  # Their batching tasks are gone; a new serve() loads them again
+            if family == socket.AF_UNIX and os.path.exists(target):
+                os.unlink(target)
+
+    def run(self, address=DEFAULT_ADDRESS):
+        """Serves in the current thread until interrupted."""
+        try:
+            asyncio.run(self.serve(address))
+        except KeyboardInterrupt:
+            print("👋 Policy server stopped")
+
+    def start(self, address=DEFAULT_ADDRESS):
+        """Serves from a background thread; returns once the socket accepts connections."""
+        ready = threading.Event()
+        self._thread = threading.Thread(target=asyncio.run, args=(self.serve(address, ready),), daemon=True)
+        self._thread.start()
+        while not ready.wait(0.1):
+            if not self._thread.is_alive():
+                raise RuntimeError("Policy server failed to start")
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# ======================
+# CLIENT
+# ======================
+class PolicyClient:
+    """
+    Blocking client for one controller: `predict(obs)` returns the action of
+    one observation, or the actions of a batch of them.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, model="", timeout=None):
+        family, target = parse_address(address)
+        self.model = model
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        if family == socket.AF_INET:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.connect(target)
+        self._header = bytearray(RESPONSE.size)
+
+    def _recv_into(self, buffer):
+        view = memoryview(buffer)
+        while len(view):
+            n = self.sock.recv_into(view)
+            if n == 0:
+                raise ConnectionError("Policy server closed the connection")
+            view = view[n:]
+
+    def _request(self, command, model, payload=b""):
+        name = model.encode()
+        self.sock.sendall(REQUEST.pack(command, len(name), len(payload) // 4) + name + payload)
+        self._recv_into(self._header)
+        status, size = RESPONSE.unpack(self._header)
+        body = bytearray(size)
+        self._recv_into(body)
+        if status != OK:
+            raise RuntimeError(f"Policy server error: {body.decode()}")
+        return body
+
+    def predict(self, obs, model=None):
+        obs = np.ascontiguousarray(obs, dtype=np.float32)
+        actions = np.frombuffer(self._request(PREDICT, self.model if model is None else model, obs.tobytes()),
+                                dtype=np.int32)
+        return int(actions[0]) if obs.ndim == 1 else actions
+
+    def stats(self):
+        return json.loads(self._request(STATS, ""))
+
+    def reload(self, model=""):
+        """Reloads now the served models (or `model`) whose file changed; returns their names."""
+        return json.loads(self._request(RELOAD, model))
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve trained fish feeding policies over a local socket.")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="unix:/path or host:port")
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--model", default=None, help="default model, e.g. ppo/best_model (default: best indexed)")
+    parser.add_argument("--backend", choices=["numpy", "sb3"], default="numpy")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=0.0, help="batching window")
+    parser.add_argument("--reload-interval", type=float, default=2.0, help="seconds between model file checks")
+    parser.add_argument("--log-interval", type=float, default=10.0, help="seconds between stats lines")
+    args = parser.parse_args()
+
+    PolicyServer(args.models_dir, args.model, args.backend, args.max_batch, args.max_wait_ms,
+                 args.reload_interval, args.log_interval).run(args.address)
@@ -0,0 +1,305 @@
+"""
+profiling.py
+============
+Where does a training run spend its time?
+
+`TimedVecEnv` wraps the training VecEnv and accumulates the time spent
+stepping and resetting it. `PhaseTimingCallback` splits the rest of the run
+into rollout collection (policy inference, buffer writes), gradient updates
+(everything between the end of one rollout and the start of the next) and
+the callbacks wrapped in `TimedCallback` (the blocking EvalCallback), and logs
+the totals, shares and rates under `timing/` in the run's TensorBoard log.
+Timing costs two perf_counter() calls per vectorized step.
+
+For a closer look, the callback can also take profiler snapshots every
+`snapshot_freq` timesteps, each covering `snapshot_steps` timesteps:
+"sample" (default) records the main thread's stack from a background thread
+every few milliseconds, py-spy style, and writes collapsed stacks (one
+"a;b;c count" line per stack, for flamegraph.pl or speedscope); "cprofile"
+writes a .prof file for pstats/snakeviz.
+
+Usage (experiment spec, per run):
+    tensorboard_log: ./logs/ppo/
+    profile:
+      snapshot_freq: 100000   # optional
+      profiler: sample        # or cprofile
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecEnvWrapper
+
+PROFILERS = ("sample", "cprofile")
+
+
+class PhaseTimer:
+    """Accumulated seconds and call counts per phase."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def add(self, phase, seconds):
+        self.seconds[phase] += seconds
+        self.calls[phase] += 1
+
+
+class TimedVecEnv(VecEnvWrapper):
+    """Times reset() and step_wait() of the wrapped VecEnv (phase "env")."""
+
+    def __init__(self, venv, timer=None):
+        super().__init__(venv)
+        self.timer = timer or PhaseTimer()
+
+    def reset(self):
+        start = time.perf_counter()
+        obs = self.venv.reset()
+        self.timer.add("env", time.perf_counter() - start)
+        return obs
+
+    def step_async(self, actions):
+        self._step_start = time.perf_counter()
+        self.venv.step_async(actions)
+
+    def step_wait(self):
+        result = self.venv.step_wait()
+        self.timer.add("env", time.perf_counter() - self._step_start)
+        return result
+
+
+class TimedCallback(BaseCallback):
+    """Runs `callback` as usual and adds the time of its on_step calls to `phase`."""
+
+    def __init__(self, callback, phase="eval", verbose=0):
+        super().__init__(verbose)
+        self.callback = callback
+        self.phase = phase
+        self.timer = PhaseTimer()
+        self.last_seconds = 0.0  # Duration of the last call that did real work
+
+    def _init_callback(self):
+        self.callback.init_callback(self.model)
+
+    def _on_training_start(self):
+        self.callback.on_training_start(self.locals, self.globals)
+
+    def _on_rollout_start(self):
+        self.callback.on_rollout_start()
+
+    def _on_step(self):
+        start = time.perf_counter()
+        result = self.callback.on_step()
+        seconds = time.perf_counter() - start
+        self.timer.add(self.phase, seconds)
+        if seconds > 1e-3:
+            self.last_seconds = seconds
+        return result
+
+    def _on_rollout_end(self):
+        self.callback.on_rollout_end()
+
+    def _on_training_end(self):
+        self.callback.on_training_end()
+
+    def update_child_locals(self, locals_):
+        self.callback.update_locals(locals_)
+
+
+class StackSampler:
+    """Samples the stack of one thread at a fixed interval from a daemon thread."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def save(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top(self, n=10):
+        """Leaf frames with the most samples (self time)."""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(n)
+
+
+class PhaseTimingCallback(BaseCallback):
+    """
+    Logs where the training time goes, under `timing/`:
+    env, policy (rollout time outside env stepping and timed callbacks), train
+    and eval seconds with their shares of the elapsed time, steps/s, env
+    steps/s, gradient updates/s and the duration of the last evaluation.
+
+    Env time needs the training env wrapped in TimedVecEnv, eval time the
+    EvalCallback wrapped in TimedCallback (passed as `timed_callbacks`).
+    """
+
+    def __init__(self, timed_callbacks=(), snapshot_freq=None, snapshot_steps=2048, profiler="sample",
+                 profile_dir=None, verbose=1):
+        super().__init__(verbose)
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profiler}'. Choose from {PROFILERS}")
+        self.timed_callbacks = list(timed_callbacks)
+        self.snapshot_freq = snapshot_freq
+        self.snapshot_steps = snapshot_steps
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self.timer = PhaseTimer()
+        self.env_timer = None
+        self._snapshot = None  # (profiler object, first timestep) while a snapshot is running
+        self._next_snapshot = snapshot_freq
+
+    def _init_callback(self):
+        env = self.training_env
+        while env is not None and not isinstance(env, TimedVecEnv):
+            env = getattr(env, "venv", None)
+        self.env_timer = env.timer if env is not None else None
+        if self.env_timer is None and self.verbose:
+            print("⚠️ PhaseTimingCallback: training env is not wrapped in TimedVecEnv, env time is not split out")
+
+    # ------------------------------------------------------------------
+    # Phases
+    # ------------------------------------------------------------------
+    def _env_seconds(self):
+        return self.env_timer.seconds["env"] if self.env_timer else 0.0
+
+    def _callback_seconds(self):
+        return sum(sum(cb.timer.seconds.values()) for cb in self.timed_callbacks)
+
+    def _on_training_start(self):
+        self._start = time.perf_counter()
+        self._start_timesteps = self.num_timesteps
+        self._start_updates = getattr(self.model, "_n_updates", 0)
+        self._phase_start = None
+
+    def _on_rollout_start(self):
+        now = time.perf_counter()
+        if self._phase_start is not None:
+            self.timer.add("train", now - self._phase_start)  # Since the end of the last rollout
+        self._phase_start = now
+        self._rollout_env = self._env_seconds()
+        self._rollout_callbacks = self._callback_seconds()
+
+    def _on_rollout_end(self):
+        now = time.perf_counter()
+        rollout = now - self._phase_start
+        env = self._env_seconds() - self._rollout_env
+        callbacks = self._callback_seconds() - self._rollout_callbacks
+        self.timer.add("policy", max(rollout - env - callbacks, 0.0))
+        self._phase_start = now
+        self._record()
+
+    def _on_step(self):
+        if self._snapshot is None:
+            if self.snapshot_freq and self.num_timesteps >= self._next_snapshot:
+                self._start_snapshot()
+        elif self.num_timesteps - self._snapshot[1] >= self.snapshot_steps:
+            self._stop_snapshot()
+        return True
+
+    def _on_training_end(self):
+        if self._snapshot is not None:
+            self._stop_snapshot()
+        if self._phase_start is not None:
+            self.timer.add("train", time.perf_counter() - self._phase_start)
+            self._phase_start = None
+        self._record()
+        self.logger.dump(self.num_timesteps)  # Final totals; SB3 doesn't dump after learn()
+        if self.verbose:
+            self.print_summary()
+
+    def totals(self):
+        """Seconds per phase so far (eval from the timed callbacks, env from TimedVecEnv)."""
+        totals = {"env": self._env_seconds(), "policy": self.timer.seconds["policy"],
+                  "train": self.timer.seconds["train"]}
+        for cb in self.timed_callbacks:
+            for phase, seconds in cb.timer.seconds.items():
+                totals[phase] = totals.get(phase, 0.0) + seconds
+        return totals
+
+    def _record(self):
+        elapsed = time.perf_counter() - self._start
+        totals = self.totals()
+        for phase, seconds in totals.items():
+            self.logger.record(f"timing/{phase}_s", seconds)
+            self.logger.record(f"timing/{phase}_share", seconds / elapsed if elapsed else 0.0)
+        steps = self.num_timesteps - self._start_timesteps
+        updates = getattr(self.model, "_n_updates", 0) - self._start_updates
+        self.logger.record("timing/steps_per_s", steps / elapsed if elapsed else 0.0)
+        if totals["env"]:
+            self.logger.record("timing/env_steps_per_s", steps / totals["env"])
+        if totals["train"]:
+            self.logger.record("timing/updates_per_s", updates / totals["train"])
+        for cb in self.timed_callbacks:
+            if cb.last_seconds:
+                self.logger.record(f"timing/last_{cb.phase}_s", cb.last_seconds)
+
+    def print_summary(self):
+        elapsed = time.perf_counter() - self._start
+        print(f"⏱️ Time per phase over {elapsed:.1f}s ({(self.num_timesteps - self._start_timesteps) / elapsed:.0f} steps/s):")
+        for phase, seconds in sorted(self.totals().items(), key=lambda item: -item[1]):
+            print(f"   {phase:<8}{seconds:>9.2f}s  {seconds / elapsed:>6.1%}")
+
+    # ------------------------------------------------------------------
+    # Profiler snapshots
+    # ------------------------------------------------------------------
+    def _start_snapshot(self):
+        if self.profiler == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident())
+            profiler.start()
+        self._snapshot = (profiler, self.num_timesteps)
+
+    def _stop_snapshot(self):
+        profiler, first = self._snapshot
+        self._snapshot = None
+        self._next_snapshot = first + self.snapshot_freq
+        directory = self.profile_dir or os.path.join(self.logger.get_dir() or "logs", "profiles")
+        os.makedirs(directory, exist_ok=True)
+        if self.profiler == "cprofile":
+            profiler.disable()
+            path = os.path.join(directory, f"profile_{first}.prof")
+            profiler.dump_stats(path)
+            if self.verbose:
+                print(f"🔬 cProfile snapshot at {first} steps saved to {path}")
+                pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+        else:
+            profiler.stop()
+            path = os.path.join(directory, f"stacks_{first}.txt")
+            profiler.save(path)
+            if self.verbose:
+                total = sum(profiler.stacks.values()) or 1
+                print(f"🔬 Sampled snapshot at {first} steps ({total} samples) saved to {path}")
+                for frame, count in profiler.top():
+                    print(f"   {count / total:>6.1%}  {frame}")
@@ -0,0 +1,63 @@
+"""
+test_benchmark.py
+=================
+Pytest entry point of the benchmark suite (Training/benchmark.py).
+
+Every benchmark is run with the budgets of the committed baseline
+(benchmarks/baseline.json) and fails when even its best trial is slower
+than the baseline (the median of its trials) by more than BENCHMARK_THRESHOLD
+(default: 25%). The --quick budgets are short and other load on the machine
+only ever slows a trial down, so the best trial is the least noisy measure of
+the current code. The timings depend on the
+machine, so the benchmarks only run with RUN_BENCHMARKS=1; the comparison
+logic itself is always tested.
+
+Usage:
+    RUN_BENCHMARKS=1 python -m pytest -q Training/test_benchmark.py
+    RUN_BENCHMARKS=1 BENCHMARK_THRESHOLD=0.1 python -m pytest -q Training/test_benchmark.py -k env
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Training.benchmark import BASELINE_PATH, BENCHMARKS, _load, compare_results, run_benchmarks
+
+THRESHOLD = float(os.environ.get("BENCHMARK_THRESHOLD", 0.25))
+
+
+def _best_trials(document):
+    """The results document with each benchmark's value replaced by its best trial."""
+    results = {}
+    for name, result in document["results"].items():
+        best = max(result["samples"]) if result["higher_is_better"] else min(result["samples"])
+        results[name] = dict(result, value=best)
+    return dict(document, results=results)
+
+
+def _result(value, higher_is_better=True):
+    return {"value": value, "unit": "x", "higher_is_better": higher_is_better, "samples": [value]}
+
+
+def test_baseline_covers_every_benchmark():
+    assert sorted(_load(BASELINE_PATH)["results"]) == sorted(BENCHMARKS)
+
+
+def test_compare_flags_slowdowns_past_the_threshold():
+    baseline = {"results": {"fast": _result(100.0), "ok": _result(100.0), "latency": _result(1.0, False)}}
+    current = {"results": {"fast": _result(80.0), "ok": _result(90.0), "latency": _result(1.2, False),
+                           "new": _result(1.0)}}
+    assert compare_results(baseline, current, threshold=0.15) == ["fast", "latency"]
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run the speed benchmarks")
+@pytest.mark.parametrize("name", list(BENCHMARKS))
+def test_no_regression(name):
+    baseline = _load(BASELINE_PATH)
+    current = run_benchmarks([name], repeats=baseline["repeats"], quick=baseline["quick"])
+    current = _best_trials(current)
+    regressions = compare_results(baseline, current, THRESHOLD)
+    base, value = baseline["results"][name]["value"], current["results"][name]["value"]
+    assert not regressions, f"{name} regressed past {THRESHOLD:.0%}: {value:.4g} vs baseline {base:.4g}"
@@ -0,0 +1,85 @@
+"""
+test_compact_buffer.py
+======================
+CompactReplayBuffer must hand DQN the same minibatches as SB3's ReplayBuffer
+holding the same transitions.
+
+Usage:
+    python -m pytest -q Training/test_compact_buffer.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from stable_baselines3.common.buffers import ReplayBuffer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Environment.vec_env import FishFeedingVecEnv
+from Training.compact_buffer import CompactReplayBuffer
+
+N_ENVS = 4
+
+
+def fill(buffers, env_kwargs, n_steps, seed=0):
+    """Adds the same random-action transitions to every buffer, like DQN's _store_transition."""
+    env = FishFeedingVecEnv(N_ENVS, **env_kwargs)
+    env.seed(seed)
+    obs = env.reset()
+    rng = np.random.default_rng(seed)
+    for _ in range(n_steps):
+        actions = rng.integers(0, 6, N_ENVS)
+        new_obs, rewards, dones, infos = env.step(actions)
+        next_obs = new_obs.copy()
+        for i, done in enumerate(dones):
+            if done:
+                next_obs[i] = infos[i]["terminal_observation"]
+        for buffer in buffers:
+            buffer.add(obs, next_obs, actions, rewards, dones, infos)
+        obs = new_obs
+    return env
+
+
+@pytest.mark.parametrize("env_kwargs, grid_size", [({}, None), ({"grid_size": 7}, None), ({"obs_window": 3}, 5)])
+@pytest.mark.parametrize("n_steps", [150, 700])  # Partly filled, and wrapped around several times
+def test_samples_match_replay_buffer(env_kwargs, grid_size, n_steps):
+    env = FishFeedingVecEnv(N_ENVS, **env_kwargs)
+    buffer_size = 200 * N_ENVS
+    reference = ReplayBuffer(buffer_size, env.observation_space, env.action_space, device="cpu", n_envs=N_ENVS)
+    compact = CompactReplayBuffer(buffer_size, env.observation_space, env.action_space, device="cpu",
+                                  n_envs=N_ENVS, grid_size=grid_size)
+    fill([reference, compact], env_kwargs, n_steps)
+    assert compact.pos == reference.pos and compact.full == reference.full
+
+    # Every transition but the oldest slot of a full buffer, whose next observation was overwritten
+    upper = compact.buffer_size if compact.full else compact.pos
+    batch_inds = np.array([i for i in range(upper) if not (compact.full and i == compact.pos)])
+    np.random.seed(1)
+    expected = reference._get_samples(batch_inds)
+    np.random.seed(1)
+    actual = compact._get_samples(batch_inds)
+    for field, a, b in zip(expected._fields, expected, actual):
+        if a is None:  # Fields this SB3 version leaves unset (n-step discounts)
+            assert b is None, field
+        else:
+            np.testing.assert_array_equal(a.numpy(), b.numpy(), err_msg=field)
+    assert actual.dones.sum() > 0  # Terminal observations were exercised
+
+
+def test_rejects_foreign_observations():
+    env = FishFeedingVecEnv(N_ENVS)
+    compact = CompactReplayBuffer(100, env.observation_space, env.action_space, device="cpu", n_envs=N_ENVS)
+    obs = np.full((N_ENVS,) + env.observation_space.shape, 0.5, dtype=np.float32)
+    with pytest.raises(ValueError):
+        compact.add(obs, obs, np.zeros(N_ENVS), np.zeros(N_ENVS), np.zeros(N_ENVS, dtype=bool), [{}] * N_ENVS)
+
+
+def test_nbytes_counts_terminal_observations():
+    env = FishFeedingVecEnv(N_ENVS)
+    compact = CompactReplayBuffer(200 * N_ENVS, env.observation_space, env.action_space, device="cpu",
+                                  n_envs=N_ENVS)
+    empty = compact.nbytes
+    fill([compact], {}, 150)
+    assert len(compact.terminal_obs) > 0
+    assert compact.nbytes == empty + 7 * len(compact.terminal_obs)  # 4 bytes of hunger bits, 1 overfeeds, 2 x/y
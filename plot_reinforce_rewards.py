@@ -1,23 +1,15 @@
 import os
 import matplotlib.pyplot as plt
-from tensorboard.backend.event_processing.event_accumulator import EventAccumulator
+from Training.metrics_store import MetricsStore
 
 # === CONFIGURE PATH ===
 reinforce_log_dir = "logs/reinforce/A2C_1"  # Folder containing events.out.tfevents...
 reinforce_tag = "rollout/ep_rew_mean"  # Name of scalar in TensorBoard
 
 # === FUNCTION TO READ REINFORCE REWARDS FROM TENSORBOARD LOG ===
+# Parsed events are cached beside the log, so re-plotting only reads what was appended since
 def load_tb_rewards(log_dir, tag):
-    event_acc = EventAccumulator(log_dir)
-    event_acc.Reload()
-    
-    if tag not in event_acc.Tags()["scalars"]:
-        raise ValueError(f"Tag '{tag}' not found in TensorBoard logs. Available: {event_acc.Tags()['scalars']}")
-    
-    scalar_events = event_acc.Scalars(tag)
-    timesteps = [e.step for e in scalar_events]
-    rewards = [e.value for e in scalar_events]
-    return timesteps, rewards
+    return MetricsStore().scalars(log_dir, tag, max_points=500)
 
 # === LOAD REINFORCE DATA ===
 timesteps, rewards = load_tb_rewards(reinforce_log_dir, reinforce_tag)
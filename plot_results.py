@@ -6,12 +6,14 @@ Plots cumulative rewards over episodes for all RL methods:
 - DQN
 - PPO
 - REINFORCE (read from TensorBoard log without retraining)
+
+Logs are read through Training/metrics_store.py, which caches parsed event
+files, so re-plotting a run that has grown only reads its new bytes.
 """
 
 import os
-import numpy as np
-import matplotlib.pyplot as plt
-from tensorboard.backend.event_processing.event_accumulator import EventAccumulator
+
+from Training.metrics_store import MetricsStore
 
 
 # ======================
@@ -23,8 +25,11 @@ LOG_PATHS = {
     "PPO": "logs/ppo/evaluations.npz",
 }
 
-REINFORCE_LOG_DIR = "reinforce/A2C_1"  # Folder containing REINFORCE events.out.tfevents...
+REINFORCE_LOG_DIR = "logs/reinforce/A2C_1"  # Folder containing REINFORCE events.out.tfevents...
 REINFORCE_TAG = "rollout/ep_rew_mean"  # The scalar tag to read
+MAX_POINTS = 500  # Longer curves are averaged down to this many points
+
+store = MetricsStore()
 
 
 # ======================
@@ -37,35 +42,22 @@ def load_npz_evals(file_path):
     if not os.path.exists(file_path):
         print(f"⚠️ Missing file: {file_path}")
         return None, None
-    data = np.load(file_path)
-    timesteps = data["timesteps"]
-    rewards = data["results"].mean(axis=1)  # mean over evaluation episodes
-    return timesteps, rewards
+    return store.evaluations(file_path, max_points=MAX_POINTS)  # mean over evaluation episodes
 
 
 def load_tb_scalar(log_dir, tag):
     """
     Loads scalar values from TensorBoard logs.
     """
-    if not os.path.exists(log_dir):
-        raise FileNotFoundError(f"Log directory not found: {log_dir}")
-
-    event_acc = EventAccumulator(log_dir)
-    event_acc.Reload()
-
-    if tag not in event_acc.Tags()["scalars"]:
-        raise ValueError(f"Tag '{tag}' not found. Available: {event_acc.Tags()['scalars']}")
-
-    events = event_acc.Scalars(tag)
-    timesteps = np.array([e.step for e in events])
-    values = np.array([e.value for e in events])
-    return timesteps, values
+    return store.scalars(log_dir, tag, max_points=MAX_POINTS)
 
 
 # ======================
 # MAIN PLOTTING
 # ======================
 def plot_cumulative_rewards():
+    import matplotlib.pyplot as plt
+
     results = {}
 
     # Load standard agents (A2C, DQN, PPO)